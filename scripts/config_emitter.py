@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Surge Config Emitter
+
+Writes generated config files only when their content changed. The new
+content is compared (by SHA-256) with what is on disk; identical files are
+left untouched so their mtime doesn't change and containers don't reload
+or rescan. Changed files are written to a temporary file in the same
+directory and renamed over the old one, so an interrupted run never leaves
+a half-written config.
+
+Every changed path is remembered for the process (changed_files()) and,
+when $SURGE_CONFIG_CHANGES is set, appended to that file so the calling
+shell script knows which services need a reload.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+
+_changed = []
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+def write_if_changed(path, content, mode=None, encoding='utf-8'):
+    """
+    Atomically replace path with content (str or bytes) unless it already
+    holds exactly that content. Returns True if the file was written.
+
+    The existing file's permissions are kept unless mode is given.
+    """
+    path = os.fspath(path)
+    data = content.encode(encoding) if isinstance(content, str) else content
+    try:
+        with open(path, 'rb') as f:
+            if _digest(f.read()) == _digest(data):
+                return False
+        current_mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        current_mode = None
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        elif current_mode is not None:
+            os.chmod(tmp_path, current_mode)
+        else:
+            os.chmod(tmp_path, 0o666 & ~_umask())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    _changed.append(path)
+    changes_file = os.environ.get('SURGE_CONFIG_CHANGES')
+    if changes_file:
+        try:
+            with open(changes_file, 'a', encoding='utf-8') as f:
+                f.write(path + '\n')
+        except OSError:
+            pass
+    return True
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+def emit_json(path, data, indent=2, **kwargs):
+    """Write data as JSON if it differs from the file. Returns True if written."""
+    return write_if_changed(path, json.dumps(data, indent=indent), **kwargs)
+
+def emit_yaml(path, data, **kwargs):
+    """Write data as block-style YAML (key order kept) if it differs from the file. Returns True if written."""
+    import yaml
+    return write_if_changed(path, yaml.dump(data, default_flow_style=False, sort_keys=False), **kwargs)
+
+def changed_files():
+    """Paths written by this process so far."""
+    return list(_changed)
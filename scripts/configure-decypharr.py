@@ -8,6 +8,12 @@ import requests
 from pathlib import Path
 from typing import Optional
 
+import config_emitter
+import debrid_providers
+import file_watch
+import http_client
+import service_credentials
+
 class DecypharrConfigurator:
     """Main Decypharr configuration class"""
     
@@ -96,11 +102,11 @@ class DecypharrConfigurator:
             try:
                 # Try different endpoints based on service
                 if "decypharr" in url.lower():
-                    response = requests.get(f"{url}/api/v2/app/version", timeout=5)
+                    response = http_client.get(f"{url}/api/v2/app/version", timeout=5, retries=0)
                 elif "radarr" in url.lower() or "sonarr" in url.lower():
-                    response = requests.get(f"{url}/api/v3/system/status", timeout=5, headers={'X-Api-Key': 'dummy'})
+                    response = http_client.get(f"{url}/api/v3/system/status", timeout=5, retries=0, headers={'X-Api-Key': 'dummy'})
                 else:
-                    response = requests.get(f"{url}/ping", timeout=5)
+                    response = http_client.get(f"{url}/ping", timeout=5, retries=0)
                     
                 if response.status_code in [200, 401]:  # 401 means service is up but needs auth
                     print(f"  ✓ {service_name} is ready!")
@@ -119,26 +125,21 @@ class DecypharrConfigurator:
     def get_api_key(self, service_name: str, base_url: str, config_path: str, max_wait: int = 120, poll_interval: int = 5) -> Optional[str]:
         """Extract API key from service configuration, waiting up to max_wait seconds if needed. Fallback to env if not found."""
         config_file = Path(config_path) / "config.xml"
-        waited = 0
-        while waited < max_wait:
-            try:
-                if config_file.exists():
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    # Extract API key using basic string parsing
-                    if '<ApiKey>' in content and '</ApiKey>' in content:
-                        start = content.find('<ApiKey>') + 8
-                        end = content.find('</ApiKey>')
-                        api_key = content[start:end].strip()
-                        if api_key and len(api_key) > 10:
-                            print(f"  ✓ Found {service_name} API key after waiting {waited}s")
-                            return api_key
-                else:
-                    print(f"  ⏳ Waiting for {service_name} config.xml to appear...")
-            except Exception as e:
-                print(f"  ⚠️  Could not read {service_name} API key: {e}")
-            time.sleep(poll_interval)
-            waited += poll_interval
+        started = time.monotonic()
+
+        def read_api_key():
+            api_key = service_credentials.get_registry(self.storage_path).read(str(config_file), 'xml')
+            if api_key and len(api_key) > 10:
+                return api_key
+            return None
+
+        if not config_file.exists():
+            print(f"  ⏳ Waiting for {service_name} config.xml to appear...")
+        # Returns as soon as the container writes its key (inotify), polling as a fallback
+        api_key = file_watch.wait_for(config_file, read_api_key, timeout=max_wait, poll_interval=poll_interval)
+        if api_key:
+            print(f"  ✓ Found {service_name} API key after waiting {time.monotonic() - started:.1f}s")
+            return api_key
         # Fallback to environment variable
         env_key = f'{service_name.upper()}_API_KEY'
         env_value = self._get_env_or_file(env_key)
@@ -151,43 +152,24 @@ class DecypharrConfigurator:
     def test_debrid_services(self):
         """Test configured debrid services"""
         print("🧪 Testing debrid service connections...")
-        
+
+        results = debrid_providers.validate_accounts({
+            'realdebrid': self.rd_api_key,
+            'alldebrid': self.ad_api_key,
+            'debridlink': self.dl_api_key,
+            'torbox': self.tb_api_key,
+        })
         services_tested = []
-        
-        if self.rd_api_key:
-            try:
-                headers = {'Authorization': f'Bearer {self.rd_api_key}'}
-                response = requests.get('https://api.real-debrid.com/rest/1.0/user', headers=headers, timeout=10)
-                if response.status_code == 200:
-                    user_data = response.json()
-                    print(f"  ✓ Real-Debrid: Connected as {user_data.get('username', 'Unknown')}")
-                    services_tested.append('real-debrid')
-                else:
-                    print(f"  ⚠️  Real-Debrid: Authentication failed ({response.status_code})")
-            except requests.exceptions.RequestException as e:
-                print(f"  ⚠️  Real-Debrid: Network error - {type(e).__name__}")
-            except Exception as e:
-                print(f"  ⚠️  Real-Debrid: Unexpected error - {type(e).__name__}")
-                
-        if self.ad_api_key:
-            try:
-                params = {'apikey': self.ad_api_key}
-                response = requests.get('https://api.alldebrid.com/v4/user', params=params, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('status') == 'success':
-                        user_data = data.get('data', {}).get('user', {})
-                        print(f"  ✓ AllDebrid: Connected as {user_data.get('username', 'Unknown')}")
-                        services_tested.append('alldebrid')
-                    else:
-                        print(f"  ⚠️  AllDebrid: API error - {data.get('error', 'Unknown')}")
-                else:
-                    print(f"  ⚠️  AllDebrid: Request failed ({response.status_code})")
-            except requests.exceptions.RequestException as e:
-                print(f"  ⚠️  AllDebrid: Network error - {type(e).__name__}")
-            except Exception as e:
-                print(f"  ⚠️  AllDebrid: Unexpected error - {type(e).__name__}")
-                
+        for name, result in results.items():
+            label = debrid_providers.PROVIDERS[name].label if name in debrid_providers.PROVIDERS else name
+            if result['ok']:
+                plan = "premium" if result.get('premium') else "no premium"
+                cached = ", cached" if result.get('cached') else ""
+                print(f"  ✓ {label}: Connected as {result.get('username', 'Unknown')} ({plan}{cached})")
+                services_tested.append(name)
+            else:
+                print(f"  ⚠️  {label}: {result['error']}")
+
         if services_tested:
             print(f"  ✅ Successfully tested {len(services_tested)} debrid service(s)")
             return True
@@ -405,10 +387,10 @@ class DecypharrConfigurator:
 
         # Save configuration
         config_file = self.decypharr_config_dir / "config.json"
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2)
-
-        print(f"  ✓ Configuration saved to: {config_file}")
+        if config_emitter.emit_json(config_file, config):
+            print(f"  ✓ Configuration saved to: {config_file}")
+        else:
+            print(f"  ✓ Configuration unchanged: {config_file}")
         print(f"  ✓ Configured {len(debrid_configs)} debrid service(s)")
         if radarr_api_key:
             print(f"  ✓ Radarr API key injected: {radarr_api_key}")
@@ -455,7 +437,7 @@ class DecypharrConfigurator:
             headers = {"X-Api-Key": api_key, "Content-Type": "application/json"}
             
             # Check if Decypharr client already exists
-            response = requests.get(f"{service_url}/api/v3/downloadclient", headers=headers, timeout=10)
+            response = http_client.get(f"{service_url}/api/v3/downloadclient", headers=headers, timeout=10)
             if response.status_code == 200:
                 existing_clients = response.json()
                 for client in existing_clients:
@@ -517,7 +499,7 @@ class DecypharrConfigurator:
                 "tags": ["debrid", "decypharr", "primary"]
             }
             
-            response = requests.post(
+            response = http_client.post(
                 f"{service_url}/api/v3/downloadclient",
                 headers=headers,
                 json=download_client_config,
@@ -549,10 +531,86 @@ class DecypharrConfigurator:
 """Decypharr Status Checker"""
 
 import json
+import os
+import sqlite3
 import requests
 import sys
 from pathlib import Path
 
+COUNT_CACHE = "/app/config/status_counts.db"
+
+class TreeCounter:
+    """Counts files, directories, symlinks and bytes, caching each directory's own entries by mtime"""
+
+    def __init__(self, path=COUNT_CACHE):
+        try:
+            self.conn = sqlite3.connect(path)
+        except sqlite3.Error:
+            self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS counts (
+                path TEXT PRIMARY KEY, mtime_ns INTEGER, files INTEGER, dirs INTEGER,
+                symlinks INTEGER, bytes INTEGER, subdirs TEXT
+            )
+        """)
+
+    def count(self, root):
+        """Return {'files', 'dirs', 'symlinks', 'bytes'} for everything below root."""
+        totals = {"files": 0, "dirs": 0, "symlinks": 0, "bytes": 0}
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            row = self.conn.execute(
+                "SELECT mtime_ns, files, dirs, symlinks, bytes, subdirs FROM counts WHERE path = ?", (directory,)
+            ).fetchone()
+            if row and row[0] == mtime_ns:
+                files, dirs, symlinks, size, subdirs = row[1], row[2], row[3], row[4], json.loads(row[5])
+            else:
+                files, dirs, symlinks, size, subdirs = self._count_entries(directory)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO counts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (directory, mtime_ns, files, dirs, symlinks, size, json.dumps(subdirs))
+                )
+            totals["files"] += files
+            totals["dirs"] += dirs
+            totals["symlinks"] += symlinks
+            totals["bytes"] += size
+            stack.extend(subdirs)
+        self.conn.commit()
+        return totals
+
+    def _count_entries(self, directory):
+        """Count one directory's own entries without following symlinks into the debrid mounts."""
+        files = dirs = symlinks = size = 0
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_symlink():
+                            symlinks += 1
+                        elif entry.is_dir(follow_symlinks=False):
+                            dirs += 1
+                            subdirs.append(entry.path)
+                        else:
+                            files += 1
+                            size += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files, dirs, symlinks, size, subdirs
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
 def check_status():
     config_file = Path("/app/config/config.json")
     # Removed config.json existence check per user request
@@ -590,10 +648,12 @@ def check_status():
         "/mnt/downloads/blackhole/radarr"
     ]
     
+    counter = TreeCounter()
     for directory in directories:
         if Path(directory).exists():
-            file_count = len(list(Path(directory).rglob("*")))
-            print(f"📁 {directory}: {file_count} items")
+            counts = counter.count(directory)
+            print(f"📁 {directory}: {counts['files']} files, {counts['dirs']} directories, "
+                  f"{counts['symlinks']} symlinks ({format_bytes(counts['bytes'])})")
         else:
             print(f"⚠️  {directory}: Not found")
             
@@ -612,15 +672,317 @@ if __name__ == "__main__":
         
         # Create repair script
         repair_script = self.decypharr_config_dir / "repair_links.py"
-        repair_content = '''#!/usr/bin/env python3
+        repair_content = r'''#!/usr/bin/env python3
 """Decypharr Repair Links Script"""
 
 import json
 import os
-import requests
+import sys
+import time
+import sqlite3
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+SYMLINK_ROOT = "/mnt/downloads/symlinks"
+INDEX_FILE = "/app/config/symlink_index.db"
+VERIFY_INTERVAL = int(os.environ.get("REPAIR_VERIFY_INTERVAL", "21600"))  # re-check healthy targets every 6h
+VERIFY_WORKERS = int(os.environ.get("REPAIR_VERIFY_WORKERS", "32"))
+MOUNT_CONCURRENCY = int(os.environ.get("REPAIR_MOUNT_CONCURRENCY", "8"))  # parallel listings per FUSE/WebDAV mount
+CATALOG_ROOTS = [f"/mnt/rclone/remote/{name}" for name in ("realdebrid", "alldebrid", "debridlink", "torbox")]
+# Directories reported by Zurg's on_library_update hook, one per line. /mnt/surge is the host's
+# /mnt/surge, seen by Zurg (its hook script) and by Decypharr and decypharr-catalog (via /mnt)
+UPDATE_QUEUE = os.environ.get("CATALOG_UPDATE_QUEUE", "/mnt/surge/catalog_updates.queue")
+CATALOG_POLL_INTERVAL = int(os.environ.get("CATALOG_POLL_INTERVAL", "30"))
+
+def mount_points():
+    """Return mount points from /proc/mounts, longest first."""
+    try:
+        with open("/proc/mounts", "r") as f:
+            points = [line.split()[1].replace("\\040", " ") for line in f if len(line.split()) > 1]
+    except OSError:
+        points = []
+    return sorted(set(points) | {"/"}, key=len, reverse=True)
+
+def mount_for(path, mounts):
+    """Return the mount point a path lives on."""
+    for mount in mounts:
+        if path == mount or path.startswith(mount.rstrip("/") + "/"):
+            return mount
+    return "/"
+
+class SymlinkIndex:
+    """Persistent index of the symlink tree; only directories whose mtime changed are listed again"""
+
+    def __init__(self, path=INDEX_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER);
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+            CREATE TABLE IF NOT EXISTS links (
+                path TEXT PRIMARY KEY, dir TEXT NOT NULL, target TEXT NOT NULL, verified_at REAL, ok INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS links_dir ON links (dir);
+        """)
+
+    def scan(self, root, full=False):
+        """Bring the index up to date. Returns (directories listed, directories unchanged)."""
+        listed = unchanged = 0
+        seen = set()
+        stack = [(root, None)]
+        while stack:
+            directory, parent = stack.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(directory)
+            row = self.conn.execute("SELECT mtime_ns FROM dirs WHERE path = ?", (directory,)).fetchone()
+            if row and row[0] == mtime_ns and not full:
+                # Same entries as last time; only its subdirectories may have changed
+                unchanged += 1
+                children = self.conn.execute("SELECT path FROM dirs WHERE parent = ?", (directory,)).fetchall()
+                stack.extend((child, directory) for (child,) in children)
+                continue
+            listed += 1
+            stack.extend((child, directory) for child in self._relist(directory))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)", (directory, parent, mtime_ns)
+            )
+
+        # Forget directories (and their links) that no longer exist
+        gone = [path for (path,) in self.conn.execute("SELECT path FROM dirs").fetchall() if path not in seen]
+        for path in gone:
+            self.conn.execute("DELETE FROM dirs WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM links WHERE dir = ?", (path,))
+        self.conn.commit()
+        return listed, unchanged
+
+    def _relist(self, directory):
+        """Sync one directory's symlinks into the index and return its subdirectories."""
+        known = dict(self.conn.execute("SELECT path, target FROM links WHERE dir = ?", (directory,)).fetchall())
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_symlink():
+                        target = os.readlink(entry.path)
+                        if not os.path.isabs(target):
+                            target = os.path.normpath(os.path.join(directory, target))
+                        if known.pop(entry.path, None) != target:
+                            # New or retargeted link: verify it on this run
+                            self.conn.execute(
+                                "INSERT OR REPLACE INTO links (path, dir, target, verified_at, ok) VALUES (?, ?, ?, NULL, NULL)",
+                                (entry.path, directory, target)
+                            )
+                    elif entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+        except OSError as e:
+            print(f"⚠️  Could not list {directory}: {e}")
+            return subdirectories
+        for path in known:
+            self.conn.execute("DELETE FROM links WHERE path = ?", (path,))
+        return subdirectories
+
+    def verify(self, max_age=VERIFY_INTERVAL, full=False):
+        """Check targets that are new, broken or not verified within max_age seconds. Returns how many."""
+        if full:
+            rows = self.conn.execute("SELECT path, target FROM links").fetchall()
+        else:
+            rows = self.conn.execute(
+                "SELECT path, target FROM links WHERE verified_at IS NULL OR ok = 0 OR verified_at < ?",
+                (time.time() - max_age,)
+            ).fetchall()
+
+        # One listing per target directory instead of one stat per file
+        by_directory = {}
+        for path, target in rows:
+            directory, name = os.path.split(target)
+            by_directory.setdefault(directory, []).append((path, name))
+
+        mounts = mount_points()
+        limits = {}
+        for directory in by_directory:
+            limits.setdefault(mount_for(directory, mounts), threading.Semaphore(MOUNT_CONCURRENCY))
+
+        def check(directory):
+            with limits[mount_for(directory, mounts)]:
+                try:
+                    names = set(os.listdir(directory))
+                except OSError:
+                    names = set()
+            return directory, names
+
+        now = time.time()
+        results = []
+        with ThreadPoolExecutor(max_workers=VERIFY_WORKERS) as executor:
+            for directory, names in executor.map(check, by_directory):
+                results.extend((now, 1 if name in names else 0, path) for path, name in by_directory[directory])
+        self.conn.executemany("UPDATE links SET verified_at = ?, ok = ? WHERE path = ?", results)
+        self.conn.commit()
+        return len(rows)
+
+    def broken(self):
+        return [Path(path) for (path,) in self.conn.execute("SELECT path FROM links WHERE ok = 0 ORDER BY path")]
+
+    def broken_targets(self):
+        return self.conn.execute("SELECT path, target FROM links WHERE ok = 0 ORDER BY path").fetchall()
+
+    def set_targets(self, rows):
+        """Record relinked symlinks as [(target, verified_at, path)]."""
+        self.conn.executemany("UPDATE links SET target = ?, verified_at = ?, ok = 1 WHERE path = ?", rows)
+        self.conn.commit()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+
+class ContentCatalog:
+    """Catalog of files on the debrid mounts (filename, size, release) used to find where a link's target moved"""
+
+    def __init__(self, path=INDEX_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS content (
+                path TEXT PRIMARY KEY, root TEXT NOT NULL, name TEXT NOT NULL, size INTEGER, release TEXT
+            );
+            CREATE INDEX IF NOT EXISTS content_name ON content (name);
+        """)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM content").fetchone()[0]
+
+    def build(self, roots=CATALOG_ROOTS):
+        """Walk every debrid mount and replace the catalog. Returns the number of files found."""
+        roots = [root for root in roots if os.path.isdir(root)]
+        with ThreadPoolExecutor(max_workers=max(len(roots), 1)) as executor:
+            listings = list(executor.map(self._walk, roots))
+        with self.conn:
+            self.conn.execute("DELETE FROM content")
+            for rows in listings:
+                self.conn.executemany("INSERT OR REPLACE INTO content VALUES (?, ?, ?, ?, ?)", rows)
+        return sum(len(rows) for rows in listings)
+
+    def refresh(self, updated, roots=CATALOG_ROOTS):
+        """Re-list only the directories a library update reported (paths relative to a mount, or absolute)."""
+        changed = 0
+        for item in updated:
+            item = item.strip()
+            if not item:
+                continue
+            if os.path.isabs(item):
+                directories = [(item.rstrip("/"), root) for root in roots if item.startswith(root + "/")]
+            else:
+                directories = [(os.path.join(root, item.strip("/")), root) for root in roots]
+            for directory, root in directories:
+                rows = self._walk(directory, root) if os.path.isdir(directory) else []
+                with self.conn:
+                    self.conn.execute("DELETE FROM content WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                                      (directory, like_prefix(directory)))
+                    self.conn.executemany("INSERT OR REPLACE INTO content VALUES (?, ?, ?, ?, ?)", rows)
+                changed += len(rows)
+        return changed
+
+    def _walk(self, top, root=None):
+        """Return catalog rows for every file below top."""
+        root = root or top
+        rows = []
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            stack.append(entry.path)
+                        else:
+                            try:
+                                size = entry.stat().st_size
+                            except OSError:
+                                size = None
+                            rows.append((entry.path, root, entry.name, size, os.path.basename(directory)))
+            except OSError as e:
+                print(f"⚠️  Could not list {directory}: {e}")
+        return rows
+
+    def locate(self, target):
+        """Return the best current path for a missing target, or None."""
+        name = os.path.basename(target)
+        release = os.path.basename(os.path.dirname(target))
+        candidates = self.conn.execute("SELECT path, root, size, release FROM content WHERE name = ?", (name,)).fetchall()
+        if not candidates:
+            return None
+        # Same release folder first, then the same debrid mount, then the largest copy
+        candidates.sort(key=lambda row: (row[3] != release, not target.startswith(row[1] + "/"), -(row[2] or 0)))
+        return candidates[0][0]
+
+def like_prefix(path):
+    """LIKE pattern matching everything below path."""
+    return path.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "/%"
+
+def read_update_queue(path=UPDATE_QUEUE):
+    """Take the directories queued by the Zurg on_library_update hook."""
+    try:
+        claimed = f"{path}.{os.getpid()}"
+        os.replace(path, claimed)
+    except OSError:
+        return []
+    with open(claimed, "r", encoding="utf-8", errors="replace") as f:
+        updated = [line.rstrip("\n") for line in f if line.strip()]
+    os.unlink(claimed)
+    return updated
+
+def relink(index, catalog):
+    """Re-point broken symlinks at their target's current location. Returns how many were relinked."""
+    relinked = []
+    for path, target in index.broken_targets():
+        new_target = catalog.locate(target)
+        if not new_target or new_target == target or not os.path.exists(new_target):
+            continue
+        temporary = f"{path}.relink-{os.getpid()}"
+        try:
+            os.symlink(new_target, temporary)
+            os.replace(temporary, path)
+        except OSError as e:
+            print(f"  ⚠️  Could not relink {path}: {e}")
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            continue
+        relinked.append((new_target, time.time(), path))
+    index.set_targets(relinked)
+    return len(relinked)
+
+def update_catalog(updated):
+    """Apply library updates to the catalog (run from the Zurg hook)."""
+    catalog = ContentCatalog()
+    if not catalog.count():
+        print(f"📚 Catalogued {catalog.build()} files on the debrid mounts")
+    else:
+        print(f"📚 Re-listed {len(updated)} updated directories ({catalog.refresh(updated)} files)")
+    return True
+
+def watch_catalog(interval=CATALOG_POLL_INTERVAL):
+    """Apply queued library updates every interval seconds (decypharr-catalog service)."""
+    print(f"👀 Watching {UPDATE_QUEUE} for library updates every {interval}s")
+    # Build once at start; an empty mount must not trigger a full rebuild on every poll
+    try:
+        update_catalog([])
+    except Exception as e:
+        print(f"⚠️  Catalog build failed: {e}")
+    while True:
+        try:
+            updated = read_update_queue()
+            if updated:
+                update_catalog(updated)
+        except Exception as e:
+            print(f"⚠️  Catalog update failed: {e}")
+        sys.stdout.flush()
+        time.sleep(interval)
+
+def repair_symlinks(full=False, rebuild_catalog=False):
+    import requests
 
-def repair_symlinks():
     config_file = Path("/app/config/config.json")
     # Removed config.json existence check per user request
         
@@ -639,16 +1001,31 @@ def repair_symlinks():
     except Exception as e:
         print(f"⚠️  Could not trigger repair via API: {e}")
     
-    # Manual symlink check
-    symlink_dir = Path("/mnt/downloads/symlinks")
-    if symlink_dir.exists():
-        broken_links = []
-        for item in symlink_dir.rglob("*"):
-            if item.is_symlink() and not item.exists():
-                broken_links.append(item)
+    # Manual symlink check, incremental through the index
+    if Path(SYMLINK_ROOT).exists():
+        index = SymlinkIndex()
+        listed, unchanged = index.scan(SYMLINK_ROOT, full=full)
+        verified = index.verify(full=full)
+        print(f"🗂️  Indexed {index.count()} symlinks: listed {listed} changed directories, "
+              f"skipped {unchanged} unchanged, verified {verified} targets")
+        broken_links = index.broken()
                 
         if broken_links:
-            print(f"🔍 Found {len(broken_links)} broken symlinks")
+            print(f"🔍 Found {len(broken_links)} broken symlinks, looking for moved targets...")
+            catalog = ContentCatalog()
+            if rebuild_catalog or not catalog.count():
+                print(f"📚 Catalogued {catalog.build()} files on the debrid mounts")
+            else:
+                updated = read_update_queue()
+                if updated:
+                    catalog.refresh(updated)
+            relinked = relink(index, catalog)
+            if relinked:
+                print(f"🔗 Relinked {relinked} symlinks to their new location")
+            broken_links = index.broken()
+
+        if broken_links:
+            print(f"🔍 {len(broken_links)} broken symlinks have no match on the debrid mounts")
             for link in broken_links[:10]:  # Show first 10
                 print(f"  ❌ {link}")
             if len(broken_links) > 10:
@@ -659,7 +1036,22 @@ def repair_symlinks():
     return True
 
 if __name__ == "__main__":
-    repair_symlinks()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find and repair broken Decypharr symlinks")
+    parser.add_argument("--full", action="store_true", help="Re-list every directory and re-verify every target")
+    parser.add_argument("--rebuild-catalog", action="store_true", help="Re-walk the debrid mounts before relinking")
+    parser.add_argument("--catalog-update", nargs="*", metavar="DIR",
+                        help="Only update the catalog with these directories (Zurg on_library_update)")
+    parser.add_argument("--watch-catalog", action="store_true",
+                        help="Keep applying queued library updates to the catalog")
+    args = parser.parse_args()
+    if args.watch_catalog:
+        watch_catalog()
+    elif args.catalog_update is not None:
+        update_catalog(args.catalog_update + read_update_queue())
+    else:
+        repair_symlinks(full=args.full, rebuild_catalog=args.rebuild_catalog)
 '''
         
         with open(repair_script, 'w', encoding='utf-8') as f:
@@ -11,10 +11,11 @@ This script automatically configures Homepage dashboard with:
 
 import os
 import sys
-import yaml
-import xml.etree.ElementTree as ET
 from datetime import datetime
 
+import config_emitter
+import service_credentials
+
 class SurgeHomepageConfigurator:
     def __init__(self, storage_path=None):
         self.storage_path = storage_path or self.find_storage_path()
@@ -105,20 +106,7 @@ class SurgeHomepageConfigurator:
     
     def get_api_key_from_xml(self, config_path):
         """Extract API key from XML configuration file."""
-        try:
-            if not os.path.exists(config_path):
-                return None
-            
-            tree = ET.parse(config_path)
-            root = tree.getroot()
-            api_key_element = root.find('ApiKey')
-            
-            if api_key_element is not None and api_key_element.text:
-                return api_key_element.text.strip()
-        except Exception as e:
-            self.log(f"Error reading API key from {config_path}: {e}", "DEBUG")
-        
-        return None
+        return service_credentials.get_registry(self.storage_path).read(config_path, 'xml')
     
     def discover_service_api_keys(self):
         """Discover API keys from all services."""
@@ -209,10 +197,10 @@ class SurgeHomepageConfigurator:
         }
         
         settings_file = f"{self.homepage_config_dir}/settings.yaml"
-        with open(settings_file, 'w') as f:
-            yaml.dump(settings, f, default_flow_style=False, sort_keys=False)
-        
-        self.log(f"Settings configuration saved to {settings_file}", "SUCCESS")
+        if config_emitter.emit_yaml(settings_file, settings):
+            self.log(f"Settings configuration saved to {settings_file}", "SUCCESS")
+        else:
+            self.log(f"Settings configuration unchanged: {settings_file}", "INFO")
     
     def generate_services_yaml(self):
         """Generate homepage services.yaml configuration."""
@@ -409,10 +397,10 @@ class SurgeHomepageConfigurator:
             services['Monitoring & Tools'] = list(monitoring_services.values())
         
         services_file = f"{self.homepage_config_dir}/services.yaml"
-        with open(services_file, 'w') as f:
-            yaml.dump(services, f, default_flow_style=False, sort_keys=False)
-        
-        self.log(f"Services configuration saved to {services_file}", "SUCCESS")
+        if config_emitter.emit_yaml(services_file, services):
+            self.log(f"Services configuration saved to {services_file}", "SUCCESS")
+        else:
+            self.log(f"Services configuration unchanged: {services_file}", "INFO")
         return len(services)
     
     def generate_bookmarks_yaml(self):
@@ -468,10 +456,10 @@ class SurgeHomepageConfigurator:
             })
         
         bookmarks_file = f"{self.homepage_config_dir}/bookmarks.yaml"
-        with open(bookmarks_file, 'w') as f:
-            yaml.dump(bookmarks, f, default_flow_style=False, sort_keys=False)
-        
-        self.log(f"Bookmarks configuration saved to {bookmarks_file}", "SUCCESS")
+        if config_emitter.emit_yaml(bookmarks_file, bookmarks):
+            self.log(f"Bookmarks configuration saved to {bookmarks_file}", "SUCCESS")
+        else:
+            self.log(f"Bookmarks configuration unchanged: {bookmarks_file}", "INFO")
     
     def generate_docker_yaml(self):
         """Generate homepage docker.yaml configuration."""
@@ -484,10 +472,10 @@ class SurgeHomepageConfigurator:
         }
         
         docker_file = f"{self.homepage_config_dir}/docker.yaml"
-        with open(docker_file, 'w') as f:
-            yaml.dump(docker_config, f, default_flow_style=False, sort_keys=False)
-        
-        self.log(f"Docker configuration saved to {docker_file}", "SUCCESS")
+        if config_emitter.emit_yaml(docker_file, docker_config):
+            self.log(f"Docker configuration saved to {docker_file}", "SUCCESS")
+        else:
+            self.log(f"Docker configuration unchanged: {docker_file}", "INFO")
     
     def configure_homepage(self):
         """Main homepage configuration function."""
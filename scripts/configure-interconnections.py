@@ -15,69 +15,52 @@ import os
 import sys
 import json
 import time
-import xml.etree.ElementTree as ET
-import configparser
+import threading
 import requests
-import urllib.request
-import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 
-class SurgeInterconnectionManager:
-    def remove_existing_rdt_client(self, service):
-        """Remove any existing RDT-Client download client from the given service (radarr/sonarr)."""
-        api_key = self.api_keys.get(service)
-        if not api_key:
-            return
-        port = {'radarr': 7878, 'sonarr': 8989}[service]
-        url = f"http://localhost:{port}/api/v3/downloadclient"
-        headers = {
-            'X-Api-Key': api_key,
-            'Content-Type': 'application/json'
-        }
-        try:
-            resp = requests.get(url, headers=headers, timeout=10)
-            if resp.status_code == 200:
-                clients = resp.json()
-                for client in clients:
-                    if client.get('implementation') == 'RTorrent':
-                        del_url = f"{url}/{client['id']}"
-                        del_resp = requests.delete(del_url, headers=headers, timeout=10)
-                        if del_resp.status_code in [200, 204]:
-                            self.log(f"Removed existing RDT-Client from {service.title()}", "SUCCESS")
-                        else:
-                            self.log(f"Failed to remove RDT-Client from {service.title()}: {del_resp.status_code}", "WARNING")
-            else:
-                self.log(f"Failed to list download clients for {service.title()}: {resp.status_code}", "WARNING")
-        except Exception as e:
-            self.log(f"Error removing RDT-Client from {service.title()}: {e}", "ERROR")
-    def remove_existing_nzbget_client(self, service):
-        """Remove any existing NZBGet download client from the given service (radarr/sonarr)."""
-        api_key = self.api_keys.get(service)
-        if not api_key:
-            return
-        port = {'radarr': 7878, 'sonarr': 8989}[service]
-        url = f"http://localhost:{port}/api/v3/downloadclient"
-        headers = {
-            'X-Api-Key': api_key,
-            'Content-Type': 'application/json'
-        }
+import config_emitter
+import http_client
+import service_credentials
+
+class ReadinessBarrier:
+    """Probe several services at once and let callers wait on just the ones they need."""
+
+    def __init__(self, probe, service_ports):
+        self.probe = probe
+        self.service_ports = dict(service_ports)
+        self.ready = {}
+        self._events = {service: threading.Event() for service in self.service_ports}
+
+    def start(self):
+        """Launch one probe thread per service and return immediately."""
+        for service, port in self.service_ports.items():
+            thread = threading.Thread(target=self._run_probe, args=(service, port), daemon=True)
+            thread.start()
+        return self
+
+    def _run_probe(self, service, port):
         try:
-            resp = requests.get(url, headers=headers, timeout=10)
-            if resp.status_code == 200:
-                clients = resp.json()
-                for client in clients:
-                    if client.get('implementation') == 'NZBGet':
-                        del_url = f"{url}/{client['id']}"
-                        del_resp = requests.delete(del_url, headers=headers, timeout=10)
-                        if del_resp.status_code in [200, 204]:
-                            self.log(f"Removed existing NZBGet client from {service.title()}", "SUCCESS")
-                        else:
-                            self.log(f"Failed to remove NZBGet client from {service.title()}: {del_resp.status_code}", "WARNING")
-            else:
-                self.log(f"Failed to list download clients for {service.title()}: {resp.status_code}", "WARNING")
-        except Exception as e:
-            self.log(f"Error removing NZBGet client from {service.title()}: {e}", "ERROR")
+            self.ready[service] = bool(self.probe(service, port))
+        except Exception:
+            self.ready[service] = False
+        finally:
+            self._events[service].set()
+
+    def wait(self, services):
+        """Block until the given services finish probing. Returns True if all of them are ready."""
+        all_ready = True
+        for service in services:
+            event = self._events.get(service)
+            if event is None:
+                continue
+            event.wait()
+            all_ready = all_ready and self.ready.get(service, False)
+        return all_ready
+
+class SurgeInterconnectionManager:
     def update_nzbget_config_categories(self):
         """Directly update nzbget.conf to ensure Movies and TV categories have all required fields."""
         config_path = os.path.join(self.storage_path, "NZBGet/config/nzbget.conf")
@@ -150,6 +133,8 @@ class SurgeInterconnectionManager:
         
         # API keys storage
         self.api_keys = {}
+        self.credentials = service_credentials.get_registry(self.storage_path)
+        self._api_keys_lock = threading.Lock()
         
         self.log("Surge Interconnection Manager initialized", "INFO")
         self.log(f"Storage path: {self.storage_path}", "INFO")
@@ -226,7 +211,7 @@ class SurgeInterconnectionManager:
         
         for attempt in range(timeout):
             try:
-                response = requests.get(f"http://localhost:{port}", timeout=2)
+                response = http_client.get(f"http://localhost:{port}", timeout=2, retries=0)
                 if response.status_code < 500:
                     self.log(f"{service} is ready!", "SUCCESS")
                     return True
@@ -243,91 +228,50 @@ class SurgeInterconnectionManager:
     
     def get_api_key_from_xml(self, config_path):
         """Extract API key from XML configuration file."""
-        try:
-            if not os.path.exists(config_path):
-                return None
-            
-            tree = ET.parse(config_path)
-            root = tree.getroot()
-            api_key_element = root.find('ApiKey')
-            
-            if api_key_element is not None and api_key_element.text:
-                return api_key_element.text.strip()
-        except Exception as e:
-            self.log(f"Error reading API key from {config_path}: {e}", "ERROR")
-        
-        return None
+        return self.credentials.read(config_path, 'xml')
     
-    def discover_api_keys(self):
-        """Discover API keys for all enabled services."""
-        self.log("Discovering API keys...", "INFO")
-        
-        # Service config paths
-        config_paths = {
-            'radarr': f"{self.storage_path}/Radarr/config/config.xml",
-            'sonarr': f"{self.storage_path}/Sonarr/config/config.xml", 
-            'prowlarr': f"{self.storage_path}/Prowlarr/config/config.xml",
-            'bazarr': f"{self.storage_path}/Bazarr/config/config/config.yaml",
-            'overseerr': f"{self.storage_path}/Overseerr/config/settings.json",
-            'tautulli': f"{self.storage_path}/Tautulli/config/config.ini"
-        }
-        
-        # Get XML-based API keys
-        for service in ['radarr', 'sonarr', 'prowlarr']:
-            if service in self.enabled_services:
-                api_key = self.get_api_key_from_xml(config_paths[service])
-                if api_key:
-                    self.api_keys[service] = api_key
-                    self.log(f"Found {service} API key: {api_key[:8]}...", "SUCCESS")
-                else:
-                    self.log(f"Could not find {service} API key", "WARNING")
-        
-        # Get Bazarr API key from INI
-        if 'bazarr' in self.enabled_services:
-            self.api_keys['bazarr'] = self.get_bazarr_api_key()
-        
-        # Get Tautulli API key from INI
-        if 'tautulli' in self.enabled_services:
-            self.api_keys['tautulli'] = self.get_tautulli_api_key()
+    def discover_api_keys(self, services=None):
+        """Discover API keys for all enabled services, or only the given ones."""
+        if services is None:
+            self.log("Discovering API keys...", "INFO")
+            services = self.enabled_services
+        
+        # Configuration steps run concurrently, so only one of them reads a given key
+        with self._api_keys_lock:
+            for service in services:
+                if service not in self.enabled_services or self.api_keys.get(service):
+                    continue
+                
+                # Get XML-based API keys
+                if service in ['radarr', 'sonarr', 'prowlarr']:
+                    api_key = self.credentials.get(service)
+                    if api_key:
+                        self.api_keys[service] = api_key
+                        self.log(f"Found {service} API key: {api_key[:8]}...", "SUCCESS")
+                    else:
+                        self.log(f"Could not find {service} API key", "WARNING")
+                
+                # Get Bazarr API key from YAML
+                elif service == 'bazarr':
+                    self.api_keys['bazarr'] = self.get_bazarr_api_key()
+                
+                # Get Tautulli API key from INI
+                elif service == 'tautulli':
+                    self.api_keys['tautulli'] = self.get_tautulli_api_key()
     
     def get_bazarr_api_key(self):
         """Get Bazarr API key from config.yaml."""
-        config_path = f"{self.storage_path}/Bazarr/config/config/config.yaml"
-        
-        try:
-            if os.path.exists(config_path):
-                with open(config_path, 'r') as f:
-                    config = yaml.safe_load(f)
-                
-                # Bazarr API key is typically under 'auth' -> 'apikey'
-                if config and 'auth' in config and 'apikey' in config['auth']:
-                    api_key = config['auth']['apikey']
-                    if api_key:
-                        self.log(f"Found Bazarr API key: {api_key[:8]}...", "SUCCESS")
-                        return api_key
-        except Exception as e:
-            self.log(f"Error reading Bazarr config: {e}", "ERROR")
-        
-        return None
+        api_key = self.credentials.get('bazarr')
+        if api_key:
+            self.log(f"Found Bazarr API key: {api_key[:8]}...", "SUCCESS")
+        return api_key
     
     def get_tautulli_api_key(self):
         """Get Tautulli API key from config.ini."""
-        config_path = f"{self.storage_path}/Tautulli/config/config.ini"
-        
-        try:
-            if os.path.exists(config_path):
-                config = configparser.ConfigParser()
-                config.read(config_path)
-                
-                if config.has_section('General') and config.has_option('General', 'api_key'):
-                    api_key = config.get('General', 'api_key')
-                    if api_key:
-                        self.log(f"Found Tautulli API key: {api_key[:8]}...", "SUCCESS")
-                        return api_key
-        except Exception as e:
-            self.log(f"Error reading Tautulli config: {e}", "ERROR")
-        
-        return None
+        api_key = self.credentials.get('tautulli')
+        if api_key:
+            self.log(f"Found Tautulli API key: {api_key[:8]}...", "SUCCESS")
+        return api_key
     
     def configure_bazarr_connections(self):
         """Configure Bazarr connections to Radarr and Sonarr."""
@@ -382,7 +326,7 @@ class SurgeInterconnectionManager:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            response = http_client.post(url, json=payload, headers=headers, timeout=10)
             
             if response.status_code in [200, 201]:
                 self.log(f"✅ Bazarr ↔ {service.title()} connection configured", "SUCCESS")
@@ -392,18 +336,6 @@ class SurgeInterconnectionManager:
         except Exception as e:
             self.log(f"Error configuring Bazarr ↔ {service.title()}: {e}", "ERROR")
     
-    def configure_download_clients(self):
-        """Configure download clients in Radarr and Sonarr."""
-        self.log("Configuring download clients...", "INFO")
-        
-        # Configure NZBGet if enabled
-        if 'nzbget' in self.enabled_services:
-            self.configure_nzbget_clients()
-        
-        # Configure RDT-Client if enabled
-        if 'rdt-client' in self.enabled_services:
-            self.configure_rdt_clients()
-    
     def configure_nzbget_clients(self):
         """Configure NZBGet as download client in Radarr and Sonarr, ensuring categories exist."""
         self.update_nzbget_config_categories()
@@ -412,7 +344,6 @@ class SurgeInterconnectionManager:
         nzbget_pass = os.environ.get('NZBGET_PASS', 'password')
         for service in ['radarr', 'sonarr']:
             if service in self.enabled_services and service in self.api_keys:
-                self.remove_existing_nzbget_client(service)
                 category_field = 'movieCategory' if service == 'radarr' else 'tvCategory'
                 category_value = 'Movies' if service == 'radarr' else 'TV'
                 nzbget_config = {
@@ -430,7 +361,7 @@ class SurgeInterconnectionManager:
                         {'name': category_field, 'value': category_value}
                     ]
                 }
-                self.add_download_client(service, nzbget_config)
+                self.reconcile_download_client(service, nzbget_config)
             elif service in self.enabled_services:
                 self.log(f"NZBGet integration: Missing API key for {service}. Cannot add NZBGet as download client.", "ERROR")
 
@@ -449,7 +380,7 @@ class SurgeInterconnectionManager:
         import time
         max_retries = 3
         try:
-            response = requests.post(url, json=get_payload, headers=headers, auth=(user, password), timeout=10)
+            response = http_client.post(url, json=get_payload, headers=headers, auth=(user, password), timeout=10)
             if response.status_code == 200:
                 result = response.json().get('result', [])
                 # Only treat items as categories if they have 'Name' and at least one category-specific field
@@ -479,7 +410,7 @@ class SurgeInterconnectionManager:
                     }
                     for attempt in range(max_retries):
                         try:
-                            remove_resp = requests.post(url, json=remove_payload, headers=headers, auth=(user, password), timeout=10)
+                            remove_resp = http_client.post(url, json=remove_payload, headers=headers, auth=(user, password), timeout=10)
                             if remove_resp.status_code == 200:
                                 self.log(f"✅ NZBGet category '{category}' removed", "SUCCESS")
                                 break
@@ -511,7 +442,7 @@ class SurgeInterconnectionManager:
                         }
                         for attempt in range(max_retries):
                             try:
-                                add_resp = requests.post(url, json=add_payload, headers=headers, auth=(user, password), timeout=10)
+                                add_resp = http_client.post(url, json=add_payload, headers=headers, auth=(user, password), timeout=10)
                                 if add_resp.status_code == 200:
                                     self.log(f"✅ NZBGet category '{category}' created", "SUCCESS")
                                     break
@@ -531,7 +462,7 @@ class SurgeInterconnectionManager:
                     "params": [],
                     "id": 1
                 }
-                reload_resp = requests.post(url, json=reload_payload, headers=headers, auth=(user, password), timeout=10)
+                reload_resp = http_client.post(url, json=reload_payload, headers=headers, auth=(user, password), timeout=10)
                 if reload_resp.status_code == 200:
                     self.log("✅ NZBGet configuration reloaded", "SUCCESS")
                 else:
@@ -563,16 +494,106 @@ class SurgeInterconnectionManager:
                         {'name': 'password', 'value': 'password'}
                     ]
                 }
-                self.remove_existing_rdt_client(service)
-                self.add_download_client(service, rdt_config)
+                # Older Surge versions registered RDT-Client through the rTorrent implementation
+                self.reconcile_download_client(service, rdt_config, replaces=['RTorrent'])
+    
+    def download_client_differs(self, existing, desired):
+        """Compare an existing download client with the desired spec, field by field."""
+        for key, value in desired.items():
+            if key != 'fields' and existing.get(key) != value:
+                return True
+        existing_fields = {field.get('name'): field.get('value') for field in existing.get('fields', [])}
+        for field in desired.get('fields', []):
+            current = existing_fields.get(field['name'])
+            # The *arr APIs mask stored passwords, so a masked value cannot be compared
+            if current == '********':
+                continue
+            if current != field['value']:
+                return True
+        return False
+    
+    def reconcile_download_client(self, service, config, replaces=()):
+        """
+        Bring a download client in line with config using the fewest API calls:
+        one GET, then a PUT, POST or DELETE only where something actually differs.
+        A client is ours if it has config's implementation and either its name or
+        its host. Clients of an implementation listed in replaces that point at the
+        same host are legacy registrations: the new client is added, then they are
+        deleted, since a client's implementation cannot be changed in place.
+        """
+        api_key = self.api_keys.get(service)
+        if not api_key:
+            return
+        port = {'radarr': 7878, 'sonarr': 8989}[service]
+        url = f"http://localhost:{port}/api/v3/downloadclient"
+        headers = {'X-Api-Key': api_key}
+        host = next((field['value'] for field in config.get('fields', []) if field['name'] == 'host'), None)
+
+        def client_host(client):
+            return next((field.get('value') for field in client.get('fields', []) if field.get('name') == 'host'), None)
+
+        try:
+            resp = http_client.get(url, headers=headers, timeout=10)
+            if resp.status_code != 200:
+                self.log(f"Failed to list download clients for {service.title()}: {resp.status_code}", "WARNING")
+                return
+            clients = resp.json()
+            matches = [
+                client for client in clients
+                if client.get('implementation') == config['implementation']
+                and (client.get('name') == config['name'] or client_host(client) == host)
+            ]
+            legacy = [
+                client for client in clients
+                if client.get('implementation') in replaces and host and client_host(client) == host
+            ]
+
+            # Legacy clients are only removed once their replacement exists
+            if not matches and not self.add_download_client(service, config):
+                return
+            current, duplicates = (matches[0], matches[1:]) if matches else (None, [])
+            for client in duplicates + legacy:
+                del_resp = http_client.delete(f"{url}/{client['id']}", headers=headers, timeout=10)
+                kind = 'legacy' if client in legacy else 'duplicate'
+                if del_resp.status_code in [200, 204]:
+                    self.log(f"Removed {kind} {client.get('name')} client from {service.title()}", "SUCCESS")
+                else:
+                    self.log(f"Failed to remove {kind} {client.get('name')} client from {service.title()}: {del_resp.status_code}", "WARNING")
+            if current is None:
+                return
+            
+            if not self.download_client_differs(current, config):
+                self.log(f"{config['name']} already up to date in {service.title()}", "SUCCESS")
+                return
+            
+            # Update in place so the client keeps its ID and in-flight grabs are untouched
+            updated = dict(current)
+            updated.update({key: value for key, value in config.items() if key != 'fields'})
+            fields = [dict(field) for field in current.get('fields', [])]
+            field_index = {field.get('name'): field for field in fields}
+            for field in config.get('fields', []):
+                if field['name'] in field_index:
+                    field_index[field['name']]['value'] = field['value']
+                else:
+                    fields.append(dict(field))
+            updated['fields'] = fields
+            
+            put_resp = http_client.put(f"{url}/{current['id']}", json=updated, headers=headers, timeout=10)
+            if put_resp.status_code in [200, 202]:
+                self.log(f"✅ {config['name']} updated in {service.title()}", "SUCCESS")
+            else:
+                self.log(f"Failed to update {config['name']} in {service.title()}: {put_resp.status_code}", "WARNING")
+                self.log(f"Response body: {put_resp.text}", "DEBUG")
+        except Exception as e:
+            self.log(f"Error reconciling {config['name']} in {service.title()}: {e}", "ERROR")
     
     def add_download_client(self, service, config):
-        """Add download client to service via API."""
+        """Add download client to service via API. Returns True if it was added."""
         import traceback
         try:
             api_key = self.api_keys.get(service)
             if not api_key:
-                return
+                return False
 
             # Use localhost for API calls since the script runs on the host
             port = {'radarr': 7878, 'sonarr': 8989}[service]
@@ -583,19 +604,21 @@ class SurgeInterconnectionManager:
                 'Content-Type': 'application/json'
             }
 
-            response = requests.post(url, json=config, headers=headers, timeout=10)
+            response = http_client.post(url, json=config, headers=headers, timeout=10)
 
             if response.status_code in [200, 201]:
                 self.log(f"✅ {config['name']} configured in {service.title()}", "SUCCESS")
-            else:
-                self.log(f"Failed to configure {config['name']} in {service.title()}: {response.status_code}", "WARNING")
-                self.log(f"Payload sent: {json.dumps(config)}", "DEBUG")
-                self.log(f"Response body: {response.text}", "DEBUG")
+                return True
+            self.log(f"Failed to configure {config['name']} in {service.title()}: {response.status_code}", "WARNING")
+            self.log(f"Payload sent: {json.dumps(config)}", "DEBUG")
+            self.log(f"Response body: {response.text}", "DEBUG")
+            return False
 
         except Exception as e:
             self.log(f"Error configuring download client in {service}: {e}", "ERROR")
             self.log(f"Payload sent: {json.dumps(config)}", "DEBUG")
             self.log(f"Traceback: {traceback.format_exc()}", "ERROR")
+            return False
     
     def configure_gaps_integration(self):
         """Configure GAPS integration with Plex and Radarr."""
@@ -621,8 +644,7 @@ class SurgeInterconnectionManager:
         }
         
         config_file = f"{gaps_config_dir}/application.yml"
-        with open(config_file, 'w') as f:
-            f.write(f"""# GAPS Configuration - Auto-generated
+        changed = config_emitter.write_if_changed(config_file, f"""# GAPS Configuration - Auto-generated
 server:
   port: 8484
 
@@ -641,13 +663,16 @@ radarr:
   rootFolderPath: /movies
 """)
         
-        self.log("✅ GAPS configuration created", "SUCCESS")
+        if changed:
+            self.log("✅ GAPS configuration created", "SUCCESS")
+        else:
+            self.log("GAPS configuration unchanged", "INFO")
     
     def configure_all_interconnections(self):
         """Configure all service interconnections."""
         self.log("Starting comprehensive service interconnection configuration...", "INFO")
         
-        # Wait for services to be ready
+        # Probe every enabled service at once instead of one after another
         service_ports = {
             'radarr': 7878,
             'sonarr': 8989,
@@ -659,21 +684,45 @@ radarr:
             'rdt-client': 6500,
             'gaps': 8484
         }
+        barrier = ReadinessBarrier(self.wait_for_service, {
+            service: service_ports[service]
+            for service in self.enabled_services if service in service_ports
+        }).start()
+        
+        # Each step starts as soon as its own dependencies are ready
+        steps = [
+            ("Bazarr connections", self.configure_bazarr_connections, ['bazarr', 'radarr', 'sonarr']),
+            ("GAPS integration", self.configure_gaps_integration, ['gaps', 'radarr'])
+        ]
+        if 'nzbget' in self.enabled_services:
+            steps.append(("NZBGet download clients", self.configure_nzbget_clients, ['nzbget', 'radarr', 'sonarr']))
+        if 'rdt-client' in self.enabled_services:
+            steps.append(("RDT-Client download clients", self.configure_rdt_clients, ['rdt-client', 'radarr', 'sonarr']))
         
-        for service in self.enabled_services:
-            if service in service_ports:
-                self.wait_for_service(service, service_ports[service])
-        
-        # Discover API keys
+        with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+            futures = {
+                executor.submit(self.run_when_ready, barrier, name, step, dependencies): name
+                for name, step, dependencies in steps
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self.log(f"{futures[future]} failed: {e}", "ERROR")
+        
+        # Pick up keys for services no step depended on (e.g. Prowlarr, Tautulli)
+        barrier.wait(barrier.service_ports)
         self.discover_api_keys()
         
-        # Configure interconnections
-        self.configure_bazarr_connections()
-        self.configure_download_clients()
-        self.configure_gaps_integration()
-        
         self.log("✅ All interconnections configured successfully!", "SUCCESS")
     
+    def run_when_ready(self, barrier, name, step, dependencies):
+        """Wait for a step's dependencies, discover their API keys, then run the step."""
+        if not barrier.wait(dependencies):
+            self.log(f"Not all dependencies of {name} are ready, configuring anyway", "WARNING")
+        self.discover_api_keys(dependencies)
+        step()
+    
     def show_configuration_summary(self):
         """Show summary of configured connections."""
         self.log("=== Configuration Summary ===", "INFO")
@@ -691,6 +740,10 @@ radarr:
             self.log("GAPS ↔ Plex/Radarr: Collection gap analysis", "INFO")
         
         self.log("All configured services should now work together automatically!", "SUCCESS")
+        
+        for endpoint, stats in sorted(http_client.get_latency_stats().items()):
+            self.log(f"HTTP {endpoint}: {stats['count']} requests, avg {stats['avg_ms']:.0f} ms, "
+                     f"max {stats['max_ms']:.0f} ms, {stats['errors']} errors", "DEBUG")
 
 def main():
     """Main execution function."""
@@ -7,11 +7,12 @@ Configures Kometa (formerly Plex Meta Manager) with Plex connection and optimal
 
 import os
 import sys
-import yaml
 import subprocess
 from datetime import datetime
 from pathlib import Path
 
+import config_emitter
+
 class KometaConfigurator:
     def __init__(self, storage_path=None):
         # Explicitly load and export variables from the main .env in the project folder
@@ -115,16 +116,10 @@ class KometaConfigurator:
                 },
             }
         }
-        with open(streaming_path, 'w') as f:
-            yaml.dump(streaming_content, f, default_flow_style=False, sort_keys=False)
-        self.log(f"Streaming.yml written to {streaming_path}", "SUCCESS")
-        # Remove any existing config.yml before generating new one
-        if os.path.exists(self.config_file):
-            try:
-                os.remove(self.config_file)
-                self.log("Removed existing config.yml before generating new one.", "INFO")
-            except Exception as e:
-                self.log(f"Failed to remove existing config.yml: {e}", "WARNING")
+        if config_emitter.emit_yaml(streaming_path, streaming_content):
+            self.log(f"Streaming.yml written to {streaming_path}", "SUCCESS")
+        else:
+            self.log(f"Streaming.yml unchanged: {streaming_path}", "INFO")
         # Now create criterion.yml
         criterion_path = os.path.join(self.config_dir, 'criterion.yml')
         criterion_content = {
@@ -137,9 +132,8 @@ class KometaConfigurator:
                 }
             }
         }
-        with open(criterion_path, 'w') as f:
-            yaml.dump(criterion_content, f, default_flow_style=False, sort_keys=False)
-        self.log(f"criterion.yml written to {criterion_path}", "SUCCESS")
+        if config_emitter.emit_yaml(criterion_path, criterion_content):
+            self.log(f"criterion.yml written to {criterion_path}", "SUCCESS")
         
 
         # Build config dictionary exactly matching the provided example
@@ -644,9 +638,10 @@ class KometaConfigurator:
             },
         }
         # Write config file with correct formatting
-        with open(self.config_file, 'w') as f:
-            yaml.dump(config, f, default_flow_style=False, sort_keys=False)
-        self.log("✅ Kometa config generated with full example structure and env API keys", "SUCCESS")
+        if config_emitter.emit_yaml(self.config_file, config):
+            self.log("✅ Kometa config generated with full example structure and env API keys", "SUCCESS")
+        else:
+            self.log("Kometa config already up to date", "INFO")
         self.log(f"Config file: {self.config_file}", "INFO")
         # Write criterion.yml in the config directory
         criterion_path = os.path.join(self.config_dir, 'criterion.yml')
@@ -660,10 +655,10 @@ class KometaConfigurator:
                 }
             }
         }
-        with open(criterion_path, 'w') as f:
-            yaml.dump(criterion_content, f, default_flow_style=False, sort_keys=False)
-        self.log(f"criterion.yml written to {criterion_path}", "SUCCESS")
-        self.log("Restart Kometa to apply changes", "INFO")
+        if config_emitter.emit_yaml(criterion_path, criterion_content):
+            self.log(f"criterion.yml written to {criterion_path}", "SUCCESS")
+        if config_emitter.changed_files():
+            self.log("Restart Kometa to apply changes", "INFO")
 
 def main():
     storage_path = sys.argv[1] if len(sys.argv) > 1 else None
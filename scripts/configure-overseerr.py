@@ -9,9 +9,10 @@ import os
 import sys
 import json
 import uuid
-import xml.etree.ElementTree as ET
 import configparser
 
+import service_credentials
+
 class OverseerrConfigurator:
     def __init__(self, storage_path=None):
         self.project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -27,30 +28,12 @@ class OverseerrConfigurator:
     def get_radarr_api_key(self):
         """Get Radarr API key from config.xml."""
         config_path = os.path.join(self.project_root, 'config', 'radarr', 'config.xml')
-        if os.path.exists(config_path):
-            try:
-                tree = ET.parse(config_path)
-                root = tree.getroot()
-                api_key_element = root.find('ApiKey')
-                if api_key_element is not None and api_key_element.text:
-                    return api_key_element.text.strip()
-            except Exception as e:
-                self.log(f"Error reading Radarr config: {e}", "ERROR")
-        return None
+        return service_credentials.get_registry(self.storage_path).read(config_path, 'xml')
     
     def get_sonarr_api_key(self):
         """Get Sonarr API key from config.xml."""
         config_path = os.path.join(self.project_root, 'config', 'sonarr', 'config.xml')
-        if os.path.exists(config_path):
-            try:
-                tree = ET.parse(config_path)
-                root = tree.getroot()
-                api_key_element = root.find('ApiKey')
-                if api_key_element is not None and api_key_element.text:
-                    return api_key_element.text.strip()
-            except Exception as e:
-                self.log(f"Error reading Sonarr config: {e}", "ERROR")
-        return None
+        return service_credentials.get_registry(self.storage_path).read(config_path, 'xml')
     
     def get_or_create_tautulli_api_key(self):
         """Get or create Tautulli API key from config.ini."""
@@ -61,18 +44,16 @@ class OverseerrConfigurator:
             return None
             
         try:
-            config = configparser.ConfigParser()
-            config.read(config_path)
-            
             # Check if API key already exists
-            if config.has_section('General') and config.has_option('General', 'api_key'):
-                api_key = config.get('General', 'api_key')
-                if api_key and api_key.strip():
-                    self.log(f"Found existing Tautulli API key: {api_key[:8]}...")
-                    return api_key.strip()
+            api_key = service_credentials.get_registry(self.storage_path).read(config_path, 'tautulli')
+            if api_key:
+                self.log(f"Found existing Tautulli API key: {api_key[:8]}...")
+                return api_key
             
             # Generate new API key
             new_api_key = self.generate_api_key()
+            config = configparser.ConfigParser()
+            config.read(config_path)
             
             # Ensure General section exists
             if not config.has_section('General'):
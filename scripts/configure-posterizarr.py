@@ -11,12 +11,13 @@ This script automatically configures Posterizarr with:
 
 import os
 import sys
-import yaml
-import xml.etree.ElementTree as ET
 import requests
 import time
 from datetime import datetime
 
+import config_emitter
+import service_credentials
+
 class SurgePosterizarrConfigurator:
     def __init__(self, storage_path=None):
         self.storage_path = storage_path or self.find_storage_path()
@@ -92,20 +93,7 @@ class SurgePosterizarrConfigurator:
     
     def get_api_key_from_xml(self, config_path):
         """Extract API key from XML configuration file."""
-        try:
-            if not os.path.exists(config_path):
-                return None
-            
-            tree = ET.parse(config_path)
-            root = tree.getroot()
-            api_key_element = root.find('ApiKey')
-            
-            if api_key_element is not None and api_key_element.text:
-                return api_key_element.text.strip()
-        except Exception as e:
-            self.log(f"Error reading API key from {config_path}: {e}", "DEBUG")
-        
-        return None
+        return service_credentials.get_registry(self.storage_path).read(config_path, 'xml')
     
     def discover_service_api_keys(self):
         """Discover API keys from Radarr and Sonarr."""
@@ -275,10 +263,10 @@ class SurgePosterizarrConfigurator:
             self.log("TVDB API key not found - TVDB source disabled", "WARNING")
         
         config_file = f"{self.posterizarr_config_dir}/config.yaml"
-        with open(config_file, 'w') as f:
-            yaml.dump(config, f, default_flow_style=False, sort_keys=False)
-        
-        self.log(f"Configuration saved to {config_file}", "SUCCESS")
+        if config_emitter.emit_yaml(config_file, config):
+            self.log(f"Configuration saved to {config_file}", "SUCCESS")
+        else:
+            self.log(f"Configuration unchanged: {config_file}", "INFO")
         return config_file
     
     def create_example_overlays(self):
@@ -329,10 +317,10 @@ class SurgePosterizarrConfigurator:
         }
         
         overlay_file = f"{overlays_dir}/overlays.yaml"
-        with open(overlay_file, 'w') as f:
-            yaml.dump(overlay_config, f, default_flow_style=False, sort_keys=False)
-        
-        self.log(f"Example overlays created at {overlay_file}", "SUCCESS")
+        if config_emitter.emit_yaml(overlay_file, overlay_config):
+            self.log(f"Example overlays created at {overlay_file}", "SUCCESS")
+        else:
+            self.log(f"Example overlays unchanged: {overlay_file}", "INFO")
     
     def test_posterizarr_connections(self):
         """Test Posterizarr connections to Radarr and Sonarr."""
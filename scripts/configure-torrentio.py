@@ -20,9 +20,11 @@ import os
 import sys
 import json
 import time
-import urllib.request
 from datetime import datetime
 
+import http_client
+import service_credentials
+
 class TorrentioConfigurator:
     """Torrentio indexer configuration for Prowlarr only."""
 
@@ -57,31 +59,16 @@ class TorrentioConfigurator:
         sys.stdout.flush()
 
     def get_api_key_from_xml(self, config_path):
-        try:
-            if not os.path.exists(config_path):
-                return None
-            with open(config_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            start_tag, end_tag = '<ApiKey>', '</ApiKey>'
-            start_idx = content.find(start_tag)
-            if start_idx != -1:
-                start_idx += len(start_tag)
-                end_idx = content.find(end_tag, start_idx)
-                if end_idx != -1:
-                    return content[start_idx:end_idx].strip()
-        except Exception as e:
-            self.log(f"Error reading API key from {os.path.basename(config_path)}: {e}", "WARNING")
-        return None
+        return service_credentials.get_registry(self.storage_path).read(config_path, 'xml')
 
     def wait_for_service(self, service_url, service_name="service", max_attempts=20, delay=5):
         self.log(f"⏳ Waiting for {service_name} to be ready...")
         for attempt in range(max_attempts):
             try:
-                req = urllib.request.Request(service_url, timeout=10)
-                with urllib.request.urlopen(req) as response:
-                    if response.status == 200:
-                        self.log(f"✅ {service_name} is ready")
-                        return True
+                response = http_client.get(service_url, timeout=10, retries=0)
+                if response.status_code == 200:
+                    self.log(f"✅ {service_name} is ready")
+                    return True
             except Exception:
                 pass
             if attempt < max_attempts - 1:
@@ -114,22 +101,17 @@ class TorrentioConfigurator:
         }
         try:
             indexer_url = f"{self.prowlarr_url}/api/v1/indexer"
-            data = json.dumps(torrentio_config).encode('utf-8')
-            req = urllib.request.Request(
+            response = http_client.post(
                 indexer_url,
-                data=data,
-                headers={
-                    'Content-Type': 'application/json',
-                    'X-Api-Key': prowlarr_api_key
-                },
-                method='POST'
+                json=torrentio_config,
+                headers={'X-Api-Key': prowlarr_api_key},
+                timeout=15
             )
-            with urllib.request.urlopen(req, timeout=15) as response:
-                if response.status in [200, 201]:
-                    self.log("✅ Torrentio indexer configured successfully")
-                    return True
-                else:
-                    self.log(f"❌ Failed to configure Torrentio (HTTP {response.status})", "ERROR")
+            if response.status_code in [200, 201]:
+                self.log("✅ Torrentio indexer configured successfully")
+                return True
+            else:
+                self.log(f"❌ Failed to configure Torrentio (HTTP {response.status_code})", "ERROR")
         except Exception as e:
             self.log(f"❌ Error configuring Torrentio indexer: {e}", "ERROR")
         return False
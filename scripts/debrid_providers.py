@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Surge Debrid Provider Adapters
+
+One adapter per debrid service turns its account endpoint into a common
+result (username, premium status, expiry). validate_accounts() checks
+every configured provider concurrently and caches successful results for
+a TTL, so re-running configuration doesn't call each provider again.
+
+Each provider's API base URL can be overridden with
+SURGE_<PROVIDER>_API_URL (e.g. SURGE_TORBOX_API_URL=http://127.0.0.1:8080)
+to point validation at a local stand-in.
+"""
+
+import os
+import abc
+import json
+import time
+import hashlib
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_client
+
+CACHE_TTL = int(os.environ.get('SURGE_DEBRID_CACHE_TTL', '3600'))
+VALIDATION_TIMEOUT = 10
+
+class DebridError(Exception):
+    """Raised when a provider rejects the API key or returns an unexpected response."""
+
+class DebridProvider(abc.ABC):
+    """Base adapter: subclasses set name/label/default_url and implement account()."""
+
+    name = None
+    label = None
+    default_url = None
+
+    @property
+    def base_url(self):
+        return os.environ.get(f"SURGE_{self.name.upper()}_API_URL", self.default_url).rstrip('/')
+
+    def get(self, path, api_key, params=None):
+        """GET an endpoint with bearer auth and return the decoded JSON."""
+        response = http_client.get(f"{self.base_url}{path}", params=params, timeout=VALIDATION_TIMEOUT,
+                                   headers={'Authorization': f'Bearer {api_key}'})
+        if response.status_code in (401, 403):
+            raise DebridError(f"authentication failed ({response.status_code})")
+        if response.status_code != 200:
+            raise DebridError(f"request failed ({response.status_code})")
+        try:
+            return response.json()
+        except ValueError:
+            raise DebridError("invalid JSON response")
+
+    @abc.abstractmethod
+    def account(self, api_key):
+        """Return {'username', 'premium', 'expires'} for an API key."""
+
+class RealDebridProvider(DebridProvider):
+    name = 'realdebrid'
+    label = 'Real-Debrid'
+    default_url = 'https://api.real-debrid.com/rest/1.0'
+
+    def account(self, api_key):
+        user = self.get('/user', api_key)
+        return {
+            'username': user.get('username', 'Unknown'),
+            'premium': user.get('type') == 'premium',
+            'expires': user.get('expiration'),
+        }
+
+class AllDebridProvider(DebridProvider):
+    name = 'alldebrid'
+    label = 'AllDebrid'
+    default_url = 'https://api.alldebrid.com/v4'
+
+    def account(self, api_key):
+        # Key in the Bearer header only, so it never shows up in logged URLs
+        data = self.get('/user', api_key, params={'agent': 'surge'})
+        if data.get('status') != 'success':
+            error = data.get('error') or {}
+            raise DebridError(f"API error - {error.get('message', error) if isinstance(error, dict) else error}")
+        user = data.get('data', {}).get('user', {})
+        premium_until = user.get('premiumUntil') or 0
+        return {
+            'username': user.get('username', 'Unknown'),
+            'premium': bool(user.get('isPremium')),
+            'expires': datetime.fromtimestamp(premium_until, timezone.utc).isoformat() if premium_until else None,
+        }
+
+class DebridLinkProvider(DebridProvider):
+    name = 'debridlink'
+    label = 'Debrid-Link'
+    default_url = 'https://debrid-link.com/api/v2'
+
+    def account(self, api_key):
+        data = self.get('/account/infos', api_key)
+        if not data.get('success'):
+            raise DebridError(f"API error - {data.get('error', 'Unknown')}")
+        info = data.get('value', {})
+        premium_left = info.get('premiumLeft') or 0
+        return {
+            'username': info.get('pseudo', 'Unknown'),
+            'premium': info.get('accountType') == 1 or premium_left > 0,
+            'expires': datetime.fromtimestamp(time.time() + premium_left, timezone.utc).isoformat() if premium_left > 0 else None,
+        }
+
+class TorBoxProvider(DebridProvider):
+    name = 'torbox'
+    label = 'TorBox'
+    default_url = 'https://api.torbox.app/v1/api'
+
+    def account(self, api_key):
+        data = self.get('/user/me', api_key)
+        if not data.get('success'):
+            raise DebridError(f"API error - {data.get('detail') or data.get('error', 'Unknown')}")
+        user = data.get('data') or {}
+        return {
+            'username': user.get('email', 'Unknown'),
+            'premium': bool(user.get('plan')),
+            'expires': user.get('premium_expires_at'),
+        }
+
+PROVIDERS = {provider.name: provider for provider in
+             (RealDebridProvider(), AllDebridProvider(), DebridLinkProvider(), TorBoxProvider())}
+
+def register_provider(provider):
+    """Add or replace a provider adapter."""
+    PROVIDERS[provider.name] = provider
+
+def default_cache_path():
+    """Return $SURGE_DEBRID_CACHE or ~/.cache/surge/debrid-accounts.json."""
+    return os.environ.get('SURGE_DEBRID_CACHE') or os.path.expanduser('~/.cache/surge/debrid-accounts.json')
+
+def _cache_key(name, api_key):
+    # Never store the key itself
+    return f"{name}:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}"
+
+def _load_cache(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(path, cache):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def _check(provider, api_key):
+    try:
+        return {'ok': True, **provider.account(api_key)}
+    except DebridError as e:
+        return {'ok': False, 'error': str(e)}
+    except requests.exceptions.RequestException as e:
+        return {'ok': False, 'error': f"Network error - {type(e).__name__}"}
+    except Exception as e:
+        return {'ok': False, 'error': f"Unexpected error - {type(e).__name__}"}
+
+def validate_accounts(api_keys, ttl=CACHE_TTL, cache_path=None):
+    """
+    Validate {provider name: api_key} concurrently.
+
+    Returns {name: {'ok', 'username', 'premium', 'expires', 'cached'} or
+    {'ok': False, 'error'}}. Successful results younger than ttl seconds
+    are served from the cache; failures are always re-checked.
+    """
+    cache_path = cache_path or default_cache_path()
+    cache = _load_cache(cache_path)
+    now = time.time()
+    results = {}
+    pending = {}
+    for name, api_key in api_keys.items():
+        if not api_key:
+            continue
+        provider = PROVIDERS.get(name)
+        if provider is None:
+            results[name] = {'ok': False, 'error': 'no provider adapter'}
+            continue
+        entry = cache.get(_cache_key(name, api_key))
+        if entry and now - entry.get('checked_at', 0) < ttl:
+            results[name] = dict(entry['result'], cached=True)
+        else:
+            pending[name] = (provider, api_key)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            futures = {name: executor.submit(_check, provider, api_key) for name, (provider, api_key) in pending.items()}
+        for name, future in futures.items():
+            result = future.result()
+            results[name] = dict(result, cached=False)
+            key = _cache_key(name, pending[name][1])
+            if result['ok']:
+                cache[key] = {'checked_at': now, 'result': result}
+            else:
+                cache.pop(key, None)
+        _save_cache(cache_path, cache)
+    return results
@@ -334,6 +334,17 @@ show_usage() {
     echo "  $0 --status          # Show service status"
 }
 
+# Apply restarts still queued when a deployment exits early (error or exit 1),
+# then remove the run's intent and config-change files
+flush_restart_queue_on_exit() {
+    if [ -n "${SURGE_RESTART_QUEUE:-}" ]; then
+        print_warning "Deployment stopped early; restarting services whose configuration already changed..."
+        python3 "$SCRIPT_DIR/restart_coordinator.py" --project-dir "$PROJECT_DIR" flush || true
+        rm -f "$SURGE_RESTART_QUEUE" "${SURGE_CONFIG_CHANGES:-}"
+        unset SURGE_RESTART_QUEUE SURGE_CONFIG_CHANGES
+    fi
+}
+
 # Deploy services
 deploy_services() {
     local media_server=$1
@@ -386,7 +397,7 @@ deploy_services() {
 
     # Dynamically build PROFILES list from ENABLE_* variables in .env
     PROFILES="$media_server pangolin"
-    for service in "RADARR" "SONARR" "BAZARR" "PROWLARR" "ZURG" "DECYPHARR" "KOMETA" "POSTERIZARR" "OVERSEERR" "TAUTULLI" "CINESYNC" "PLACEHOLDARR" "GAPS" "HOMEPAGE" "SCANLY" "PARSELY"; do
+    for service in "RADARR" "SONARR" "BAZARR" "PROWLARR" "ZURG" "DECYPHARR" "DECYPHARR_CATALOG" "KOMETA" "POSTERIZARR" "OVERSEERR" "TAUTULLI" "CINESYNC" "PLACEHOLDARR" "GAPS" "HOMEPAGE" "SCANLY" "PARSELY"; do
         var_name="ENABLE_${service}"
         if grep -q "^$var_name=" "$PROJECT_DIR/.env"; then
             enabled=$(grep "^$var_name=" "$PROJECT_DIR/.env" | cut -d'=' -f2 | tr -d '\n\r')
@@ -426,12 +437,21 @@ deploy_services() {
     fi
 
     print_info "Starting deployment (phase 1: all services except Decypharr) with profiles:$COMPOSE_PROFILE_FLAGS"
-    # Remove Decypharr from profiles for phase 1
-    PHASE1_PROFILE_FLAGS=$(echo "$COMPOSE_PROFILE_FLAGS" | sed 's/--profile decypharr//g')
+    # Remove Decypharr (and its catalog service) from profiles for phase 1
+    PHASE1_PROFILE_FLAGS=$(echo "$COMPOSE_PROFILE_FLAGS" | sed -E 's/--profile decypharr(-catalog)?( |$)/\2/g')
     eval docker compose $COMPOSE_FILES $PHASE1_PROFILE_FLAGS up -d
 
     print_success "Phase 1: All services except Decypharr deployed successfully!"
 
+    # Configurators only record restarts and changed config files from here on;
+    # each affected container is restarted once at the end of the run
+    export SURGE_RESTART_QUEUE="$PROJECT_DIR/logs/restart-intents.$$"
+    export SURGE_CONFIG_CHANGES="$PROJECT_DIR/logs/config-changes.$$"
+    mkdir -p "$PROJECT_DIR/logs"
+    : > "$SURGE_RESTART_QUEUE"
+    : > "$SURGE_CONFIG_CHANGES"
+    trap flush_restart_queue_on_exit EXIT
+
     # If Prowlarr is enabled, run Torrentio indexer configuration immediately (no health/retry check)
     ENABLE_PROWLARR=$(grep "^ENABLE_PROWLARR=" "$PROJECT_DIR/.env" 2>/dev/null | cut -d'=' -f2 | tr -d '\n\r' || echo "false")
     if [ "$ENABLE_PROWLARR" = "true" ]; then
@@ -510,7 +530,12 @@ deploy_services() {
             exit 1
         fi
         print_info "Starting Decypharr container (phase 2)"
-        eval docker compose $COMPOSE_FILES --profile decypharr up -d
+        DECYPHARR_PROFILE_FLAGS="--profile decypharr"
+        if echo "$PROFILES" | grep -q "decypharr-catalog"; then
+            DECYPHARR_PROFILE_FLAGS+=" --profile decypharr-catalog"
+        fi
+        eval docker compose $COMPOSE_FILES $DECYPHARR_PROFILE_FLAGS up -d
+        python3 "$SCRIPT_DIR/restart_coordinator.py" cancel decypharr 2>/dev/null
         print_success "Phase 2: Decypharr container started!"
     fi
     
@@ -546,6 +571,13 @@ deploy_services() {
         echo "  - Jellyfin Server: http://localhost:8096"
     fi
 
+    # Apply the restarts collected during configuration, once per container
+    print_info "Restarting services whose configuration changed..."
+    if ! python3 "$SCRIPT_DIR/restart_coordinator.py" --project-dir "$PROJECT_DIR" flush; then
+        print_warning "Some services could not be restarted. Restart them manually: docker compose restart <service>"
+    fi
+    unset SURGE_RESTART_QUEUE SURGE_CONFIG_CHANGES
+
     # Show optional service status messages
     if [ -n "$RD_API_TOKEN" ]; then
         echo "  - RDT-Client (Real-Debrid): http://localhost:6500"
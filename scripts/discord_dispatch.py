@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Surge Discord Notification Dispatcher
+
+Callers enqueue webhook payloads into a spool directory and return
+immediately. A single background dispatcher (started on demand, exits when
+idle) drains the spool:
+- events arriving within a batch window are combined, up to 10 embeds per post
+- identical alerts (same webhook and payload, ignoring timestamps) are sent once
+- 429 responses and exhausted rate-limit buckets are waited out using
+  Retry-After / X-RateLimit-Reset-After instead of dropping the message
+
+Every event ends with a receipt ('sent' or 'failed') in the spool's
+receipts/ directory, so callers can check delivery_status() before
+treating an alert as delivered.
+
+Usage:
+    python3 discord_dispatch.py enqueue --webhook URL < payload.json
+    python3 discord_dispatch.py run     # normally started automatically
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import hashlib
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+
+BATCH_WINDOW = float(os.environ.get('SURGE_DISCORD_BATCH_WINDOW', '5'))
+DEDUPE_WINDOW = 300        # identical alerts within this many seconds are sent once
+IDLE_EXIT = 30             # dispatcher exits after this many idle seconds
+MAX_EMBEDS = 10            # Discord's limit per message
+MAX_CONTENT = 2000         # Discord's limit for message content
+MAX_ATTEMPTS = 5
+RECEIPT_TTL = 86400        # receipts nobody collected are removed after a day
+USER_AGENT = 'Surge-Notifications/1.0'
+
+def spool_dir():
+    """Return the spool directory shared by all Surge processes of this user."""
+    path = os.environ.get('SURGE_DISCORD_SPOOL') or \
+        os.path.join(tempfile.gettempdir(), f'surge-discord-{os.getuid()}')
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+def receipts_dir(spool=None):
+    """Return the directory holding delivery receipts."""
+    path = os.path.join(spool or spool_dir(), 'receipts')
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+def dedupe_key(webhook_url, payload):
+    """Key identical alerts by webhook and the whole payload, ignoring embed timestamps."""
+    payload = dict(payload)
+    payload['embeds'] = [{key: value for key, value in embed.items() if key != 'timestamp'}
+                         for embed in payload.get('embeds') or []]
+    data = json.dumps([webhook_url, payload], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+def delivery_status(event_id, spool=None):
+    """
+    Return 'sent', 'failed' or 'pending' for an event id returned by
+    enqueue(). A collected receipt is removed; an event that is neither
+    queued nor receipted (e.g. lost with a spool wipe) counts as 'failed'.
+    """
+    spool = spool or spool_dir()
+    receipt = os.path.join(receipts_dir(spool), event_id)
+    try:
+        with open(receipt, 'r') as f:
+            status = f.read().strip()
+        os.unlink(receipt)
+        return status
+    except OSError:
+        pass
+    if os.path.exists(os.path.join(spool, f"{event_id}.json")):
+        return 'pending'
+    return 'failed'
+
+def enqueue(payload, webhook_url=None, start_dispatcher=True):
+    """
+    Queue a webhook payload ({'content', 'embeds', ...}) for delivery and
+    return without waiting for Discord. Returns the event id to pass to
+    delivery_status(), or None if no webhook is set.
+    """
+    webhook_url = webhook_url or os.environ.get('DISCORD_WEBHOOK_URL')
+    if not webhook_url:
+        return None
+    spool = spool_dir()
+    event = {
+        'webhook_url': webhook_url,
+        'payload': payload,
+        'key': dedupe_key(webhook_url, payload),
+        'queued_at': time.time(),
+        'attempts': 0,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=spool, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(event, f)
+    event_id = f"{time.time_ns()}-{os.getpid()}"
+    os.replace(tmp_path, os.path.join(spool, f"{event_id}.json"))
+    if start_dispatcher:
+        ensure_dispatcher()
+    return event_id
+
+def ensure_dispatcher():
+    """Start a detached dispatcher unless one is already running."""
+    lock_file = os.path.join(spool_dir(), 'dispatcher.lock')
+    with open(lock_file, 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return  # running dispatcher will pick the event up
+        fcntl.flock(lock, fcntl.LOCK_UN)
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), 'run'],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True, close_fds=True,
+    )
+
+class Dispatcher:
+    """Drains the spool in batches, respecting Discord's rate limits."""
+
+    def __init__(self, spool=None, batch_window=BATCH_WINDOW):
+        self.spool = spool or spool_dir()
+        self.batch_window = batch_window
+        self.blocked_until = {}  # webhook_url -> time.monotonic() when posting may resume
+        self.recently_sent = {}  # dedupe key -> time.monotonic() it was delivered
+
+    def pending(self):
+        """Return [(path, event)] for queued events, oldest first."""
+        events = []
+        for name in sorted(os.listdir(self.spool)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.spool, name)
+            try:
+                with open(path, 'r') as f:
+                    events.append((path, json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return events
+
+    def run(self):
+        """Dispatch until the spool has been empty for IDLE_EXIT seconds."""
+        lock = open(os.path.join(self.spool, 'dispatcher.lock'), 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0  # another dispatcher owns the spool
+        idle_since = time.monotonic()
+        while True:
+            events = self.pending()
+            if not events:
+                if time.monotonic() - idle_since > IDLE_EXIT:
+                    self.prune_receipts()
+                    # An enqueue that saw the lock held just before we let go must not be stranded
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+                    if not self.pending():
+                        return 0
+                    try:
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        return 0
+                    idle_since = time.monotonic()
+                    continue
+                time.sleep(1)
+                continue
+            idle_since = time.monotonic()
+            # Let the burst finish arriving so it goes out as one message
+            oldest = min(event['queued_at'] for _path, event in events)
+            wait = oldest + self.batch_window - time.time()
+            if wait > 0:
+                time.sleep(wait)
+                events = self.pending()
+            self.dispatch(events)
+            time.sleep(self.seconds_until_unblocked())
+
+    def seconds_until_unblocked(self):
+        """How long every webhook with pending events is still rate limited (0 if none)."""
+        now = time.monotonic()
+        waits = [until - now for until in self.blocked_until.values() if until > now]
+        return min(waits) if waits else 0
+
+    def dispatch(self, events):
+        """Send one round of batched events; events not sent stay in the spool."""
+        by_webhook = {}
+        for path, event in events:
+            by_webhook.setdefault(event['webhook_url'], []).append((path, event))
+
+        for webhook_url, webhook_events in by_webhook.items():
+            if self.blocked_until.get(webhook_url, 0) > time.monotonic():
+                continue
+            # Identical alerts collapse into the first one
+            seen = {}
+            for path, event in webhook_events:
+                seen.setdefault(event['key'], []).append((path, event))
+            groups = []
+            for key, group in seen.items():
+                if key in self.recently_sent and self.recently_sent[key] > time.monotonic() - DEDUPE_WINDOW:
+                    # The same alert just went out, which is what the caller wanted
+                    self.discard([path for path, _event in group], 'sent')
+                else:
+                    groups.append((key, group))
+            for batch in batches(groups):
+                payload = combine([group[0][1]['payload'] for _key, group in batch])
+                paths = [path for _key, group in batch for path, _event in group]
+                if not payload.get('embeds') and not payload.get('content'):
+                    self.discard(paths, 'failed')
+                    continue
+                outcome = self.post(webhook_url, payload)
+                if outcome == 'sent':
+                    self.discard(paths, 'sent')
+                    for key, _group in batch:
+                        self.recently_sent[key] = time.monotonic()
+                elif outcome == 'retry':
+                    self.retry_later(paths)
+                    break
+                else:
+                    self.discard(paths, 'failed')
+
+    def post(self, webhook_url, payload):
+        """POST one message. Returns 'sent', 'retry' or 'failed'."""
+        request = urllib.request.Request(
+            webhook_url, data=json.dumps(payload).encode('utf-8'), method='POST',
+            headers={'Content-Type': 'application/json', 'User-Agent': USER_AGENT},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                headers = response.headers
+            # Proactively pause when this was the last request in the bucket
+            if headers.get('X-RateLimit-Remaining') == '0':
+                self.block(webhook_url, float(headers.get('X-RateLimit-Reset-After') or 1))
+            return 'sent'
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                self.block(webhook_url, retry_after(e))
+                return 'retry'
+            if e.code >= 500:
+                self.block(webhook_url, 5)
+                return 'retry'
+            print(f"Discord rejected notification: HTTP {e.code}", file=sys.stderr)
+            return 'failed'
+        except (urllib.error.URLError, OSError) as e:
+            print(f"Discord webhook unreachable: {e}", file=sys.stderr)
+            self.block(webhook_url, 10)
+            return 'retry'
+
+    def block(self, webhook_url, seconds):
+        self.blocked_until[webhook_url] = time.monotonic() + max(seconds, 0)
+
+    def retry_later(self, paths):
+        """Count an attempt for each event; give up on events that keep failing."""
+        for path in paths:
+            try:
+                with open(path, 'r') as f:
+                    event = json.load(f)
+                event['attempts'] += 1
+                if event['attempts'] >= MAX_ATTEMPTS:
+                    self.discard([path], 'failed')
+                    continue
+                with open(path, 'w') as f:
+                    json.dump(event, f)
+            except (OSError, ValueError):
+                continue
+
+    def discard(self, paths, status=None):
+        """Remove events from the spool, first leaving a receipt with status if given."""
+        for path in paths:
+            if status:
+                event_id = os.path.basename(path)[:-len('.json')]
+                try:
+                    with open(os.path.join(receipts_dir(self.spool), event_id), 'w') as f:
+                        f.write(status)
+                except OSError:
+                    pass
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def prune_receipts(self):
+        """Remove receipts older than RECEIPT_TTL (e.g. from shell callers that never read them)."""
+        directory = receipts_dir(self.spool)
+        cutoff = time.time() - RECEIPT_TTL
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.unlink(path)
+            except OSError:
+                continue
+
+def retry_after(error):
+    """Seconds to wait after a 429, from Retry-After or the JSON body."""
+    try:
+        return float(json.loads(error.read()).get('retry_after'))
+    except (ValueError, TypeError, AttributeError, OSError):
+        pass
+    try:
+        return float(error.headers.get('Retry-After') or 1)
+    except ValueError:
+        return 1
+
+def batches(groups):
+    """Split [(key, events)] into runs whose payloads fit in one message."""
+    batch, embeds = [], 0
+    for key, group in groups:
+        count = max(len(group[0][1]['payload'].get('embeds') or []), 1)
+        if batch and embeds + count > MAX_EMBEDS:
+            yield batch
+            batch, embeds = [], 0
+        batch.append((key, group))
+        embeds += count
+    if batch:
+        yield batch
+
+def combine(payloads):
+    """Merge several webhook payloads into one message."""
+    if len(payloads) == 1:
+        return payloads[0]
+    combined = {key: value for key, value in payloads[0].items() if key not in ('content', 'embeds')}
+    contents = []
+    embeds = []
+    for payload in payloads:
+        if payload.get('content') and payload['content'] not in contents:
+            contents.append(payload['content'])
+        embeds.extend(payload.get('embeds') or [])
+    if contents:
+        combined['content'] = '\n'.join(contents)[:MAX_CONTENT]
+    combined['embeds'] = embeds[:MAX_EMBEDS]
+    return combined
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Queue and deliver Surge Discord notifications')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    enqueue_parser = subparsers.add_parser('enqueue', help='Queue a webhook payload read from stdin')
+    enqueue_parser.add_argument('--webhook', default=None, help='Webhook URL (default: $DISCORD_WEBHOOK_URL)')
+    subparsers.add_parser('run', help='Deliver queued notifications until idle')
+    args = parser.parse_args()
+
+    if args.command == 'enqueue':
+        try:
+            payload = json.load(sys.stdin)
+        except ValueError as e:
+            print(f"Invalid notification payload: {e}", file=sys.stderr)
+            return 1
+        return 0 if enqueue(payload, args.webhook) else 1
+    return Dispatcher().run()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Surge Docker Engine API Client
+
+Talks to the Docker daemon over its unix socket instead of spawning
+`docker compose images` / `docker image inspect` processes. One
+/containers/json and one /images/json request give every compose
+service's container, image, repo digests, state and health.
+
+Usage from shell scripts:
+    python3 docker_engine.py services     # one JSON object per service
+    python3 docker_engine.py unhealthy    # services that are unhealthy or exited with an error
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import socket
+import subprocess
+import http.client
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+DEFAULT_SOCKET = '/var/run/docker.sock'
+API_VERSION = 'v1.41'  # Docker 20.10+
+HEALTH_PATTERN = re.compile(r'\((healthy|unhealthy|health: starting)\)')
+EXIT_CODE_PATTERN = re.compile(r'^Exited \((-?\d+)\)')
+
+class DockerEngineError(Exception):
+    """Raised when the Docker daemon can't be reached or returns an error."""
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that connects to a unix socket instead of host:port."""
+
+    def __init__(self, socket_path, timeout=10):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+def default_socket_path():
+    """Return the daemon socket from DOCKER_HOST (unix:// only) or the default path."""
+    docker_host = os.environ.get('DOCKER_HOST', '')
+    if docker_host.startswith('unix://'):
+        return docker_host[len('unix://'):]
+    return DEFAULT_SOCKET
+
+def default_project_name(project_dir):
+    """Return the compose project name the same way docker compose derives it."""
+    name = os.environ.get('COMPOSE_PROJECT_NAME') or Path(project_dir).resolve().name
+    return re.sub(r'[^a-z0-9_-]', '', name.lower())
+
+def active_compose_files(project_dir):
+    """Compose files deploy.sh runs the stack with: base, MEDIA_SERVER overlay (from .env) and automation."""
+    project_dir = Path(project_dir)
+    media_server = 'plex'
+    try:
+        with open(project_dir / '.env', 'r') as f:
+            for line in f:
+                if line.startswith('MEDIA_SERVER='):
+                    media_server = line.split('=', 1)[1].strip().strip('"\'') or media_server
+    except OSError:
+        pass
+    names = ['docker-compose.yml', f'docker-compose.{media_server}.yml', 'docker-compose.automation.yml']
+    return [project_dir / name for name in names if (project_dir / name).exists()]
+
+def compose_command(project_dir):
+    """Return ['docker', 'compose', '-f', ...] for the project's active compose files."""
+    args = ['docker', 'compose']
+    for compose_file in active_compose_files(project_dir):
+        args += ['-f', str(compose_file)]
+    return args
+
+def compose_dependencies(project_dir):
+    """Return {service: set of depends_on services} for every service in any profile ({} on failure)."""
+    result = subprocess.run(compose_command(project_dir) + ['config', '--format', 'json'], capture_output=True,
+                            text=True, cwd=project_dir, env=dict(os.environ, COMPOSE_PROFILES='*'))
+    if result.returncode != 0:
+        return {}
+    try:
+        config = json.loads(result.stdout).get('services', {})
+    except ValueError:
+        return {}
+    return {name: set(spec.get('depends_on') or {}) for name, spec in config.items()}
+
+def dependency_levels(services, depends_on):
+    """Group services into levels so each level only depends on earlier ones."""
+    remaining = set(services)
+    levels = []
+    while remaining:
+        # Dependencies outside this set are already running
+        level = sorted(service for service in remaining if not (depends_on.get(service, set()) & remaining))
+        if not level:
+            level = sorted(remaining)  # dependency cycle: handle the rest together
+        levels.append(level)
+        remaining -= set(level)
+    return levels
+
+class DockerEngine:
+    """Minimal Docker Engine API client over a unix socket."""
+
+    def __init__(self, socket_path=None, timeout=10):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+
+    def available(self):
+        """Return True if the daemon socket exists and answers /_ping."""
+        try:
+            return self.request('GET', '/_ping', raw=True) == b'OK'
+        except DockerEngineError:
+            return False
+
+    def request(self, method, path, params=None, raw=False):
+        """Send one API request and return the decoded JSON (or raw bytes)."""
+        url = f"/{API_VERSION}{path}"
+        if params:
+            url += '?' + urlencode(params)
+        connection = UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        try:
+            connection.request(method, url, headers={'Host': 'docker'})
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise DockerEngineError(f"Docker API {method} {path} failed: {e}") from e
+        finally:
+            connection.close()
+        if response.status >= 400:
+            try:
+                message = json.loads(body).get('message', '')
+            except ValueError:
+                message = body.decode('utf-8', 'replace')
+            raise DockerEngineError(f"Docker API {method} {path} returned {response.status}: {message}")
+        if raw:
+            return body
+        return json.loads(body) if body else None
+
+    def list_containers(self, project=None, all=True):
+        """List containers, optionally only those of one compose project."""
+        params = {'all': '1' if all else '0'}
+        if project:
+            params['filters'] = json.dumps({'label': [f'com.docker.compose.project={project}']})
+        return self.request('GET', '/containers/json', params)
+
+    def list_images(self):
+        """List local images with their tags and repo digests."""
+        return self.request('GET', '/images/json')
+
+    def inspect_container(self, container_id):
+        """Return the full inspect document for one container."""
+        return self.request('GET', f"/containers/{quote(container_id, safe='')}/json")
+
+    def inspect_image(self, image):
+        """Return the full inspect document for one image."""
+        return self.request('GET', f"/images/{quote(image, safe='')}/json")
+
+    def compose_services(self, project):
+        """
+        Return {service: info} for every container in a compose project.
+
+        info has container, image (repository:tag as configured), repository,
+        tag, image_id, repo_digests, state, exit_code (exited containers
+        only) and health ('healthy', 'unhealthy', 'starting' or None when
+        the image has no healthcheck).
+        """
+        images = {image['Id']: image for image in self.list_images()}
+        services = {}
+        for container in self.list_containers(project):
+            labels = container.get('Labels') or {}
+            service = labels.get('com.docker.compose.service')
+            if not service:
+                continue
+            image_ref = container.get('Image', '')
+            if image_ref.startswith('sha256:'):
+                # The tag moved to a newer image (pull/pre-fetch): /containers/json then reports
+                # the old image ID, so take the configured reference from the container itself
+                try:
+                    image_ref = self.inspect_container(container['Id'])['Config']['Image'] or image_ref
+                except (DockerEngineError, KeyError, TypeError):
+                    pass
+            repository, tag = split_image_reference(image_ref)
+            image = images.get(container.get('ImageID'), {})
+            health = HEALTH_PATTERN.search(container.get('Status', ''))
+            exit_code = EXIT_CODE_PATTERN.match(container.get('Status', ''))
+            services[service] = {
+                'container': (container.get('Names') or [''])[0].lstrip('/'),
+                'image': image_ref,
+                'repository': repository,
+                'tag': tag,
+                'image_id': container.get('ImageID'),
+                'repo_digests': image.get('RepoDigests') or [],
+                'state': container.get('State'),
+                'exit_code': int(exit_code.group(1)) if exit_code else None,
+                'health': health.group(1).replace('health: ', '') if health else None,
+            }
+        return services
+
+    def wait_healthy(self, project, services, timeout, log=print):
+        """
+        Wait until services are running and healthy (or have no healthcheck).
+        One-shot services without a healthcheck that exited with code 0 also
+        count as done. Returns the ones that aren't.
+        """
+        deadline = time.monotonic() + timeout
+        pending = set(services)
+        while pending and time.monotonic() < deadline:
+            try:
+                state = self.compose_services(project)
+            except DockerEngineError:
+                time.sleep(2)
+                continue
+            for service in list(pending):
+                info = state.get(service)
+                if not info:
+                    continue
+                if info['state'] == 'running' and info['health'] in (None, 'healthy'):
+                    pending.discard(service)
+                elif info['state'] == 'exited' and info['health'] is None and info['exit_code'] == 0:
+                    pending.discard(service)  # one-shot job finished successfully
+                elif info['state'] in ('exited', 'dead') or info['health'] == 'unhealthy':
+                    log(f"  ❌ {service} is {info['health'] or info['state']}")
+                    return sorted(pending)
+            if pending:
+                time.sleep(2)
+        return sorted(pending)
+
+def split_image_reference(reference):
+    """Split 'registry/repo:tag' into (repository, tag); digests and missing tags are handled."""
+    reference = reference.split('@', 1)[0]
+    name, _, tag = reference.rpartition(':')
+    if not name or '/' in tag:
+        return reference, 'latest'
+    return name, tag
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Query compose services through the Docker Engine API')
+    parser.add_argument('command', choices=['services', 'unhealthy'])
+    parser.add_argument('--project-dir', default=str(Path(__file__).resolve().parent.parent))
+    args = parser.parse_args()
+
+    try:
+        services = DockerEngine().compose_services(default_project_name(args.project_dir))
+    except DockerEngineError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    for service, info in sorted(services.items()):
+        if args.command == 'services':
+            print(json.dumps(dict(info, service=service)))
+        elif info['health'] == 'unhealthy' or (info['state'] == 'exited' and info['exit_code'] != 0):
+            print(service)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
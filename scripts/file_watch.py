@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Surge File Appearance Waiter
+
+Blocks until files written by service containers (config.xml, config.yaml,
+...) contain what a configurator needs. Uses inotify on Linux so callers
+wake up as soon as the file is written, and falls back to polling on other
+platforms or when inotify is unavailable.
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct('iIII')
+
+class Inotify:
+    """Minimal ctypes wrapper around the Linux inotify API."""
+
+    def __init__(self, libc, fd):
+        self._libc = libc
+        self.fd = fd
+        self.watches = {}  # directory -> watch descriptor
+
+    @classmethod
+    def create(cls):
+        """Return an Inotify instance, or None when inotify is not available."""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        return cls(libc, fd)
+
+    def watch(self, directory):
+        """Start watching a directory for new or rewritten files."""
+        if directory in self.watches:
+            return True
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return False
+        self.watches[directory] = wd
+        return True
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds for events. Returns True if any arrived."""
+        readable, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not readable:
+            return False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return False
+            raise
+        # Forget directories that were removed so they are re-watched when recreated
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size + name_len
+            if mask & IN_IGNORED:
+                for directory, watched in list(self.watches.items()):
+                    if watched == wd:
+                        del self.watches[directory]
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+def _nearest_existing_dir(path):
+    """Return the closest existing ancestor directory of path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    while directory and not os.path.isdir(directory):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    return directory
+
+def wait_for(paths, check, timeout, poll_interval=5):
+    """
+    Call check() until it returns a truthy value or timeout seconds pass.
+
+    check() is re-run whenever one of paths (or a missing parent directory)
+    is created or rewritten. poll_interval is the fallback re-check period
+    without inotify, and a safety net for missed events with it.
+    Returns the value from check(), or None on timeout.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    deadline = time.monotonic() + timeout
+    notifier = Inotify.create()
+    try:
+        while True:
+            if notifier:
+                # Re-arm on every pass: the file's directory may only just have been created
+                for path in paths:
+                    notifier.watch(_nearest_existing_dir(path))
+            result = check()
+            if result:
+                return result
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if notifier:
+                notifier.wait(min(poll_interval, remaining))
+            else:
+                time.sleep(min(poll_interval, remaining))
+    finally:
+        if notifier:
+            notifier.close()
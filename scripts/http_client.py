@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Surge Shared HTTP Client
+
+One pooled, keep-alive session shared by every configurator in a process.
+Provides consistent timeouts, retry with exponential backoff for idempotent
+requests, and per-host latency counters.
+"""
+
+import os
+import time
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = float(os.environ.get('SURGE_HTTP_TIMEOUT', '10'))
+DEFAULT_RETRIES = int(os.environ.get('SURGE_HTTP_RETRIES', '2'))
+BACKOFF_FACTOR = 0.5
+POOL_CONNECTIONS = 16  # number of per-host pools kept alive
+POOL_MAXSIZE = 16      # sockets kept per host
+
+RETRY_STATUSES = {502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'}
+
+_session = None
+_session_lock = threading.Lock()
+_stats = {}
+_stats_lock = threading.Lock()
+
+def get_session():
+    """Return the process-wide session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Retries are handled in request() so latency is recorded per attempt
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = 'Surge-Config/1.0'
+            _session = session
+        return _session
+
+def _record(method, url, started, error):
+    """Add one request attempt to the latency counters."""
+    elapsed_ms = (time.monotonic() - started) * 1000
+    key = f"{method} {urlsplit(url).netloc}"
+    with _stats_lock:
+        entry = _stats.setdefault(key, {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        entry['count'] += 1
+        entry['total_ms'] += elapsed_ms
+        entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        if error:
+            entry['errors'] += 1
+
+def request(method, url, timeout=None, retries=None, **kwargs):
+    """
+    Send a request through the shared session.
+
+    Idempotent methods are retried on connection errors, timeouts and
+    502/503/504 responses with exponential backoff; pass retries=0 for
+    probes that already run in their own retry loop. Raises the usual
+    requests exceptions once retries are exhausted.
+    """
+    method = method.upper()
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    if retries is None:
+        retries = DEFAULT_RETRIES if method in IDEMPOTENT_METHODS else 0
+
+    session = get_session()
+    for attempt in range(retries + 1):
+        started = time.monotonic()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            _record(method, url, started, error=True)
+            if attempt >= retries:
+                raise
+        else:
+            _record(method, url, started, error=response.status_code >= 500)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+        time.sleep(BACKOFF_FACTOR * (2 ** attempt))
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+def put(url, **kwargs):
+    return request('PUT', url, **kwargs)
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
+
+def get_latency_stats():
+    """Return a snapshot of latency counters keyed by 'METHOD host:port'."""
+    with _stats_lock:
+        snapshot = {}
+        for key, entry in _stats.items():
+            snapshot[key] = dict(entry)
+            snapshot[key]['avg_ms'] = entry['total_ms'] / entry['count'] if entry['count'] else 0.0
+        return snapshot
+
+def reset_latency_stats():
+    """Clear all latency counters."""
+    with _stats_lock:
+        _stats.clear()
@@ -5,17 +5,65 @@ Verifies that all enabled services are properly interconnected and configured
 """
 
 import os
+import re
 import sys
 import json
-import requests
-import xml.etree.ElementTree as ET
+import time
+import threading
+import subprocess
 import configparser
 from datetime import datetime
 
+import http_client
+import service_credentials
+
+SERVICE_PORTS = {
+    'plex': 32400, 'emby': 8096, 'jellyfin': 8096,
+    'radarr': 7878, 'sonarr': 8989, 'prowlarr': 9696,
+    'bazarr': 6767, 'overseerr': 5055, 'tautulli': 8182,
+    'nzbget': 6789, 'rdt-client': 6500, 'gaps': 8484,
+    'posterizarr': 5060, 'homepage': 3000
+}
+
+# Report sections in display order
+REPORT_SECTIONS = [
+    ("availability", "📊 Service Availability:"),
+    ("prowlarr", "🔗 Prowlarr Application Connections:"),
+    ("bazarr", "📺 Bazarr Provider Connections:"),
+    ("download_clients", "⬇️ Download Client Connections:"),
+    ("debrid", "🧲 Debrid Services:"),
+    ("media_server", "📺 Media Server Connections:"),
+]
+
+# How often the status daemon re-runs each section's checks, in seconds
+CHECK_INTERVALS = {
+    "availability": 30,
+    "debrid": 60,
+    "prowlarr": 300,
+    "bazarr": 300,
+    "download_clients": 300,
+    "media_server": 600,
+}
+DEFAULT_CHECK_INTERVAL = 120
+
+DECYPHARR_METRICS_URL = os.environ.get(
+    'DECYPHARR_METRICS_URL', f"http://localhost:{os.environ.get('DECYPHARR_METRICS_PORT', '8284')}/metrics")
+# The debrid layer is flagged as a bottleneck beyond these
+DEBRID_ERROR_RATE = float(os.environ.get('SURGE_DEBRID_ERROR_RATE', '0.1'))
+DEBRID_LATENCY_MS = float(os.environ.get('SURGE_DEBRID_LATENCY_MS', '2000'))
+
 class SurgeInterconnectionChecker:
-    def __init__(self, storage_path=None):
+    def __init__(self, storage_path=None, deadline=None):
         self.storage_path = storage_path or os.environ.get('STORAGE_PATH', '/opt/surge')
+        # Overall time budget for one round of probes, in seconds
+        self.deadline = deadline or float(os.environ.get('SURGE_STATUS_DEADLINE', '15'))
         self.enabled_services = self.detect_enabled_services()
+        self.credentials = service_credentials.get_registry(self.storage_path)
+        # Previous per-debrid counters, so repeated scrapes report rates over the interval
+        self.debrid_counters = {}
+        # Checks whose probe thread is still running (possibly hung from an earlier round)
+        self.in_flight = set()
+        self.in_flight_lock = threading.Lock()
         
     def log(self, message, level="INFO"):
         """Enhanced logging with timestamps."""
@@ -65,7 +113,7 @@ class SurgeInterconnectionChecker:
     def check_service_running(self, service, port):
         """Check if a service is running and accessible."""
         try:
-            response = requests.get(f"http://localhost:{port}", timeout=5)
+            response = http_client.get(f"http://localhost:{port}", timeout=5, retries=0)
             return response.status_code < 500
         except:
             return False
@@ -81,20 +129,16 @@ class SurgeInterconnectionChecker:
             if not os.path.exists(config_path):
                 return {"configured": False, "reason": "Prowlarr config not found"}
             
-            tree = ET.parse(config_path)
-            root = tree.getroot()
-            api_key_element = root.find('ApiKey')
-            
-            if not api_key_element or not api_key_element.text:
+            api_key = self.credentials.read(config_path, 'xml')
+            if not api_key:
                 return {"configured": False, "reason": "Prowlarr API key not found"}
             
-            api_key = api_key_element.text.strip()
-            
             # Check applications
-            response = requests.get(
+            response = http_client.get(
                 "http://localhost:9696/api/v1/applications",
                 headers={"X-Api-Key": api_key},
-                timeout=10
+                timeout=10,
+                retries=0
             )
             
             if response.status_code == 200:
@@ -125,19 +169,16 @@ class SurgeInterconnectionChecker:
             if not os.path.exists(config_path):
                 return {"configured": False, "reason": "Bazarr config not found"}
             
-            config = configparser.ConfigParser()
-            config.read(config_path)
-            
-            if not config.has_section('auth') or not config.has_option('auth', 'apikey'):
+            api_key = self.credentials.read(config_path, 'bazarr')
+            if not api_key:
                 return {"configured": False, "reason": "Bazarr API key not found"}
             
-            api_key = config.get('auth', 'apikey')
-            
             # Check providers
-            response = requests.get(
+            response = http_client.get(
                 "http://localhost:6767/api/providers",
                 headers={"X-API-KEY": api_key},
-                timeout=10
+                timeout=10,
+                retries=0
             )
             
             if response.status_code == 200:
@@ -166,21 +207,17 @@ class SurgeInterconnectionChecker:
             if not os.path.exists(config_path):
                 return {"configured": False, "reason": f"{service.title()} config not found"}
             
-            tree = ET.parse(config_path)
-            root = tree.getroot()
-            api_key_element = root.find('ApiKey')
-            
-            if not api_key_element or not api_key_element.text:
+            api_key = self.credentials.read(config_path, 'xml')
+            if not api_key:
                 return {"configured": False, "reason": f"{service.title()} API key not found"}
-            
-            api_key = api_key_element.text.strip()
             port = {'radarr': 7878, 'sonarr': 8989}[service]
             
             # Check download clients
-            response = requests.get(
+            response = http_client.get(
                 f"http://localhost:{port}/api/v3/downloadclient",
                 headers={"X-Api-Key": api_key},
-                timeout=10
+                timeout=10,
+                retries=0
             )
             
             if response.status_code == 200:
@@ -198,170 +235,292 @@ class SurgeInterconnectionChecker:
         except Exception as e:
             return {"configured": False, "reason": f"Error: {e}"}
     
+    def check_tautulli_plex_connection(self):
+        """Check Tautulli → Plex connection. Returns None when not applicable."""
+        if 'tautulli' not in self.enabled_services or 'plex' not in self.enabled_services:
+            return None
+        config_path = f"{self.storage_path}/config/tautulli/config.ini"
+        if not os.path.exists(config_path):
+            return None
+        config = configparser.ConfigParser()
+        config.read(config_path)
+        
+        has_plex_token = (config.has_section('General') and 
+                        config.has_option('General', 'pms_token') and 
+                        config.get('General', 'pms_token'))
+        
+        return {
+            "configured": bool(has_plex_token),
+            "reason": "Plex token configured" if has_plex_token else "No Plex token found"
+        }
+    
+    def check_kometa_plex_connection(self):
+        """Check Kometa → Plex connection. Returns None when not applicable."""
+        if 'kometa' not in self.enabled_services or 'plex' not in self.enabled_services:
+            return None
+        config_path = f"{self.storage_path}/config/kometa/config.yml"
+        if not os.path.exists(config_path):
+            return None
+        try:
+            with open(config_path, 'r') as f:
+                content = f.read()
+                has_token = 'token:' in content and '${PLEX_TOKEN}' in content
+                return {
+                    "configured": has_token,
+                    "reason": "Plex token configured" if has_token else "No Plex token found"
+                }
+        except:
+            return {"configured": False, "reason": "Config read error"}
+    
     def check_media_server_connections(self):
         """Check media server related connections."""
         connections = {}
-        
-        # Check Tautulli → Plex connection
-        if 'tautulli' in self.enabled_services and 'plex' in self.enabled_services:
-            config_path = f"{self.storage_path}/config/tautulli/config.ini"
-            if os.path.exists(config_path):
-                config = configparser.ConfigParser()
-                config.read(config_path)
-                
-                has_plex_token = (config.has_section('General') and 
-                                config.has_option('General', 'pms_token') and 
-                                config.get('General', 'pms_token'))
-                
-                connections['tautulli_plex'] = {
-                    "configured": bool(has_plex_token),
-                    "reason": "Plex token configured" if has_plex_token else "No Plex token found"
-                }
-        
-        # Check Kometa → Plex connection
-        if 'kometa' in self.enabled_services and 'plex' in self.enabled_services:
-            config_path = f"{self.storage_path}/config/kometa/config.yml"
-            if os.path.exists(config_path):
-                try:
-                    with open(config_path, 'r') as f:
-                        content = f.read()
-                        has_token = 'token:' in content and '${PLEX_TOKEN}' in content
-                        connections['kometa_plex'] = {
-                            "configured": has_token,
-                            "reason": "Plex token configured" if has_token else "No Plex token found"
-                        }
-                except:
-                    connections['kometa_plex'] = {"configured": False, "reason": "Config read error"}
-        
+        for conn_name, check in [('tautulli_plex', self.check_tautulli_plex_connection),
+                                 ('kometa_plex', self.check_kometa_plex_connection)]:
+            status = check()
+            if status is not None:
+                connections[conn_name] = status
         return connections
     
-    def generate_status_report(self):
-        """Generate comprehensive interconnection status report."""
-        self.log("🔍 Surge Service Interconnection Status Report", "INFO")
-        self.log("=" * 60, "INFO")
+    def check_cli_debrid(self):
+        """Check that the CLI-Debrid API responds."""
+        try:
+            response = http_client.get("http://localhost:5000/api/v1/status", timeout=5, retries=0)
+            if response.status_code == 200:
+                return {"configured": True, "reason": "Service responding"}
+            return {"configured": False, "reason": "Service not responding"}
+        except:
+            return {"configured": False, "reason": "Connection failed"}
+    
+    def check_decypharr(self):
+        """Check Decypharr's qBittorrent-compatible API."""
+        try:
+            # Check qBittorrent API endpoint (Decypharr provides mock qBittorrent API)
+            response = http_client.get("http://localhost:8282/api/v2/app/version", timeout=5, retries=0)
+            if response.status_code == 200:
+                version = response.text.strip().replace('"', '')
+                return {"configured": True, "reason": f"qBittorrent API v{version} responding"}
+            return {"configured": False, "reason": "qBittorrent API not responding"}
+        except:
+            return {"configured": False, "reason": "Connection failed"}
+    
+    def check_decypharr_metrics(self):
+        """Scrape Decypharr's /metrics: queue depth, repair progress, per-debrid latency and error rate."""
+        try:
+            response = http_client.get(DECYPHARR_METRICS_URL, timeout=5, retries=0)
+        except Exception:
+            return {"configured": False, "reason": f"Metrics endpoint unreachable ({DECYPHARR_METRICS_URL})"}
+        if response.status_code != 200:
+            return {"configured": False, "reason": f"Metrics endpoint returned {response.status_code}"}
+        summary = summarize_decypharr_metrics(parse_prometheus(response.text))
+        if summary["queue_depth"] is None and not summary["repair"] and not summary["debrids"]:
+            # Reachable but exporting none of the series we read: names changed, or the wrong endpoint
+            return {"configured": False,
+                    "reason": f"None of the expected Decypharr metrics found at {DECYPHARR_METRICS_URL}"}
         
-        total_checks = 0
-        passed_checks = 0
+        debrids = {}
+        for debrid, stats in summary["debrids"].items():
+            # Rates over the interval since the last scrape; cumulative on the first one and
+            # after a counter reset (Decypharr restarted), no data if nothing was requested since
+            previous = self.debrid_counters.get(debrid)
+            self.debrid_counters[debrid] = dict(stats)
+            if previous and all(stats[key] >= previous[key] for key in stats):
+                stats = {key: stats[key] - previous[key] for key in stats}
+            latency = stats["latency_sum_ms"] / stats["latency_count"] if stats["latency_count"] else None
+            error_rate = round(stats["errors"] / stats["requests"], 4) if stats["requests"] else None
+            debrids[debrid] = {"latency_ms": round(latency, 1) if latency is not None else None,
+                               "error_rate": error_rate, "requests": stats["requests"], "errors": stats["errors"]}
         
-        # Service availability
-        self.log("\n📊 Service Availability:", "INFO")
-        service_ports = {
-            'plex': 32400, 'emby': 8096, 'jellyfin': 8096,
-            'radarr': 7878, 'sonarr': 8989, 'prowlarr': 9696,
-            'bazarr': 6767, 'overseerr': 5055, 'tautulli': 8182,
-            'nzbget': 6789, 'rdt-client': 6500, 'gaps': 8484,
-            'posterizarr': 5060, 'homepage': 3000
-        }
+        parts = []
+        if summary["queue_depth"] is not None:
+            parts.append(f"queue {summary['queue_depth']:.0f}")
+        progress = repair_progress(summary["repair"])
+        if progress:
+            parts.append(f"repair {progress}")
+        slow = []
+        for debrid, stats in sorted(debrids.items()):
+            if not stats["requests"]:
+                parts.append(f"{debrid} idle")
+                continue
+            latency = f"{stats['latency_ms']:.0f} ms" if stats["latency_ms"] is not None else "n/a"
+            if stats["error_rate"] is not None:
+                errors = f"{stats['error_rate'] * 100:.1f}% errors"
+            else:
+                errors = f"{stats['errors']:.0f} errors"
+            parts.append(f"{debrid} {latency}, {errors}")
+            if (stats["error_rate"] or 0) >= DEBRID_ERROR_RATE or (stats["latency_ms"] or 0) >= DEBRID_LATENCY_MS:
+                slow.append(debrid)
+        reason = "; ".join(parts)
+        details = {"queue_depth": summary["queue_depth"], "repair": summary["repair"], "debrids": debrids}
+        if slow:
+            return {"configured": False, "reason": f"Debrid bottleneck ({', '.join(slow)}): {reason}", "details": details}
+        return {"configured": True, "reason": reason, "details": details}
+    
+    def check_zurg(self):
+        """Check the Zurg WebDAV server and whether its rclone mount is active."""
+        try:
+            # Check Zurg WebDAV health endpoint
+            response = http_client.get("http://localhost:9999/health", timeout=5, retries=0)
+            if response.status_code != 200:
+                return {"configured": False, "reason": "WebDAV server not responding"}
+        except:
+            return {"configured": False, "reason": "Connection failed"}
         
-        for service in self.enabled_services:
-            if service in service_ports:
-                running = self.check_service_running(service, service_ports[service])
-                status = "✅ Running" if running else "❌ Not accessible"
-                self.log(f"  {service.title()}: {status}", "CHECKED")
-                total_checks += 1
-                if running:
-                    passed_checks += 1
+        reason = "WebDAV server responding"
+        # Mount check is optional
+        try:
+            result = subprocess.run(['mountpoint', '/mnt/zurg'], 
+                                  capture_output=True, text=True, timeout=3)
+            if result.returncode == 0:
+                reason += ", rclone mount active at /mnt/zurg"
+            else:
+                reason += ", rclone mount not detected"
+        except:
+            pass
+        return {"configured": True, "reason": reason}
+    
+    def build_probes(self):
+        """
+        List every applicable check as (check_id, section, label, probe).
+        Each probe returns {"configured": bool, "reason": str, ...} or None if not applicable.
+        """
+        probes = []
         
-        # Prowlarr ↔ Applications
-        self.log("\n🔗 Prowlarr Application Connections:", "INFO")
-        prowlarr_status = self.check_prowlarr_applications()
-        total_checks += 1
-        if prowlarr_status["configured"]:
-            apps = ", ".join(prowlarr_status.get("applications", []))
-            self.log(f"  ✅ Configured applications: {apps}", "SUCCESS")
-            passed_checks += 1
-        else:
-            self.log(f"  ❌ Not configured: {prowlarr_status['reason']}", "ERROR")
+        for service in self.enabled_services:
+            if service in SERVICE_PORTS:
+                def probe(service=service):
+                    running = self.check_service_running(service, SERVICE_PORTS[service])
+                    return {"configured": running, "reason": "Running" if running else "Not accessible"}
+                probes.append((f"service_{service}", "availability", service.title(), probe))
         
-        # Bazarr ↔ Providers
-        self.log("\n📺 Bazarr Provider Connections:", "INFO")
-        bazarr_status = self.check_bazarr_providers()
-        total_checks += 1
-        if bazarr_status["configured"]:
-            providers = ", ".join(bazarr_status.get("providers", []))
-            self.log(f"  ✅ Configured providers: {providers}", "SUCCESS")
-            passed_checks += 1
-        else:
-            self.log(f"  ❌ Not configured: {bazarr_status['reason']}", "ERROR")
+        probes.append(("prowlarr_applications", "prowlarr", "Prowlarr", self.check_prowlarr_applications))
+        probes.append(("bazarr_providers", "bazarr", "Bazarr", self.check_bazarr_providers))
         
-        # Download Clients
-        self.log("\n⬇️ Download Client Connections:", "INFO")
         for service in ['radarr', 'sonarr']:
             if service in self.enabled_services:
-                client_status = self.check_download_clients(service)
-                total_checks += 1
-                if client_status["configured"]:
-                    clients = ", ".join(client_status.get("clients", []))
-                    self.log(f"  ✅ {service.title()} clients: {clients}", "SUCCESS")
-                    passed_checks += 1
-                else:
-                    self.log(f"  ❌ {service.title()}: {client_status['reason']}", "ERROR")
+                probes.append((f"{service}_download_clients", "download_clients", service.title(),
+                               lambda service=service: self.check_download_clients(service)))
         
-        # CLI-Debrid Status (if enabled)
         if 'cli-debrid' in self.enabled_services:
-            total_checks += 1
-            try:
-                response = requests.get("http://localhost:5000/api/v1/status", timeout=5)
-                if response.status_code == 200:
-                    self.log("  ✅ CLI-Debrid: Service responding", "SUCCESS")
-                    passed_checks += 1
-                else:
-                    self.log("  ❌ CLI-Debrid: Service not responding", "ERROR")
-            except:
-                self.log("  ❌ CLI-Debrid: Connection failed", "ERROR")
-        
-        # Decypharr Status (if enabled)
+            probes.append(("cli_debrid", "debrid", "CLI-Debrid", self.check_cli_debrid))
         if 'decypharr' in self.enabled_services:
-            total_checks += 1
-            try:
-                # Check qBittorrent API endpoint (Decypharr provides mock qBittorrent API)
-                response = requests.get("http://localhost:8282/api/v2/app/version", timeout=5)
-                if response.status_code == 200:
-                    version = response.text.strip().replace('"', '')
-                    self.log(f"  ✅ Decypharr: qBittorrent API v{version} responding", "SUCCESS")
-                    passed_checks += 1
-                else:
-                    self.log("  ❌ Decypharr: qBittorrent API not responding", "ERROR")
-            except:
-                self.log("  ❌ Decypharr: Connection failed", "ERROR")
-        
-        # Zurg Status (if enabled)
+            probes.append(("decypharr", "debrid", "Decypharr", self.check_decypharr))
+            probes.append(("decypharr_metrics", "debrid", "Decypharr metrics", self.check_decypharr_metrics))
         if 'zurg' in self.enabled_services:
-            total_checks += 1
+            probes.append(("zurg", "debrid", "Zurg", self.check_zurg))
+        
+        probes.append(("tautulli_plex", "media_server", "Tautulli → Plex", self.check_tautulli_plex_connection))
+        probes.append(("kometa_plex", "media_server", "Kometa → Plex", self.check_kometa_plex_connection))
+        return probes
+    
+    def run_probes(self, probes, deadline=None):
+        """
+        Run probes concurrently under one overall deadline (seconds).
+        Returns one record per applicable check, in probe order, with status
+        'pass', 'fail' or 'timeout' and the probe latency in milliseconds.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        results = {}
+        finished = threading.Condition()
+        
+        def run(check_id, probe):
+            started = time.monotonic()
             try:
-                # Check Zurg WebDAV health endpoint
-                response = requests.get("http://localhost:9999/health", timeout=5)
-                if response.status_code == 200:
-                    self.log("  ✅ Zurg: WebDAV server responding", "SUCCESS")
-                    passed_checks += 1
-                    
-                    # Check if mounted
-                    import subprocess
-                    try:
-                        result = subprocess.run(['mountpoint', '/mnt/zurg'], 
-                                              capture_output=True, text=True, timeout=3)
-                        if result.returncode == 0:
-                            self.log("    ✅ rclone mount active at /mnt/zurg", "SUCCESS")
-                        else:
-                            self.log("    ⚠️  rclone mount not detected", "WARNING")
-                    except:
-                        pass  # Mount check is optional
+                outcome = probe()
+            except Exception as e:
+                outcome = {"configured": False, "reason": f"Error: {e}"}
+            finally:
+                with self.in_flight_lock:
+                    self.in_flight.discard(check_id)
+            with finished:
+                results[check_id] = (outcome, (time.monotonic() - started) * 1000)
+                finished.notify_all()
+        
+        started = time.monotonic()
+        still_running = set()
+        for check_id, _section, _label, probe in probes:
+            # At most one probe per check: a hung one is reported, not joined by another thread
+            with self.in_flight_lock:
+                if check_id in self.in_flight:
+                    still_running.add(check_id)
+                    continue
+                self.in_flight.add(check_id)
+            # Daemon threads: a hung probe must not keep the process alive past the deadline
+            threading.Thread(target=run, args=(check_id, probe), daemon=True).start()
+        
+        with finished:
+            finished.wait_for(lambda: len(results) == len(probes) - len(still_running), timeout=deadline)
+            snapshot = dict(results)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        
+        records = []
+        for check_id, section, label, _probe in probes:
+            if check_id in still_running:
+                records.append({"check": check_id, "section": section, "label": label, "status": "timeout",
+                                "reason": "Previous probe still running", "latency_ms": 0.0})
+                continue
+            if check_id not in snapshot:
+                records.append({"check": check_id, "section": section, "label": label, "status": "timeout",
+                                "reason": f"No response within {deadline:g}s", "latency_ms": round(elapsed_ms, 1)})
+                continue
+            outcome, latency_ms = snapshot[check_id]
+            if outcome is None:
+                continue
+            record = {
+                "check": check_id,
+                "section": section,
+                "label": label,
+                "status": "pass" if outcome.get("configured") else "fail",
+                "reason": self.describe_outcome(outcome),
+                "latency_ms": round(latency_ms, 1)
+            }
+            if "details" in outcome:
+                record["details"] = outcome["details"]
+            records.append(record)
+        return records
+    
+    def describe_outcome(self, outcome):
+        """Turn a check result into a one-line reason."""
+        if not outcome.get("configured"):
+            return outcome.get("reason", "Unknown")
+        for key, title in [("applications", "Configured applications"),
+                           ("providers", "Configured providers"),
+                           ("clients", "Clients")]:
+            if key in outcome:
+                return f"{title}: {', '.join(outcome[key])}"
+        return outcome.get("reason", "OK")
+    
+    def collect_records(self):
+        """Run every applicable check once and return the result records."""
+        return self.run_probes(self.build_probes())
+    
+    def generate_status_report(self, records=None):
+        """Generate comprehensive interconnection status report."""
+        self.log("🔍 Surge Service Interconnection Status Report", "INFO")
+        self.log("=" * 60, "INFO")
+        
+        if records is None:
+            records = self.collect_records()
+        
+        for section, title in REPORT_SECTIONS:
+            section_records = [record for record in records if record["section"] == section]
+            if not section_records:
+                continue
+            self.log(f"\n{title}", "INFO")
+            for record in section_records:
+                latency = f" ({record['latency_ms']:.0f} ms)"
+                if section == "availability":
+                    status = "✅ Running" if record["status"] == "pass" else f"❌ {record['reason']}"
+                    self.log(f"  {record['label']}: {status}{latency}", "CHECKED")
+                elif record["status"] == "pass":
+                    self.log(f"  ✅ {record['label']}: {record['reason']}{latency}", "SUCCESS")
+                elif record["status"] == "timeout":
+                    self.log(f"  ⏱️ {record['label']}: Timed out - {record['reason']}", "WARNING")
                 else:
-                    self.log("  ❌ Zurg: WebDAV server not responding", "ERROR")
-            except:
-                self.log("  ❌ Zurg: Connection failed", "ERROR")
+                    self.log(f"  ❌ {record['label']}: {record['reason']}{latency}", "ERROR")
         
-        # Media Server Connections
-        self.log("\n📺 Media Server Connections:", "INFO")
-        media_connections = self.check_media_server_connections()
-        for conn_name, conn_status in media_connections.items():
-            total_checks += 1
-            service_name = conn_name.replace('_', ' → ').title()
-            if conn_status["configured"]:
-                self.log(f"  ✅ {service_name}: {conn_status['reason']}", "SUCCESS")
-                passed_checks += 1
-            else:
-                self.log(f"  ❌ {service_name}: {conn_status['reason']}", "ERROR")
+        total_checks = len(records)
+        passed_checks = sum(1 for record in records if record["status"] == "pass")
         
         # Summary
         self.log(f"\n📋 Summary:", "INFO")
@@ -376,14 +535,290 @@ class SurgeInterconnectionChecker:
         
         return passed_checks == total_checks
 
+def format_json(records):
+    """Render check records as a JSON document."""
+    return json.dumps({
+        "generated_at": datetime.now().astimezone().isoformat(timespec='seconds'),
+        "passed": sum(1 for record in records if record["status"] == "pass"),
+        "total": len(records),
+        "checks": records
+    }, indent=2, ensure_ascii=False)
+
+CHECK_STATUSES = ("pass", "fail", "timeout")
+
+def _prometheus_label(value):
+    """Escape a label value for the Prometheus text exposition format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_prometheus(records):
+    """Render check records in the Prometheus text exposition format (as served on /metrics)."""
+    metrics = [
+        ("surge_check_up", "Whether the interconnection check passed (1) or not (0).",
+         lambda record: 1 if record["status"] == "pass" else 0),
+        ("surge_check_timed_out", "Whether the check missed the overall probe deadline.",
+         lambda record: 1 if record["status"] == "timeout" else 0),
+        ("surge_check_latency_ms", "Probe latency in milliseconds.",
+         lambda record: record["latency_ms"]),
+    ]
+    lines = []
+    for name, help_text, value in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for record in records:
+            labels = f'check="{_prometheus_label(record["check"])}",section="{_prometheus_label(record["section"])}"'
+            lines.append(f"{name}{{{labels}}} {value(record)}")
+    # One series per check and status (1 for the current one): the free-text reason,
+    # which carries live numbers, stays out of the labels and is only in /status
+    lines.append("# HELP surge_check_info Current status of each check (pass, fail or timeout).")
+    lines.append("# TYPE surge_check_info gauge")
+    for record in records:
+        for status in CHECK_STATUSES:
+            labels = f'check="{_prometheus_label(record["check"])}",status="{status}"'
+            lines.append(f"surge_check_info{{{labels}}} {1 if record['status'] == status else 0}")
+    
+    details = next((record["details"] for record in records if record["check"] == "decypharr_metrics" and record.get("details")), None)
+    if details:
+        if details["queue_depth"] is not None:
+            lines.append("# HELP surge_decypharr_queue_depth Items waiting in Decypharr's queues.")
+            lines.append("# TYPE surge_decypharr_queue_depth gauge")
+            lines.append(f"surge_decypharr_queue_depth {details['queue_depth']}")
+        if details["repair"]:
+            lines.append("# HELP surge_decypharr_repair Decypharr repair worker metrics.")
+            lines.append("# TYPE surge_decypharr_repair gauge")
+            for key, value in sorted(details["repair"].items()):
+                lines.append(f'surge_decypharr_repair{{metric="{_prometheus_label(key)}"}} {value}')
+        for name, key, help_text in [("surge_debrid_latency_ms", "latency_ms", "Average debrid API latency in milliseconds."),
+                                     ("surge_debrid_error_rate", "error_rate", "Share of debrid API requests that failed.")]:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for debrid, stats in sorted(details["debrids"].items()):
+                if stats[key] is not None:
+                    lines.append(f'{name}{{debrid="{_prometheus_label(debrid)}"}} {stats[key]}')
+    return "\n".join(lines) + "\n"
+
+PROMETHEUS_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)')
+PROMETHEUS_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+DEBRID_LABELS = ("debrid", "provider")
+
+# Decypharr series read by the metrics check, by exact name
+DECYPHARR_QUEUE_METRIC = "decypharr_queue_depth"
+DECYPHARR_REPAIR_METRICS = {
+    "decypharr_repair_checked_total": "checked",
+    "decypharr_repair_queued": "queued",
+    "decypharr_repair_broken_total": "broken",
+    "decypharr_repair_workers_active": "workers",
+}
+DECYPHARR_DEBRID_METRICS = {
+    "decypharr_debrid_requests_total": "requests",
+    "decypharr_debrid_errors_total": "errors",
+    "decypharr_debrid_request_duration_seconds_sum": "latency_sum_ms",
+    "decypharr_debrid_request_duration_seconds_count": "latency_count",
+}
+
+def parse_prometheus(text):
+    """Parse Prometheus text exposition into [(name, {label: value}, float value)]."""
+    samples = []
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        match = PROMETHEUS_LINE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        labels = {key: raw.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')
+                  for key, raw in PROMETHEUS_LABEL.findall(labels or '')}
+        samples.append((name, labels, value))
+    return samples
+
+def summarize_decypharr_metrics(samples):
+    """
+    Reduce Decypharr's /metrics samples to queue depth, repair progress and
+    per-debrid request, error and latency counters. Only the series named in
+    DECYPHARR_QUEUE_METRIC, DECYPHARR_REPAIR_METRICS and DECYPHARR_DEBRID_METRICS
+    are read; everything else is ignored.
+    """
+    summary = {"queue_depth": None, "repair": {}, "debrids": {}}
+    for name, labels, value in samples:
+        if value != value:  # NaN
+            continue
+        if name == DECYPHARR_QUEUE_METRIC:
+            summary["queue_depth"] = (summary["queue_depth"] or 0) + value
+        elif name in DECYPHARR_REPAIR_METRICS:
+            key = DECYPHARR_REPAIR_METRICS[name]
+            summary["repair"][key] = summary["repair"].get(key, 0) + value
+        elif name in DECYPHARR_DEBRID_METRICS:
+            debrid = next((labels[key] for key in DEBRID_LABELS if labels.get(key)), None)
+            if debrid is None:
+                continue
+            stats = summary["debrids"].setdefault(debrid, {"requests": 0.0, "errors": 0.0,
+                                                           "latency_sum_ms": 0.0, "latency_count": 0.0})
+            key = DECYPHARR_DEBRID_METRICS[name]
+            stats[key] += value * 1000 if key == "latency_sum_ms" else value
+    return summary
+
+def repair_progress(repair):
+    """Describe repair worker progress from the repair metrics, e.g. '120/400 checked, 2 workers'."""
+    done, total, workers = repair.get("checked"), repair.get("queued"), repair.get("workers")
+    parts = []
+    if done is not None and total is not None and total >= done:
+        parts.append(f"{done:.0f}/{total:.0f} checked")
+    elif done is not None:
+        parts.append(f"{done:.0f} checked")
+    if workers is not None:
+        parts.append(f"{workers:.0f} workers")
+    return ", ".join(parts)
+
+class StatusDaemon:
+    """
+    Keeps a live snapshot of every check, refreshing each one on its own
+    interval in the background, and serves it over a local HTTP endpoint:
+    /status (JSON), /metrics (Prometheus text) and /healthz.
+    """
+
+    def __init__(self, checker, intervals=None):
+        self.checker = checker
+        self.probes = checker.build_probes()
+        self.intervals = dict(CHECK_INTERVALS)
+        self.intervals.update(intervals or {})
+        self.snapshot = {}
+        self.next_due = {check_id: 0 for check_id, _section, _label, _probe in self.probes}
+        self.lock = threading.Lock()
+        self.version = 0
+        self._rendered = {}
+        self.stop_event = threading.Event()
+
+    def refresh_due(self):
+        """Run the checks whose interval has elapsed and merge them into the snapshot."""
+        now = time.monotonic()
+        due = [probe for probe in self.probes if self.next_due[probe[0]] <= now]
+        if not due:
+            return
+        records = self.checker.run_probes(due)
+        checked_at = datetime.now().astimezone().isoformat(timespec='seconds')
+        finished = time.monotonic()
+        with self.lock:
+            returned = {record["check"] for record in records}
+            for check_id, section, _label, _probe in due:
+                self.next_due[check_id] = finished + self.intervals.get(section, DEFAULT_CHECK_INTERVAL)
+                if check_id not in returned:
+                    self.snapshot.pop(check_id, None)  # no longer applicable
+            for record in records:
+                record["checked_at"] = checked_at
+                self.snapshot[record["check"]] = record
+            self.version += 1
+
+    def run_refresher(self):
+        """Background loop: refresh due checks, then sleep until the next one is due."""
+        while not self.stop_event.is_set():
+            try:
+                self.refresh_due()
+            except Exception as e:
+                self.checker.log(f"Status refresh failed: {e}", "ERROR")
+            with self.lock:
+                wait = min(self.next_due.values(), default=time.monotonic() + DEFAULT_CHECK_INTERVAL) - time.monotonic()
+            self.stop_event.wait(max(wait, 1))
+
+    def render(self, fmt):
+        """Return the snapshot rendered as 'json' or 'prometheus', cached until the next refresh."""
+        with self.lock:
+            cached = self._rendered.get(fmt)
+            if cached and cached[0] == self.version:
+                return cached[1]
+            order = [check_id for check_id, _section, _label, _probe in self.probes]
+            records = [self.snapshot[check_id] for check_id in order if check_id in self.snapshot]
+            body = (format_json(records) if fmt == 'json' else format_prometheus(records)).encode('utf-8')
+            self._rendered[fmt] = (self.version, body)
+            return body
+
+    def serve(self, host='127.0.0.1', port=8299):
+        """Start the refresher and serve snapshots until interrupted."""
+        import signal
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path in ('/', '/status'):
+                    body, content_type = daemon.render('json'), 'application/json'
+                elif path == '/metrics':
+                    body, content_type = daemon.render('prometheus'), 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/healthz':
+                    body, content_type = b'ok\n', 'text/plain'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep the daemon log to refresh events
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        refresher = threading.Thread(target=self.run_refresher, daemon=True)
+        refresher.start()
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+        self.checker.log(f"Serving interconnection status on http://{host}:{port} (/status, /metrics)", "INFO")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_event.set()
+            server.server_close()
+            self.checker.log("Status daemon stopped", "INFO")
+
+def parse_intervals(spec):
+    """Parse 'section=seconds,...' (e.g. 'availability=15,debrid=30') into a dict."""
+    intervals = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        section, _, seconds = item.partition('=')
+        intervals[section.strip()] = float(seconds)
+    return intervals
+
 def main():
     """Main execution function."""
-    storage_path = sys.argv[1] if len(sys.argv) > 1 else None
+    import argparse
     
-    checker = SurgeInterconnectionChecker(storage_path)
+    parser = argparse.ArgumentParser(description='Surge Service Interconnection Status Checker')
+    parser.add_argument('storage_path', nargs='?', default=None, help='Storage path (default: $STORAGE_PATH)')
+    parser.add_argument('--format', choices=['text', 'json', 'prometheus'], default='text',
+                        help='Output format: emoji log (default), JSON records, or Prometheus /metrics text')
+    parser.add_argument('--deadline', type=float, default=None,
+                        help='Overall probe deadline in seconds (default: $SURGE_STATUS_DEADLINE or 15)')
+    parser.add_argument('--serve', action='store_true',
+                        help='Run as a daemon that refreshes checks in the background and serves /status and /metrics')
+    parser.add_argument('--bind', default=os.environ.get('SURGE_STATUS_BIND', '127.0.0.1'),
+                        help='Address to serve on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('SURGE_STATUS_PORT', '8299')),
+                        help='Port to serve on (default: 8299)')
+    parser.add_argument('--intervals', default=os.environ.get('SURGE_STATUS_INTERVALS', ''),
+                        help='Per-section refresh intervals, e.g. availability=15,download_clients=600')
+    args = parser.parse_args()
+    
+    checker = SurgeInterconnectionChecker(args.storage_path, deadline=args.deadline)
+    
+    if args.serve:
+        StatusDaemon(checker, parse_intervals(args.intervals)).serve(args.bind, args.port)
+        return 0
     
     try:
-        all_configured = checker.generate_status_report()
+        if args.format == 'text':
+            all_configured = checker.generate_status_report()
+        else:
+            records = checker.collect_records()
+            output = format_json(records) if args.format == 'json' else format_prometheus(records)
+            sys.stdout.write(output if output.endswith("\n") else output + "\n")
+            all_configured = all(record["status"] == "pass" for record in records)
         return 0 if all_configured else 1
     except Exception as e:
         checker.log(f"Status check failed: {e}", "ERROR")
@@ -135,6 +135,10 @@ reset_service() {
         cd "$PROJECT_DIR"
         docker compose rm -s -f "$service"
         docker compose up -d "$service"
+        # A freshly created container already has any pending configuration
+        if [ -n "${SURGE_RESTART_QUEUE:-}" ]; then
+            python3 "$SCRIPT_DIR/restart_coordinator.py" cancel "$service" 2>/dev/null
+        fi
         print_success "$service has been reset!"
     else
         print_info "Reset cancelled."
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Surge Registry Digest Client
+
+Looks up the current manifest digest of image tags with registry v2 HEAD
+requests, so update checks cost a few KB per image instead of a pull.
+
+- Bearer token auth (anonymous, or with credentials from ~/.docker/config.json)
+- Multi-arch images: asks for the index/manifest list digest, which is what
+  docker records in RepoDigests when it pulls by tag
+- ETag caching: repeat checks send If-None-Match and reuse the cached digest
+  on 304 Not Modified
+"""
+
+import os
+import re
+import json
+import time
+import base64
+import threading
+
+import requests
+
+import http_client
+
+MANIFEST_MEDIA_TYPES = [
+    'application/vnd.oci.image.index.v1+json',
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+    'application/vnd.oci.image.manifest.v1+json',
+    'application/vnd.docker.distribution.manifest.v2+json',
+]
+DOCKER_HUB = 'docker.io'
+DOCKER_HUB_API = 'registry-1.docker.io'
+CHALLENGE_PARAM = re.compile(r'(\w+)="([^"]*)"')
+
+class RegistryError(Exception):
+    """Raised when a registry can't be reached or rejects a request."""
+
+def registry_host(repository):
+    """Return the registry a repository is pulled from (Docker Hub when unqualified)."""
+    first, _, rest = repository.partition('/')
+    if rest and ('.' in first or ':' in first or first == 'localhost'):
+        return first
+    return DOCKER_HUB
+
+def split_repository(repository):
+    """Split an image repository into (registry, path within the registry)."""
+    registry = registry_host(repository)
+    path = repository[len(registry) + 1:] if repository.startswith(registry + '/') else repository
+    if registry == DOCKER_HUB and '/' not in path:
+        path = f'library/{path}'
+    return registry, path
+
+def normalize_repository(repository):
+    """Return a canonical 'registry/path' form so local and remote names compare equal."""
+    return '/'.join(split_repository(repository))
+
+def registry_base_url(registry):
+    """Return the API base URL; localhost registries speak plain HTTP like docker assumes."""
+    if registry == DOCKER_HUB:
+        return f'https://{DOCKER_HUB_API}'
+    host = registry.rsplit(':', 1)[0]
+    scheme = 'http' if host in ('localhost', '127.0.0.1', '::1') else 'https'
+    return f'{scheme}://{registry}'
+
+def load_docker_credentials(config_path=None):
+    """Return {registry: (username, password)} from the docker CLI config, if present."""
+    config_path = config_path or os.path.join(
+        os.environ.get('DOCKER_CONFIG', os.path.expanduser('~/.docker')), 'config.json'
+    )
+    credentials = {}
+    try:
+        with open(config_path, 'r') as f:
+            auths = json.load(f).get('auths', {})
+    except (OSError, ValueError):
+        return credentials
+    for registry, entry in auths.items():
+        try:
+            username, _, password = base64.b64decode(entry.get('auth', '')).decode().partition(':')
+        except (ValueError, UnicodeDecodeError):
+            continue
+        if username:
+            host = re.sub(r'^https?://', '', registry).split('/')[0]
+            if host in ('index.docker.io', DOCKER_HUB_API):
+                host = DOCKER_HUB
+            credentials[host] = (username, password)
+    return credentials
+
+class RegistryClient:
+    """HEAD-based manifest digest lookups with token auth and ETag caching."""
+
+    def __init__(self, etag_cache=None, credentials=None, timeout=10):
+        # (registry, path, tag) -> {'etag': ..., 'digest': ...}; pass a dict to share or persist it
+        self.etag_cache = etag_cache if etag_cache is not None else {}
+        self.credentials = load_docker_credentials() if credentials is None else credentials
+        self.timeout = timeout
+        self._tokens = {}  # (registry, scope) -> (token, expires_at)
+        self._lock = threading.Lock()
+
+    def get_digest(self, repository, tag='latest'):
+        """Return the remote manifest digest for repository:tag."""
+        registry, path = split_repository(repository)
+        cache_key = (registry, path, tag)
+        url = f"{registry_base_url(registry)}/v2/{path}/manifests/{tag}"
+        scope = f'repository:{path}:pull'
+
+        with self._lock:
+            cached = self.etag_cache.get(cache_key)
+        headers = {'Accept': ', '.join(MANIFEST_MEDIA_TYPES)}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+
+        response = self._head(registry, scope, url, headers)
+        if response.status_code == 304 and cached:
+            return cached['digest']
+        if response.status_code != 200:
+            raise RegistryError(f"HEAD {url} returned {response.status_code}")
+
+        digest = response.headers.get('Docker-Content-Digest')
+        if not digest:
+            raise RegistryError(f"{registry} did not return a manifest digest for {path}:{tag}")
+        with self._lock:
+            self.etag_cache[cache_key] = {'etag': response.headers.get('ETag') or f'"{digest}"', 'digest': digest}
+        return digest
+
+    def _head(self, registry, scope, url, headers):
+        """Send the HEAD request, authenticating once if the registry challenges it."""
+        token = self._cached_token(registry, scope)
+        if token:
+            headers = dict(headers, Authorization=token)
+        try:
+            response = http_client.request('HEAD', url, headers=headers, timeout=self.timeout)
+            if response.status_code == 401:
+                token = self._authenticate(registry, scope, response.headers.get('WWW-Authenticate', ''))
+                response = http_client.request('HEAD', url, headers=dict(headers, Authorization=token), timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise RegistryError(f"HEAD {url} failed: {e}") from e
+        return response
+
+    def _cached_token(self, registry, scope):
+        with self._lock:
+            token, expires_at = self._tokens.get((registry, scope), (None, 0))
+        return token if time.monotonic() < expires_at else None
+
+    def _authenticate(self, registry, scope, challenge):
+        """Answer a WWW-Authenticate challenge and return the Authorization header value."""
+        scheme, _, params = challenge.partition(' ')
+        params = dict(CHALLENGE_PARAM.findall(params))
+        credentials = self.credentials.get(registry)
+
+        if scheme.lower() == 'basic':
+            if not credentials:
+                raise RegistryError(f"{registry} requires credentials")
+            value = 'Basic ' + base64.b64encode(':'.join(credentials).encode()).decode()
+            expires_in = 3600
+        elif scheme.lower() == 'bearer' and params.get('realm'):
+            query = {'scope': params.get('scope', scope)}
+            if params.get('service'):
+                query['service'] = params['service']
+            response = http_client.get(params['realm'], params=query, auth=credentials, timeout=self.timeout)
+            if response.status_code != 200:
+                raise RegistryError(f"Token request to {params['realm']} returned {response.status_code}")
+            body = response.json()
+            token = body.get('token') or body.get('access_token')
+            if not token:
+                raise RegistryError(f"{params['realm']} returned no token")
+            value = f'Bearer {token}'
+            expires_in = int(body.get('expires_in', 60))
+        else:
+            raise RegistryError(f"Unsupported registry auth challenge from {registry}: {challenge!r}")
+
+        with self._lock:
+            # Renew a little early so a token doesn't expire mid-sweep
+            self._tokens[(registry, scope)] = (value, time.monotonic() + max(expires_in - 10, 10))
+        return value
+
+def local_digest_for(repository, repo_digests):
+    """Pick the RepoDigests entry that belongs to repository and return its digest."""
+    wanted = normalize_repository(repository)
+    for entry in repo_digests or []:
+        name, _, digest = entry.partition('@')
+        if normalize_repository(name) == wanted:
+            return digest
+    return repo_digests[0].split('@')[-1] if repo_digests else ''
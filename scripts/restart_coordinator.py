@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Surge Restart Coordinator
+
+Configurators record restart intents instead of restarting containers
+themselves. While a run is in progress ($SURGE_RESTART_QUEUE points at the
+run's intent file) intents are only collected; at the end of the run
+flush() restarts every affected container once, one depends_on level at a
+time, with all services of a level restarted together.
+
+Config files changed through config_emitter ($SURGE_CONFIG_CHANGES) are
+turned into intents for the service whose directory they live in
+($STORAGE_PATH/<Service>/...); files elsewhere are ignored.
+
+Outside a run, request_restart() restarts the service immediately.
+
+Usage from shell scripts:
+    export SURGE_RESTART_QUEUE=$(mktemp)
+    python3 restart_coordinator.py request bazarr --reason "config updated"
+    python3 restart_coordinator.py cancel bazarr    # e.g. after recreating it
+    python3 restart_coordinator.py flush
+"""
+
+import os
+import sys
+import fcntl
+import subprocess
+from pathlib import Path
+
+from docker_engine import (DockerEngine, DockerEngineError, compose_command, compose_dependencies,
+                           default_project_name, dependency_levels)
+
+QUEUE_ENV = 'SURGE_RESTART_QUEUE'
+CHANGES_ENV = 'SURGE_CONFIG_CHANGES'
+HEALTH_TIMEOUT = int(os.environ.get('SURGE_HEALTH_TIMEOUT', '180'))
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+def _read_lines(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [line.rstrip('\n') for line in f if line.strip()]
+    except OSError:
+        return []
+
+def request_restart(service, reason='', project_dir=PROJECT_DIR):
+    """
+    Ask for a service to be restarted. Returns True if the restart was
+    queued for the end of the run or (outside a run) succeeded.
+    """
+    queue = os.environ.get(QUEUE_ENV)
+    if queue:
+        with open(queue, 'a', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.write(f"{service}\t{reason}\n")
+        print(f"🔁 {service} will be restarted at the end of this run" + (f" ({reason})" if reason else ""))
+        return True
+    return RestartCoordinator(project_dir).restart({service: [reason] if reason else []})
+
+def cancel_restart(service):
+    """Drop earlier intents (and config changes) for a service that was just recreated anyway."""
+    queue = os.environ.get(QUEUE_ENV)
+    if queue:
+        with open(queue, 'a', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.write(f"!{service}\n")
+
+class RestartCoordinator:
+    """Restarts collected services once each, in dependency order."""
+
+    def __init__(self, project_dir=PROJECT_DIR, health_timeout=HEALTH_TIMEOUT):
+        self.project_dir = Path(project_dir)
+        self.health_timeout = health_timeout
+        self.compose_args = compose_command(self.project_dir)
+        self.project_name = default_project_name(self.project_dir)
+        self.docker = DockerEngine()
+        self.depends_on = None
+
+    def dependencies(self):
+        if self.depends_on is None:
+            self.depends_on = compose_dependencies(self.project_dir)
+        return self.depends_on
+
+    def storage_path(self):
+        """Return $STORAGE_PATH (or the project's .env value) as a resolved Path, or None."""
+        path = os.environ.get('STORAGE_PATH')
+        if not path:
+            for line in _read_lines(self.project_dir / '.env'):
+                if line.startswith('STORAGE_PATH='):
+                    path = line.split('=', 1)[1].strip().strip('"\'')
+                    break
+        return Path(path).resolve() if path else None
+
+    def service_for_path(self, path, storage=None):
+        """Return the service owning a changed file, i.e. the first directory under STORAGE_PATH."""
+        storage = storage or self.storage_path()
+        if storage is None:
+            return None
+        try:
+            relative = Path(path).resolve().relative_to(storage)
+        except ValueError:
+            return None
+        if len(relative.parts) < 2:
+            return None
+        service = relative.parts[0].lower()
+        return service if service in self.dependencies() else None
+
+    def pending(self):
+        """Return {service: [reasons]} from the intent queue and changed config files."""
+        intents = {}
+        cancelled = set()
+        for line in _read_lines(os.environ.get(QUEUE_ENV, '')):
+            if line.startswith('!'):
+                # Recreated since: earlier intents are satisfied
+                intents.pop(line[1:].strip(), None)
+                cancelled.add(line[1:].strip())
+                continue
+            service, _, reason = line.partition('\t')
+            cancelled.discard(service.strip())
+            reasons = intents.setdefault(service.strip(), [])
+            if reason and reason not in reasons:
+                reasons.append(reason)
+
+        storage = self.storage_path()
+        for path in _read_lines(os.environ.get(CHANGES_ENV, '')):
+            # $STORAGE_PATH/<Service>/config/... belongs to <service>
+            service = self.service_for_path(path, storage)
+            if service and service not in cancelled:
+                reasons = intents.setdefault(service, [])
+                reason = f"{Path(path).name} changed"
+                if reason not in reasons:
+                    reasons.append(reason)
+        return intents
+
+    def restart(self, intents):
+        """Restart each service in intents once, level by level. Returns True if all restarted."""
+        if not intents:
+            return True
+        try:
+            existing = self.docker.compose_services(self.project_name)
+        except DockerEngineError:
+            existing = None  # no API access: let compose decide
+        services = [service for service in intents if existing is None or service in existing]
+        skipped = sorted(set(intents) - set(services))
+        if skipped:
+            print(f"⏭️  No container, nothing to restart: {', '.join(skipped)}")
+
+        levels = dependency_levels(services, self.dependencies())
+        for index, level in enumerate(levels):
+            for service in level:
+                reasons = intents.get(service) or []
+                print(f"🔄 Restarting {service}" + (f" ({'; '.join(reasons)})" if reasons else ""))
+            result = subprocess.run(self.compose_args + ['restart'] + level, capture_output=True, text=True,
+                                    cwd=self.project_dir)
+            if result.returncode != 0:
+                print(f"⚠️ Could not restart {', '.join(level)}: {result.stderr.strip()}")
+                print("💡 Please restart them manually via Docker Compose")
+                return False
+            # Dependents only restart once what they depend on is back up
+            if index < len(levels) - 1 and existing is not None:
+                unhealthy = self.docker.wait_healthy(self.project_name, level, self.health_timeout)
+                if unhealthy:
+                    print(f"⚠️ Not healthy after restart: {', '.join(unhealthy)}")
+        if services:
+            print(f"✅ Restarted {len(services)} service(s): {', '.join(sorted(services))}")
+        return True
+
+    def flush(self):
+        """Restart everything collected during the run and clear the queue."""
+        ok = self.restart(self.pending())
+        for env in (QUEUE_ENV, CHANGES_ENV):
+            path = os.environ.get(env)
+            if path:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+        return ok
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Collect and apply container restarts for a Surge run')
+    parser.add_argument('--project-dir', default=str(PROJECT_DIR))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    request_parser = subparsers.add_parser('request', help='Restart a service (at the end of the run, if one is active)')
+    request_parser.add_argument('service')
+    request_parser.add_argument('--reason', default='')
+    cancel_parser = subparsers.add_parser('cancel', help='Drop queued restarts for a service that was just recreated')
+    cancel_parser.add_argument('service')
+    subparsers.add_parser('flush', help='Restart every service collected during the run')
+    args = parser.parse_args()
+
+    if args.command == 'request':
+        return 0 if request_restart(args.service, args.reason, args.project_dir) else 1
+    if args.command == 'cancel':
+        cancel_restart(args.service)
+        return 0
+    return 0 if RestartCoordinator(args.project_dir).flush() else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -43,6 +43,12 @@ import time
 import sqlite3
 import subprocess
 
+import config_emitter
+import http_client
+import restart_coordinator
+import file_watch
+import service_credentials
+
 def generate_secure_password():
     """Generate a secure password for services"""
     import secrets, string
@@ -64,27 +70,27 @@ def find_storage_path():
         raise RuntimeError("STORAGE_PATH environment variable is required but not set. Please run './surge setup' or export STORAGE_PATH before running this script.")
     return storage_path
 
-def get_api_key_from_xml(config_path):
+def get_api_key_from_xml(config_path, verbose=True):
     """Extract API key from XML config file."""
-    try:
-        if not os.path.exists(config_path):
+    if not os.path.exists(config_path):
+        if verbose:
             print(f"⚠️ Config file not found: {config_path}")
-            return None
-            
-        tree = ET.parse(config_path)
-        root = tree.getroot()
-        
-        # Look for ApiKey element
-        api_key_elem = root.find('.//ApiKey')
-        if api_key_elem is not None and api_key_elem.text:
-            return api_key_elem.text.strip()
-            
-        print(f"⚠️ ApiKey not found in {config_path}")
-        return None
-        
-    except Exception as e:
-        print(f"❌ Error reading {config_path}: {e}")
         return None
+    
+    api_key = service_credentials.read_api_key(config_path, 'xml')
+    if not api_key and verbose:
+        print(f"⚠️ ApiKey not found or unreadable in {config_path}")
+    return api_key
+
+def wait_for_api_keys(config_paths, timeout):
+    """Wait until every XML config has an ApiKey, returning the keys (None where missing)."""
+    def read_keys():
+        keys = [get_api_key_from_xml(path, verbose=False) for path in config_paths]
+        return keys if all(keys) else None
+    
+    # Woken by inotify as soon as a container writes its config.xml
+    keys = file_watch.wait_for(config_paths, read_keys, timeout=timeout)
+    return keys or [get_api_key_from_xml(path) for path in config_paths]
 
 def add_applications_to_prowlarr_config(config_path, radarr_api_key, sonarr_api_key):
         return None
@@ -97,27 +103,24 @@ def wait_for_service(url, api_key=None, max_retries=12, retry_delay=10):
     
     for attempt in range(max_retries):
         try:
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, timeout=5) as response:
-                if response.status == 200:
-                    return True
-        except urllib.error.HTTPError as e:
-            if e.code == 401:
+            response = http_client.get(url, headers=headers, timeout=5, retries=0)
+            if response.status_code == 200:
+                return True
+            if response.status_code == 401:
                 # API key might be wrong, try without it first to see if service is up
                 if api_key:
                     try:
-                        req_no_auth = urllib.request.Request(url.replace('/api/v1/system/status', '/ping'))
-                        with urllib.request.urlopen(req_no_auth, timeout=5) as response:
-                            if response.status in [200, 401, 403]:  # Service is up but needs auth
-                                print(f"🔑 Service is up but API key might be incorrect. Retrying...")
-                                # Wait a bit longer for service to fully initialize its config
-                                time.sleep(retry_delay * 2)
-                            continue
+                        ping = http_client.get(url.replace('/api/v1/system/status', '/ping'), timeout=5, retries=0)
+                        if ping.status_code in [200, 401, 403]:  # Service is up but needs auth
+                            print(f"🔑 Service is up but API key might be incorrect. Retrying...")
+                            # Wait a bit longer for service to fully initialize its config
+                            time.sleep(retry_delay * 2)
+                        continue
                     except:
                         pass
                 print(f"🔄 Service authentication failed, retrying in {retry_delay}s... (attempt {attempt + 1}/{max_retries})")
             else:
-                print(f"🔄 Service not ready (HTTP {e.code}), retrying in {retry_delay}s... (attempt {attempt + 1}/{max_retries})")
+                print(f"🔄 Service not ready (HTTP {response.status_code}), retrying in {retry_delay}s... (attempt {attempt + 1}/{max_retries})")
         except Exception as e:
             print(f"🔄 Service not ready, retrying in {retry_delay}s... (attempt {attempt + 1}/{max_retries})")
         
@@ -215,21 +218,13 @@ def configure_prowlarr_xml_directly(storage_path, radarr_api_key, sonarr_api_key
 def make_api_request(url, headers, data=None, method='GET'):
     """Make HTTP request to Prowlarr API."""
     try:
-        if data:
-            data = json.dumps(data).encode('utf-8')
-            headers['Content-Type'] = 'application/json'
-        
-        req = urllib.request.Request(url, data=data, headers=headers, method=method)
+        response = http_client.request(method, url, headers=headers, json=data, timeout=30)
         
-        with urllib.request.urlopen(req, timeout=30) as response:
-            if response.status in [200, 201]:
-                return True, json.loads(response.read().decode('utf-8'))
-            else:
-                return False, f"HTTP {response.status}"
+        if response.status_code in [200, 201]:
+            return True, response.json() if response.content else None
+        else:
+            return False, f"HTTP {response.status_code}: {response.text}"
     
-    except urllib.error.HTTPError as e:
-        error_msg = e.read().decode('utf-8') if e.fp else str(e)
-        return False, f"HTTP {e.code}: {error_msg}"
     except Exception as e:
         return False, str(e)
 
@@ -356,23 +351,8 @@ def configure_prowlarr_applications(storage_path=None):
     
     # Wait for services to generate their configurations
     print("⏳ Waiting for services to generate configuration files...")
-    max_config_wait = 8
-    for attempt in range(max_config_wait):
-        radarr_api_key = get_api_key_from_xml(radarr_config)
-        sonarr_api_key = get_api_key_from_xml(sonarr_config)
-        prowlarr_api_key = get_api_key_from_xml(prowlarr_config)
-        
-        if radarr_api_key and sonarr_api_key and prowlarr_api_key:
-            break
-            
-        if attempt < max_config_wait - 1:
-            print(f"🔄 Waiting for API keys to be generated... (attempt {attempt + 1}/{max_config_wait})")
-            time.sleep(15)
-    
-    # Final check for API keys
-    radarr_api_key = get_api_key_from_xml(radarr_config)
-    sonarr_api_key = get_api_key_from_xml(sonarr_config)
-    prowlarr_api_key = get_api_key_from_xml(prowlarr_config)
+    radarr_api_key, sonarr_api_key, prowlarr_api_key = wait_for_api_keys(
+        [radarr_config, sonarr_config, prowlarr_config], timeout=120)
     
     if not all([radarr_api_key, sonarr_api_key, prowlarr_api_key]):
         print("❌ Failed to read API keys for all services")
@@ -578,9 +558,8 @@ def configure_bazarr_applications():
     print(f"🔍 Checking for Sonarr config at: {sonarr_config}")
     print(f"🔍 Checking for Bazarr YAML config at: {bazarr_config}")
     
-    # Wait for config files to exist with retries
-    max_retries = 6
-    retry_delay = 10
+    # Wait up to a minute for the config files to exist
+    max_wait = 60
 
     plex_enabled = False
     plex_token = None
@@ -598,22 +577,17 @@ def configure_bazarr_applications():
     if os.environ.get("PLEX_TOKEN"):
         plex_token = os.environ["PLEX_TOKEN"]
 
-    for attempt in range(max_retries):
-        radarr_api_key = get_api_key_from_xml(radarr_config)
-        sonarr_api_key = get_api_key_from_xml(sonarr_config)
-        if radarr_api_key and sonarr_api_key:
-            print(f"✅ Found API keys on attempt {attempt + 1}")
-            break
-        elif attempt < max_retries - 1:
-            print(f"⏳ API keys not ready, waiting {retry_delay}s... (attempt {attempt + 1}/{max_retries})")
-            time.sleep(retry_delay)
-        else:
-            print("❌ Could not get API keys after all retries")
-            if not radarr_api_key:
-                print(f"   - Radarr API key missing from {radarr_config}")
-            if not sonarr_api_key:
-                print(f"   - Sonarr API key missing from {sonarr_config}")
-            return False
+    print("⏳ Waiting for Radarr and Sonarr API keys...")
+    radarr_api_key, sonarr_api_key = wait_for_api_keys([radarr_config, sonarr_config], timeout=max_wait)
+    if radarr_api_key and sonarr_api_key:
+        print("✅ Found API keys")
+    else:
+        print(f"❌ Could not get API keys after {max_wait}s")
+        if not radarr_api_key:
+            print(f"   - Radarr API key missing from {radarr_config}")
+        if not sonarr_api_key:
+            print(f"   - Sonarr API key missing from {sonarr_config}")
+        return False
     
     # Check if Bazarr YAML config exists
     if not os.path.exists(bazarr_config):
@@ -692,30 +666,19 @@ def configure_bazarr_applications():
             'http_timeout': 60
         })
         
-        # Write updated config back to file
-        with open(bazarr_config, 'w') as f:
-            yaml.dump(config_data, f, default_flow_style=False, sort_keys=False)
-            
+        # Write updated config back to file (untouched if nothing changed)
+        if not config_emitter.emit_yaml(bazarr_config, config_data):
+            print(f"✅ Bazarr YAML configuration already up to date: {bazarr_config}")
+            return True
+
         print("✅ Bazarr YAML configuration updated successfully!")
         print(f"📝 Configuration written to: {bazarr_config}")
         print(f"🔗 Radarr connection: surge-radarr:7878 (API: {radarr_api_key[:8]}...)")
         print(f"🔗 Sonarr connection: surge-sonarr:8989 (API: {sonarr_api_key[:8]}...)")
         
-        # Attempt to restart Bazarr container to pick up new configuration
-        print("� Attempting to restart Bazarr container to pick up new configuration...")
-        try:
-            import subprocess
-            result = subprocess.run(['docker', 'compose', 'restart', 'bazarr'], 
-                                  capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(__file__)))
-            if result.returncode == 0:
-                print("✅ Bazarr container restarted successfully!")
-                print("💡 Bazarr should now show Radarr and Sonarr connections in Settings")
-            else:
-                print(f"⚠️ Could not restart Bazarr container: {result.stderr}")
-                print("💡 Please restart Bazarr manually via web interface or Docker Compose")
-        except Exception as e:
-            print(f"⚠️ Could not restart Bazarr container: {e}")
-            print("💡 Please restart Bazarr manually via web interface or Docker Compose")
+        # Restart Bazarr to pick up the new configuration (once, at the end of the run)
+        restart_coordinator.request_restart('bazarr', 'Radarr/Sonarr connections updated')
+        print("💡 Bazarr will show Radarr and Sonarr connections in Settings after its restart")
         
         return True
         
@@ -804,23 +767,16 @@ def configure_gaps_applications():
     
     print(f"🔍 Checking for Radarr config at: {radarr_config}")
     
-    # Wait for Radarr API key with retries
-    max_retries = 6
-    retry_delay = 10
-    
-    for attempt in range(max_retries):
-        radarr_api_key = get_api_key_from_xml(radarr_config)
-        
-        if radarr_api_key:
-            print(f"✅ Found Radarr API key on attempt {attempt + 1}")
-            break
-        elif attempt < max_retries - 1:
-            print(f"⏳ Radarr API key not ready, waiting {retry_delay}s... (attempt {attempt + 1}/{max_retries})")
-            time.sleep(retry_delay)
-        else:
-            print("❌ Could not get Radarr API key after all retries")
-            print(f"   - Radarr API key missing from {radarr_config}")
-            return False
+    # Wait up to a minute for the Radarr API key
+    max_wait = 60
+    print("⏳ Waiting for Radarr API key...")
+    radarr_api_key, = wait_for_api_keys([radarr_config], timeout=max_wait)
+    if radarr_api_key:
+        print("✅ Found Radarr API key")
+    else:
+        print(f"❌ Could not get Radarr API key after {max_wait}s")
+        print(f"   - Radarr API key missing from {radarr_config}")
+        return False
     
     # Get TMDB API key
     tmdb_api_key = get_tmdb_api_key()
@@ -846,16 +802,13 @@ def configure_gaps_applications():
     print("⏳ Waiting for GAPS to be ready...")
     for attempt in range(max_gaps_retries):
         try:
-            import urllib.request
-            import urllib.error
-            
             # Try to access GAPS homepage
-            req = urllib.request.Request(f"{gaps_url}/", headers={'User-Agent': 'Surge-Config/1.0'})
-            response = urllib.request.urlopen(req, timeout=10)
-            if response.status == 200:
+            response = http_client.get(f"{gaps_url}/", timeout=10, retries=0)
+            response.raise_for_status()
+            if response.status_code == 200:
                 print(f"✅ GAPS is ready on attempt {attempt + 1}")
                 break
-        except (urllib.error.URLError, urllib.error.HTTPError, Exception) as e:
+        except Exception as e:
             if attempt < max_gaps_retries - 1:
                 print(f"⏳ GAPS not ready yet, waiting {gaps_retry_delay}s... (attempt {attempt + 1}/{max_gaps_retries})")
                 time.sleep(gaps_retry_delay)
@@ -867,22 +820,16 @@ def configure_gaps_applications():
     
     # Configure GAPS via REST API
     try:
-        import urllib.request
-        import urllib.parse
-        import json
-        
         print("📝 Configuring GAPS via REST API...")
         
         # 1. Test TMDB API key first
         test_url = f"{gaps_url}/configuration/test/tmdbKey/{tmdb_api_key}"
         print(f"🔍 Testing TMDB API key...")
         
-        req = urllib.request.Request(test_url, headers={'User-Agent': 'Surge-Config/1.0'})
-        req.get_method = lambda: 'PUT'
-        
         try:
-            response = urllib.request.urlopen(req, timeout=30)
-            test_response = json.loads(response.read().decode('utf-8'))
+            response = http_client.put(test_url, timeout=30)
+            response.raise_for_status()
+            test_response = response.json()
             
             if test_response.get('code') == 20:  # TMDB_KEY_VALID = 20
                 print("✅ TMDB API key is valid")
@@ -898,12 +845,10 @@ def configure_gaps_applications():
         save_url = f"{gaps_url}/configuration/save/tmdbKey/{tmdb_api_key}"
         print(f"💾 Saving TMDB API key...")
         
-        req = urllib.request.Request(save_url, headers={'User-Agent': 'Surge-Config/1.0'})
-        req.get_method = lambda: 'POST'
-        
         try:
-            response = urllib.request.urlopen(req, timeout=30)
-            save_response = json.loads(response.read().decode('utf-8'))
+            response = http_client.post(save_url, timeout=30)
+            response.raise_for_status()
+            save_response = response.json()
             
             if save_response.get('code') == 23:  # TMDB_KEY_SAVE_SUCCESSFUL = 23
                 print("✅ TMDB API key saved successfully")
@@ -927,24 +872,13 @@ def configure_gaps_applications():
                 'plexToken': plex_token
             }
             
-            # Encode form data
-            encoded_data = urllib.parse.urlencode(plex_data).encode('utf-8')
-            
-            req = urllib.request.Request(
-                plex_url, 
-                data=encoded_data,
-                headers={
-                    'Content-Type': 'application/x-www-form-urlencoded',
-                    'User-Agent': 'Surge-Config/1.0'
-                }
-            )
-            
             try:
-                response = urllib.request.urlopen(req, timeout=30)
-                if response.status == 200:
+                # Sent as form data (application/x-www-form-urlencoded)
+                response = http_client.post(plex_url, data=plex_data, timeout=30)
+                if response.status_code == 200:
                     print("✅ Plex server added successfully")
                 else:
-                    print(f"⚠️ Plex server add returned status: {response.status}")
+                    print(f"⚠️ Plex server add returned status: {response.status_code}")
                     
             except Exception as e:
                 print(f"⚠️ Failed to add Plex server (non-critical): {e}")
@@ -1087,23 +1021,18 @@ def add_download_client_to_service(service_name, port, storage_path, client_conf
     }
     
     try:
-        data = json.dumps(download_client_data).encode('utf-8')
-        req = urllib.request.Request(
+        response = http_client.post(
             f"http://localhost:{port}/api/v3/downloadclient",
-            data=data,
-            headers={
-                'Content-Type': 'application/json',
-                'X-Api-Key': api_key
-            },
-            method='POST'
+            json=download_client_data,
+            headers={'X-Api-Key': api_key},
+            timeout=10
         )
         
-        with urllib.request.urlopen(req, timeout=10) as response:
-            if response.status in [200, 201]:
-                print(f"✅ {client_config['name']} added to {service_name.title()} successfully")
-                return True
-            else:
-                print(f"❌ Failed to add {client_config['name']} to {service_name.title()} (HTTP {response.status})")
+        if response.status_code in [200, 201]:
+            print(f"✅ {client_config['name']} added to {service_name.title()} successfully")
+            return True
+        else:
+            print(f"❌ Failed to add {client_config['name']} to {service_name.title()} (HTTP {response.status_code})")
                 
     except Exception as e:
         print(f"❌ Error adding {client_config['name']} to {service_name.title()}: {e}")
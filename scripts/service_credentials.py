@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Surge Service Credential Registry
+
+Single place to read service API keys from their config files:
+- Radarr, Sonarr and Prowlarr config.xml (<ApiKey>)
+- Bazarr config.yaml or legacy config.ini (auth.apikey)
+- Tautulli config.ini (General.api_key)
+
+Each file is parsed at most once per process while its mtime and size are
+unchanged. Parsed keys are also persisted to a small JSON cache so that
+configurators spawned as subprocesses during one ./surge run can reuse
+them without parsing the same files again.
+
+The cache ($STORAGE_PATH/.surge-credentials.json) is created 0600 and
+replaced atomically. It only holds keys that already sit in plaintext in
+the services' own config files under the same STORAGE_PATH, readable by
+the same user, so it exposes nothing those files don't. An entry is only
+used while its file's mtime and size match, so rotated keys are re-read.
+"""
+
+import os
+import json
+import threading
+import configparser
+import xml.etree.ElementTree as ET
+
+# Config file locations relative to STORAGE_PATH, and how to read them
+SERVICE_SOURCES = {
+    'radarr': ('Radarr/config/config.xml', 'xml'),
+    'sonarr': ('Sonarr/config/config.xml', 'xml'),
+    'prowlarr': ('Prowlarr/config/config.xml', 'xml'),
+    'bazarr': ('Bazarr/config/config/config.yaml', 'bazarr'),
+    'tautulli': ('Tautulli/config/config.ini', 'tautulli'),
+}
+
+CACHE_FILENAME = '.surge-credentials.json'
+
+def parse_xml_api_key(path):
+    """Read <ApiKey> from an *arr config.xml."""
+    root = ET.parse(path).getroot()
+    element = root.find('.//ApiKey')
+    if element is not None and element.text:
+        return element.text.strip()
+    return None
+
+def parse_bazarr_api_key(path):
+    """Read auth.apikey from Bazarr's config.yaml (or the older config.ini)."""
+    if path.endswith('.ini'):
+        config = configparser.ConfigParser()
+        config.read(path)
+        if config.has_section('auth') and config.has_option('auth', 'apikey'):
+            return config.get('auth', 'apikey').strip() or None
+        return None
+    import yaml
+    with open(path, 'r') as f:
+        config = yaml.safe_load(f)
+    api_key = (config or {}).get('auth', {}).get('apikey')
+    return str(api_key).strip() if api_key else None
+
+def parse_tautulli_api_key(path):
+    """Read General.api_key from Tautulli's config.ini."""
+    config = configparser.ConfigParser()
+    config.read(path)
+    if config.has_section('General') and config.has_option('General', 'api_key'):
+        return config.get('General', 'api_key').strip() or None
+    return None
+
+PARSERS = {
+    'xml': parse_xml_api_key,
+    'bazarr': parse_bazarr_api_key,
+    'tautulli': parse_tautulli_api_key,
+}
+
+class CredentialRegistry:
+    """mtime-keyed API key cache shared in-process and across subprocesses."""
+
+    def __init__(self, storage_path=None, cache_file=None):
+        self.storage_path = storage_path or os.environ.get('STORAGE_PATH', '/opt/surge')
+        self.cache_file = cache_file or os.environ.get('SURGE_CREDENTIAL_CACHE') or \
+            os.path.join(self.storage_path, CACHE_FILENAME)
+        self._entries = {}  # abs path -> {'mtime_ns', 'size', 'api_key'}
+        self._disk_entries = None
+        self._disk_signature = None
+        self._lock = threading.Lock()
+
+    def path_for(self, service):
+        """Return the default config file path for a service."""
+        return os.path.join(self.storage_path, SERVICE_SOURCES[service][0])
+
+    def get(self, service):
+        """Return the API key for a known service, or None if unavailable."""
+        if service not in SERVICE_SOURCES:
+            return None
+        return self.read(self.path_for(service), SERVICE_SOURCES[service][1])
+
+    def read(self, path, kind='xml'):
+        """
+        Return the API key stored in path, parsing it only if the file
+        changed since it was last read by this or another Surge process.
+        Returns None if the file is missing, unreadable or has no key.
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path) or self._load_disk_cache().get(path)
+            if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                self._entries[path] = entry
+                return entry['api_key']
+
+            try:
+                api_key = PARSERS[kind](path)
+            except Exception:
+                # Usually a half-written file; the next write changes mtime and we parse again
+                api_key = None
+            entry = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'api_key': api_key}
+            self._entries[path] = entry
+            if api_key:
+                self._save_disk_cache(path, entry)
+            return api_key
+
+    def _load_disk_cache(self):
+        """Load the shared cache file, re-reading it only when it changed."""
+        try:
+            stat = os.stat(self.cache_file)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return self._disk_entries or {}
+        if signature != self._disk_signature:
+            try:
+                with open(self.cache_file, 'r') as f:
+                    self._disk_entries = json.load(f)
+            except (OSError, ValueError):
+                self._disk_entries = {}
+            self._disk_signature = signature
+        return self._disk_entries
+
+    def _save_disk_cache(self, path, entry):
+        """Merge one entry into the shared cache file (best effort, owner-only permissions)."""
+        entries = dict(self._load_disk_cache())
+        entries[path] = entry
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_file, self.cache_file)
+            self._disk_entries = entries
+            stat = os.stat(self.cache_file)
+            self._disk_signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_registry(storage_path=None):
+    """Return the process-wide registry for a storage path."""
+    storage_path = storage_path or os.environ.get('STORAGE_PATH', '/opt/surge')
+    with _registries_lock:
+        if storage_path not in _registries:
+            _registries[storage_path] = CredentialRegistry(storage_path)
+        return _registries[storage_path]
+
+def read_api_key(path, kind='xml'):
+    """Read an API key from any config file through the default registry."""
+    return get_registry().read(path, kind)
@@ -118,6 +118,19 @@ send_discord_notification() {
 EOF
     )
     
+    enqueue_discord_payload "$webhook_url" "$payload"
+}
+
+# Queue a webhook payload with the Surge dispatcher (batched, deduplicated,
+# rate limited) without waiting; post directly if python3 is unavailable
+enqueue_discord_payload() {
+    local webhook_url="$1"
+    local payload="$2"
+    
+    if command -v python3 >/dev/null 2>&1 && \
+       printf '%s' "$payload" | python3 "$SCRIPT_DIR/discord_dispatch.py" enqueue --webhook "$webhook_url" 2>/dev/null; then
+        return 0
+    fi
     curl -s -H "Content-Type: application/json" \
          -d "$payload" \
          "$webhook_url" > /dev/null 2>&1
@@ -308,6 +321,10 @@ update_zurg_config() {
                 cp "$PROJECT_DIR/configs/plex_update.sh.template" "$config_dir/plex_update.sh"
                 chmod +x "$config_dir/plex_update.sh"
                 print_info "Plex update script copied to Zurg config directory"
+                # The hook queues updated directories here for the decypharr-catalog service;
+                # Zurg's container must mount the host's /mnt/surge at the same path
+                mkdir -p /mnt/surge 2>/dev/null || sudo mkdir -p /mnt/surge 2>/dev/null || \
+                    print_warning "Could not create /mnt/surge for the Decypharr catalog update queue"
             fi
         else
             print_warning "Zurg template not found at $PROJECT_DIR/configs/zurg-config.yml.template"
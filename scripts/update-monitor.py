@@ -10,17 +10,26 @@ import json
 import os
 import sys
 import logging
-from datetime import datetime
+import signal
+import time
+import random
+import threading
+import statistics
+from datetime import datetime, timedelta
 from pathlib import Path
-import subprocess
+
+from docker_engine import DockerEngine, DockerEngineError, compose_command, default_project_name
+from update_store import UpdateStore
+import discord_dispatch
 
 # Try to import requests, handle gracefully if not available
 try:
     import requests
+    from registry_client import RegistryClient, local_digest_for, registry_host
     REQUESTS_AVAILABLE = True
 except ImportError:
     REQUESTS_AVAILABLE = False
-    print("Warning: 'requests' module not available. Discord notifications will be disabled.")
+    print("Warning: 'requests' module not available. Registry digest checks will fall back to docker manifest inspect.")
     print("Install with: pip install requests")
 
 # Setup logging
@@ -43,164 +52,280 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def short_digest(digest):
+    """Return the first 12 hex characters of a sha256:... digest."""
+    return digest.split(':')[-1][:12]
+
+def run_in_daemon_thread(func, *args):
+    """
+    Await a blocking call without blocking the event loop. Unlike
+    asyncio.to_thread the worker is a daemon thread, so stopping the monitor
+    never waits for a slow registry or Docker API response.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def deliver(result, error):
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+    
+    def runner():
+        try:
+            result, error = func(*args), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(deliver, result, error)
+        except RuntimeError:
+            pass  # event loop already closed
+    
+    threading.Thread(target=runner, daemon=True).start()
+    return future
+
+def parse_time_window(spec):
+    """Parse 'HH:MM-HH:MM' into (start, end) datetime.time values; the window may wrap midnight."""
+    start, _, end = spec.partition('-')
+    return (datetime.strptime(start.strip(), '%H:%M').time(), datetime.strptime(end.strip(), '%H:%M').time())
+
+# Aim for this many checks per typical interval between an image's releases
+CHECKS_PER_CHANGE = 24
+
+class RegistryRateLimiter:
+    """Spaces out requests to each registry so a sweep doesn't trip its rate limits."""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next_slot = {}
+        self._locks = {}
+    
+    async def acquire(self, registry):
+        """Wait until the next request to registry is allowed."""
+        lock = self._locks.setdefault(registry, asyncio.Lock())
+        async with lock:
+            now = asyncio.get_running_loop().time()
+            slot = max(now, self._next_slot.get(registry, now))
+            self._next_slot[registry] = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+
 class UpdateMonitor:
     def __init__(self):
         self.project_dir = Path(__file__).parent.parent
-        self.compose_file = self.project_dir / "docker-compose.yml"
         self.last_check = None
         self.check_interval = int(os.getenv('UPDATE_CHECK_INTERVAL', '3600'))  # 1 hour default
         self.discord_webhook = os.getenv('DISCORD_WEBHOOK_URL')
         self.notification_enabled = os.getenv('UPDATE_NOTIFICATIONS', 'true').lower() == 'true'
         
-        # Load current image digests
+        # Registry check limits: parallel images, requests/second per registry, seconds per image
+        self.registry_concurrency = int(os.getenv('UPDATE_CHECK_CONCURRENCY', '8'))
+        self.registry_rate = float(os.getenv('UPDATE_REGISTRY_RATE', '5'))
+        self.image_timeout = float(os.getenv('UPDATE_IMAGE_TIMEOUT', '30'))
+        
+        # Adaptive scheduling: per-image cadence between these bounds, +/- jitter
+        self.min_check_interval = int(os.getenv('UPDATE_CHECK_MIN_INTERVAL', '900'))
+        self.max_check_interval = int(os.getenv('UPDATE_CHECK_MAX_INTERVAL', '86400'))
+        self.check_jitter = float(os.getenv('UPDATE_CHECK_JITTER', '0.2'))
+        
+        # Off-peak pre-fetch: pull updated images (never restart) inside this local time window
+        self.prefetch_enabled = os.getenv('UPDATE_PREFETCH', 'false').lower() == 'true'
+        self.prefetch_window = parse_time_window(os.getenv('UPDATE_PREFETCH_WINDOW', '02:00-06:00'))
+        self.prefetch_queue = {}   # service -> image to pull
+        self.prefetched = {}       # service -> remote digest already pulled
+        self.pending_notifications = {}  # dispatcher event id -> updates it announces
+        
+        # Registry v2 HEAD lookups (ETag-cached); docker manifest inspect without requests
+        self.registry = RegistryClient() if REQUESTS_AVAILABLE else None
+        
+        # Digests, ETags and notification state survive restarts
+        self.store = UpdateStore()
+        self.schedule = self.store.load_schedule()
+        if self.registry:
+            self.registry.etag_cache.update(self.store.load_registry_cache())
+        
+        # Docker Engine API over the unix socket; the docker CLI is the fallback
+        self.docker = DockerEngine()
+        self.project_name = default_project_name(self.project_dir)
+        
+        # Current image digests, loaded at the start of each check
         self.current_images = {}
-        self.load_current_images()
     
-    def load_current_images(self):
+    async def compose_images(self):
+        """Return 'docker compose images' entries across all active compose files (CLI fallback)"""
+        args = compose_command(self.project_dir)
+        returncode, stdout, stderr = await self.run_command(*args, 'images', '--format', 'json', timeout=60)
+        if returncode != 0:
+            raise RuntimeError(stderr.strip() or f"docker compose images exited with {returncode}")
+        stdout = stdout.strip()
+        # Newer compose prints one JSON array, older versions one object per line
+        if stdout.startswith('['):
+            return json.loads(stdout)
+        return [json.loads(line) for line in stdout.split('\n') if line]
+    
+    async def load_current_images(self):
         """Load current running container image digests"""
         try:
-            result = subprocess.run([
-                'docker', 'compose', '-f', str(self.compose_file), 'images', '--format', 'json'
-            ], capture_output=True, text=True, cwd=self.project_dir)
-            
-            if result.returncode == 0:
-                for line in result.stdout.strip().split('\n'):
-                    if line:
-                        image_info = json.loads(line)
-                        service = image_info.get('Service')
-                        repository = image_info.get('Repository')
-                        tag = image_info.get('Tag', 'latest')
-                        image_id = image_info.get('ID')
-                        
-                        if service and repository:
-                            self.current_images[service] = {
-                                'repository': repository,
-                                'tag': tag,
-                                'image_id': image_id,
-                                'full_name': f"{repository}:{tag}"
-                            }
+            # Every container in the compose project, whichever overlay defined it
+            services = await run_in_daemon_thread(self.docker.compose_services, self.project_name)
+        except DockerEngineError as e:
+            logger.debug(f"Docker API unavailable, falling back to docker compose: {e}")
+        else:
+            self.current_images = {
+                service: {
+                    'repository': info['repository'],
+                    'tag': info['tag'],
+                    'image_id': info['image_id'],
+                    'repo_digests': info['repo_digests'],
+                    'full_name': f"{info['repository']}:{info['tag']}"
+                }
+                for service, info in services.items()
+            }
+            logger.info(f"Loaded {len(self.current_images)} current images")
+            return
+        
+        try:
+            current_images = {}
+            for image_info in await self.compose_images():
+                service = image_info.get('Service')
+                repository = image_info.get('Repository')
+                tag = image_info.get('Tag', 'latest')
+                image_id = image_info.get('ID')
+                
+                if service and repository:
+                    current_images[service] = {
+                        'repository': repository,
+                        'tag': tag,
+                        'image_id': image_id,
+                        'full_name': f"{repository}:{tag}"
+                    }
+            self.current_images = current_images
             
             logger.info(f"Loaded {len(self.current_images)} current images")
             
         except Exception as e:
             logger.error(f"Failed to load current images: {e}")
     
-    async def check_for_updates(self):
-        """Check for available container updates"""
-        updates_available = []
-        
+    async def check_for_updates(self, services=None):
+        """Check for available container updates (all services, or only the given ones)"""
         try:
-            # Pull latest images to check for updates
+            # Compare registry digests with local ones; nothing is pulled
             logger.info("Checking for container updates...")
-            
-            result = subprocess.run([
-                'docker', 'compose', '-f', str(self.compose_file), 'pull', '--dry-run'
-            ], capture_output=True, text=True, cwd=self.project_dir)
-            
-            # If dry-run isn't supported, do actual pull but track changes
-            if "unknown flag" in result.stderr:
-                # Get current image IDs before pull
-                before_pull = self.get_image_ids()
-                
-                # Pull latest images
-                pull_result = subprocess.run([
-                    'docker', 'compose', '-f', str(self.compose_file), 'pull'
-                ], capture_output=True, text=True, cwd=self.project_dir)
-                
-                if pull_result.returncode == 0:
-                    # Get image IDs after pull
-                    after_pull = self.get_image_ids()
-                    
-                    # Compare for changes
-                    for service, before_id in before_pull.items():
-                        after_id = after_pull.get(service)
-                        if after_id and before_id != after_id:
-                            updates_available.append({
-                                'service': service,
-                                'image': self.current_images.get(service, {}).get('full_name', 'unknown'),
-                                'old_id': before_id[:12],
-                                'new_id': after_id[:12]
-                            })
-            
-            # Also check using docker images for additional verification
-            if not updates_available:
-                updates_available = await self.check_registry_updates()
-            
-            return updates_available
+            return await self.check_registry_updates(services)
             
         except Exception as e:
             logger.error(f"Error checking for updates: {e}")
             return []
     
-    def get_image_ids(self):
+    async def get_image_ids(self):
         """Get current image IDs for all services"""
+        try:
+            services = await run_in_daemon_thread(self.docker.compose_services, self.project_name)
+            return {service: info['image_id'] for service, info in services.items() if info['image_id']}
+        except DockerEngineError as e:
+            logger.debug(f"Docker API unavailable, falling back to docker compose: {e}")
+        
         image_ids = {}
         try:
-            result = subprocess.run([
-                'docker', 'compose', '-f', str(self.compose_file), 'images', '--format', 'json'
-            ], capture_output=True, text=True, cwd=self.project_dir)
-            
-            if result.returncode == 0:
-                for line in result.stdout.strip().split('\n'):
-                    if line:
-                        image_info = json.loads(line)
-                        service = image_info.get('Service')
-                        image_id = image_info.get('ID')
-                        if service and image_id:
-                            image_ids[service] = image_id
+            for image_info in await self.compose_images():
+                service = image_info.get('Service')
+                image_id = image_info.get('ID')
+                if service and image_id:
+                    image_ids[service] = image_id
             
         except Exception as e:
             logger.error(f"Error getting image IDs: {e}")
         
         return image_ids
     
-    async def check_registry_updates(self):
+    async def run_command(self, *args, timeout=None):
+        """Run a command without blocking the event loop. Returns (returncode, stdout, stderr)."""
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=self.project_dir,
+            start_new_session=True
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        finally:
+            # Timed out or cancelled: don't leave docker CLI processes (or their children) behind
+            if process.returncode is None:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+        return process.returncode, stdout.decode(), stderr.decode()
+    
+    async def check_registry_updates(self, services=None):
         """Check registry for newer images (alternative method)"""
-        updates = []
+        semaphore = asyncio.Semaphore(self.registry_concurrency)
+        rate_limiter = RegistryRateLimiter(self.registry_rate)
         
-        for service, image_info in self.current_images.items():
-            try:
-                repository = image_info['repository']
-                tag = image_info['tag']
-                
-                # Check if image has updates using docker manifest
-                result = subprocess.run([
-                    'docker', 'manifest', 'inspect', f"{repository}:{tag}"
-                ], capture_output=True, text=True)
-                
-                if result.returncode == 0:
-                    manifest = json.loads(result.stdout)
-                    remote_digest = manifest.get('config', {}).get('digest', '')
-                    
-                    # Get local image digest
-                    inspect_result = subprocess.run([
-                        'docker', 'image', 'inspect', image_info['image_id']
-                    ], capture_output=True, text=True)
-                    
-                    if inspect_result.returncode == 0:
-                        local_info = json.loads(inspect_result.stdout)[0]
-                        local_digest = local_info.get('RepoDigests', [''])[0].split('@')[-1] if local_info.get('RepoDigests') else ''
-                        
-                        if remote_digest and local_digest and remote_digest != local_digest:
-                            updates.append({
-                                'service': service,
-                                'image': image_info['full_name'],
-                                'local_digest': local_digest[:12],
-                                'remote_digest': remote_digest[:12]
-                            })
-                
-            except Exception as e:
-                logger.debug(f"Could not check registry for {service}: {e}")
-                continue
+        async def check(service, image_info):
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        self.check_image_update(service, image_info, rate_limiter), self.image_timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"Registry check for {service} timed out after {self.image_timeout}s")
+                except Exception as e:
+                    logger.debug(f"Could not check registry for {service}: {e}")
+                return None
         
-        return updates
+        checked = [service for service in self.current_images if services is None or service in services]
+        results = await asyncio.gather(*(check(service, self.current_images[service]) for service in checked))
+        if self.registry:
+            self.store.save_registry_cache(self.registry.etag_cache)
+        self.schedule_next_checks(checked)
+        return [update for update in results if update]
+    
+    async def check_image_update(self, service, image_info, rate_limiter):
+        """Compare one image's registry digest with the local one. Returns an update dict or None."""
+        repository = image_info['repository']
+        tag = image_info['tag']
+        
+        if self.registry:
+            # HEAD request for the tag's manifest (index) digest, a few KB at most
+            await rate_limiter.acquire(registry_host(repository))
+            remote_digest = await run_in_daemon_thread(self.registry.get_digest, repository, tag)
+        else:
+            # Check if image has updates using docker manifest
+            await rate_limiter.acquire('docker manifest')
+            returncode, stdout, _ = await self.run_command('docker', 'manifest', 'inspect', f"{repository}:{tag}")
+            if returncode != 0:
+                return None
+            manifest = json.loads(stdout)
+            remote_digest = manifest.get('config', {}).get('digest', '')
+        
+        # Get local image digest (already known when loaded through the Docker API)
+        repo_digests = image_info.get('repo_digests')
+        if repo_digests is None:
+            returncode, stdout, _ = await self.run_command('docker', 'image', 'inspect', image_info['image_id'])
+            if returncode != 0:
+                return None
+            repo_digests = json.loads(stdout)[0].get('RepoDigests') or []
+            image_info['repo_digests'] = repo_digests
+        if self.registry:
+            local_digest = local_digest_for(repository, repo_digests)
+        else:
+            local_digest = repo_digests[0].split('@')[-1] if repo_digests else ''
+        
+        self.store.record_check(service, image_info['full_name'], local_digest, remote_digest)
+        if remote_digest and local_digest and remote_digest != local_digest:
+            return {
+                'service': service,
+                'image': image_info['full_name'],
+                'local_digest': local_digest,
+                'remote_digest': remote_digest
+            }
+        return None
     
     async def send_discord_notification(self, updates):
-        """Send Discord notification about available updates"""
-        if not self.discord_webhook or not self.notification_enabled or not REQUESTS_AVAILABLE:
-            if not REQUESTS_AVAILABLE:
-                logger.warning("Discord notifications disabled: requests module not available")
-            return
+        """Queue a Discord notification about available updates; returns the dispatcher event id"""
+        if not self.discord_webhook or not self.notification_enabled:
+            return None
         
         try:
             embed = {
@@ -221,7 +346,7 @@ class UpdateMonitor:
                 if 'old_id' in update:
                     field_value += f"\nOld: `{update['old_id']}`\nNew: `{update['new_id']}`"
                 elif 'local_digest' in update:
-                    field_value += f"\nLocal: `{update['local_digest']}`\nRemote: `{update['remote_digest']}`"
+                    field_value += f"\nLocal: `{short_digest(update['local_digest'])}`\nRemote: `{short_digest(update['remote_digest'])}`"
                 
                 embed["fields"].append({
                     "name": f"📦 {service_name}",
@@ -241,49 +366,198 @@ class UpdateMonitor:
                 "content": f"🚨 **Surge Update Alert** - {len(updates)} container updates detected!"
             }
             
-            response = requests.post(self.discord_webhook, json=payload, timeout=10)
-            response.raise_for_status()
+            # Batched, deduplicated and rate limited by the shared dispatcher
+            event_id = discord_dispatch.enqueue(payload, self.discord_webhook)
             
-            logger.info(f"Discord notification sent for {len(updates)} updates")
+            logger.info(f"Discord notification queued for {len(updates)} updates")
+            return event_id
             
         except Exception as e:
             logger.error(f"Failed to send Discord notification: {e}")
+            return None
+    
+    def confirm_notifications(self):
+        """Mark updates notified once the dispatcher delivered their alert; failed alerts are sent again"""
+        for event_id, updates in list(self.pending_notifications.items()):
+            status = discord_dispatch.delivery_status(event_id)
+            if status == 'pending':
+                continue
+            del self.pending_notifications[event_id]
+            if status == 'sent':
+                self.store.mark_notified(updates)
+            else:
+                logger.warning(f"Discord notification for {len(updates)} updates was not delivered; will retry")
     
-    async def run_once(self):
+    def notification_pending(self, update):
+        """Return True if an alert for this update is queued but not yet delivered"""
+        return any(pending['service'] == update['service'] and pending['remote_digest'] == update['remote_digest']
+                   for updates in self.pending_notifications.values() for pending in updates)
+    
+    def cadence_for(self, service):
+        """Seconds between checks for a service, learned from how often its remote digest changes"""
+        changes = self.store.remote_change_times(service)
+        gaps = [(later - earlier).total_seconds() for earlier, later in zip(changes, changes[1:])]
+        row = self.store.get_image(service)
+        if changes:
+            since = changes[-1]
+        elif row and row['last_changed']:
+            since = datetime.fromisoformat(row['last_changed'])
+        else:
+            return self.check_interval
+        quiet = (datetime.now() - since).total_seconds()
+        
+        if gaps:
+            # An image that has gone quiet for longer than usual is slowing down
+            typical = statistics.median(gaps + [quiet] if quiet > max(gaps) else gaps)
+        else:
+            # Never seen it change: back off gradually the longer it stays the same
+            typical = max(quiet, self.check_interval * CHECKS_PER_CHANGE)
+        return min(max(typical / CHECKS_PER_CHANGE, self.min_check_interval), self.max_check_interval)
+    
+    def schedule_next_checks(self, services):
+        """Schedule the next check of each service at its cadence, with jitter to spread registry traffic"""
+        now = time.time()
+        for service in services:
+            cadence = self.cadence_for(service)
+            next_check = now + cadence * random.uniform(1 - self.check_jitter, 1 + self.check_jitter)
+            self.schedule[service] = next_check
+            self.store.set_next_check(service, next_check)
+    
+    def due_services(self):
+        """Return services whose next check time has passed (never-checked services are due)"""
+        now = time.time()
+        return [service for service in self.current_images if self.schedule.get(service, 0) <= now]
+    
+    def seconds_until_next_check(self):
+        """Seconds to sleep until the next service is due (or the pre-fetch window opens)"""
+        upcoming = [self.schedule.get(service, 0) for service in self.current_images]
+        wait = min(upcoming, default=time.time() + self.check_interval) - time.time()
+        if self.prefetch_queue:
+            wait = min(wait, self.seconds_until_off_peak())
+        return min(max(wait, 30), self.check_interval)
+    
+    def seconds_until_off_peak(self, now=None):
+        """Seconds until the pre-fetch window opens (0 while it is open)"""
+        now = now or datetime.now()
+        start, end = self.prefetch_window
+        current = now.time()
+        if start <= end:
+            inside = start <= current < end
+        else:
+            inside = current >= start or current < end
+        if inside:
+            return 0
+        opens = datetime.combine(now.date(), start)
+        if opens <= now:
+            opens += timedelta(days=1)
+        return (opens - now).total_seconds()
+    
+    def queue_prefetch(self, updates):
+        """Remember updated images to pull during the next off-peak window"""
+        for update in updates:
+            if self.prefetched.get(update['service']) != update['remote_digest']:
+                self.prefetch_queue[update['service']] = (update['image'], update['remote_digest'])
+    
+    async def prefetch_updates(self):
+        """Pull queued images one at a time while the off-peak window is open; containers keep running"""
+        for service, (image, remote_digest) in list(self.prefetch_queue.items()):
+            if self.seconds_until_off_peak() > 0:
+                logger.info(f"Off-peak window closed, {len(self.prefetch_queue)} pre-fetches deferred")
+                return
+            logger.info(f"Pre-fetching {image} for {service}...")
+            returncode, _, stderr = await self.run_command('docker', 'pull', '--quiet', image, timeout=1800)
+            if returncode == 0:
+                self.prefetched[service] = remote_digest
+                del self.prefetch_queue[service]
+                logger.info(f"Pre-fetched {image}; './surge --update' will only swap the container")
+            else:
+                logger.warning(f"Pre-fetch of {image} failed: {stderr.strip()}")
+    
+    async def run_once(self, services=None):
         """Run a single update check"""
         logger.info("Starting update check...")
-        updates = await self.check_for_updates()
+        self.confirm_notifications()
+        if services is None:
+            await self.load_current_images()
+        updates = await self.check_for_updates(services)
         
         if updates:
             logger.info(f"Found {len(updates)} updates available:")
             for update in updates:
                 logger.info(f"  - {update['service']}: {update['image']}")
             
-            await self.send_discord_notification(updates)
+            # Only alert about remote digests we haven't already announced or queued
+            new_updates = [update for update in updates
+                           if not self.store.was_notified(update['service'], update['remote_digest'])
+                           and not self.notification_pending(update)]
+            if new_updates:
+                event_id = await self.send_discord_notification(new_updates)
+                if event_id:
+                    # Marked notified by confirm_notifications() once Discord accepted it
+                    self.pending_notifications[event_id] = new_updates
+            else:
+                logger.info("All available updates were already notified")
             return updates
         else:
             logger.info("No updates available")
             return []
     
     async def run_daemon(self):
-        """Run as a daemon, checking for updates periodically"""
-        logger.info(f"Starting update monitor daemon (check interval: {self.check_interval}s)")
+        """Run as a daemon, checking each image when its adaptive schedule says it is due"""
+        logger.info(f"Starting update monitor daemon (base interval: {self.check_interval}s, "
+                    f"per-image cadence {self.min_check_interval}-{self.max_check_interval}s)")
+        if self.prefetch_enabled:
+            start, end = self.prefetch_window
+            logger.info(f"Pre-fetching updated images between {start:%H:%M} and {end:%H:%M}")
+        
+        # SIGTERM/SIGINT stop the daemon promptly, even in the middle of a check
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
         
-        while True:
+        while not stop.is_set():
             try:
-                await self.run_once()
-                self.last_check = datetime.now()
+                # Cheap through the Docker API; picks up added or removed services
+                await self.load_current_images()
+                due = self.due_services()
+                if due:
+                    check = asyncio.ensure_future(self.run_once(due))
+                    if not await self.run_until_stopped(check, stop):
+                        break
+                    self.last_check = datetime.now()
+                    if self.prefetch_enabled:
+                        self.queue_prefetch(check.result())
                 
-                # Wait for next check interval
-                await asyncio.sleep(self.check_interval)
+                if self.prefetch_queue and self.seconds_until_off_peak() == 0:
+                    if not await self.run_until_stopped(self.prefetch_updates(), stop):
+                        break
+                
+                # Sleep until the next image is due
+                await self.run_until_stopped(asyncio.sleep(self.seconds_until_next_check()), stop)
                 
-            except KeyboardInterrupt:
-                logger.info("Update monitor stopped by user")
-                break
             except Exception as e:
                 logger.error(f"Error in update monitor daemon: {e}")
                 # Wait a bit before retrying
-                await asyncio.sleep(60)
+                await self.run_until_stopped(asyncio.sleep(60), stop)
+        
+        logger.info("Update monitor stopped")
+    
+    async def run_until_stopped(self, coroutine, stop):
+        """Await coroutine unless stop is set first, in which case cancel it. Returns False if stopped."""
+        task = asyncio.ensure_future(coroutine)
+        stopper = asyncio.ensure_future(stop.wait())
+        await asyncio.wait({task, stopper}, return_when=asyncio.FIRST_COMPLETED)
+        stopper.cancel()
+        if task.done():
+            task.result()
+            return True
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return False
 
 def main():
     import argparse
@@ -292,6 +566,10 @@ def main():
     parser.add_argument('--daemon', action='store_true', help='Run as daemon')
     parser.add_argument('--check-once', action='store_true', help='Run single check and exit')
     parser.add_argument('--interval', type=int, default=3600, help='Check interval in seconds (default: 3600)')
+    parser.add_argument('--prefetch', action='store_true',
+                        help='With --daemon, pull updated images during the off-peak window (UPDATE_PREFETCH_WINDOW)')
+    parser.add_argument('--history', nargs='?', const='', metavar='SERVICE',
+                        help='Show recorded image changes (optionally for one service) and exit')
     
     args = parser.parse_args()
     
@@ -299,6 +577,16 @@ def main():
     if args.interval:
         os.environ['UPDATE_CHECK_INTERVAL'] = str(args.interval)
     
+    if args.history is not None:
+        store = UpdateStore()
+        for event in reversed(store.history(args.history or None)):
+            print(f"{event['at']}  {event['service']:<16} {event['event']:<15} "
+                  f"{short_digest(event['old_digest'] or '')} -> {short_digest(event['new_digest'] or '')}  {event['image']}")
+        return
+    
+    if args.prefetch:
+        os.environ['UPDATE_PREFETCH'] = 'true'
+    
     monitor = UpdateMonitor()
     
     if args.daemon:
@@ -164,6 +164,7 @@ configure_environment() {
     echo "Current configuration:"
     echo "  Check Interval: ${UPDATE_CHECK_INTERVAL:-3600} seconds"
     echo "  Notifications: ${UPDATE_NOTIFICATIONS:-true}"
+    echo "  Off-peak Pre-fetch: ${UPDATE_PREFETCH:-false} (${UPDATE_PREFETCH_WINDOW:-02:00-06:00})"
     echo "  Discord Webhook: ${DISCORD_WEBHOOK_URL:+Configured}"
     echo ""
     
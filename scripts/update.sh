@@ -147,10 +147,13 @@ send_update_notification() {
 EOF
 )
         
-        curl -X POST "$DISCORD_WEBHOOK_URL" \
-             -H "Content-Type: application/json" \
-             -d "$payload" \
-             --silent --show-error || true
+        # Queue with the batching, rate-limited dispatcher; post directly if that fails
+        if ! printf '%s' "$payload" | python3 "$SCRIPT_DIR/discord_dispatch.py" enqueue --webhook "$DISCORD_WEBHOOK_URL" 2>/dev/null; then
+            curl -X POST "$DISCORD_WEBHOOK_URL" \
+                 -H "Content-Type: application/json" \
+                 -d "$payload" \
+                 --silent --show-error || true
+        fi
     fi
 }
 
@@ -166,44 +169,56 @@ update_surge() {
     
     local update_failed=false
     
-    # Pull latest images
-    print_step "Pulling latest container images..."
-    if docker compose pull; then
-        print_success "Successfully pulled latest images"
-    else
-        print_error "Failed to pull some images"
-        update_failed=true
-    fi
-    
-    # Recreate containers with new images (only if pull succeeded)
-    if [ "$update_failed" = false ]; then
-        print_step "Selecting enabled services from .env..."
-        # Parse enabled services from .env
-        # Get all service names from docker-compose.yml
-        compose_services=($(grep -E '^  [a-zA-Z0-9_-]+:' "$PROJECT_DIR/docker-compose.yml" | awk '{print $1}' | tr -d ':'))
-        enabled_services=()
-        while IFS= read -r line; do
-            if [[ $line =~ ^ENABLE_([A-Z0-9_]+)=true ]]; then
-                env_name="${BASH_REMATCH[1],,}"
-                # Map env_name to service name
-                case "$env_name" in
-                    cli_debrid)
-                        service_name="cli-debrid" ;;
-                    rdt_client)
-                        service_name="rdt-client" ;;
-                    *)
-                        service_name="$env_name" ;;
-                esac
-                # Only add if service exists in compose file
-                if [[ " ${compose_services[@]} " =~ " $service_name " ]]; then
-                    enabled_services+=("$service_name")
-                fi
+    print_step "Selecting enabled services from .env..."
+    # Parse enabled services from .env
+    # Get all service names from docker-compose.yml
+    compose_services=($(grep -E '^  [a-zA-Z0-9_-]+:' "$PROJECT_DIR/docker-compose.yml" | awk '{print $1}' | tr -d ':'))
+    enabled_services=()
+    while IFS= read -r line; do
+        if [[ $line =~ ^ENABLE_([A-Z0-9_]+)=true ]]; then
+            env_name="${BASH_REMATCH[1],,}"
+            # Map env_name to service name
+            case "$env_name" in
+                cli_debrid)
+                    service_name="cli-debrid" ;;
+                rdt_client)
+                    service_name="rdt-client" ;;
+                *)
+                    service_name="$env_name" ;;
+            esac
+            # Only add if service exists in compose file
+            if [[ " ${compose_services[@]} " =~ " $service_name " ]]; then
+                enabled_services+=("$service_name")
             fi
-        done < "$PROJECT_DIR/.env"
-        if [ ${#enabled_services[@]} -eq 0 ]; then
-            print_error "No enabled services found in .env that exist in docker-compose.yml. Aborting update."
+        fi
+    done < "$PROJECT_DIR/.env"
+    
+    local health_checked=false
+    if [ ${#enabled_services[@]} -eq 0 ]; then
+        print_error "No enabled services found in .env that exist in docker-compose.yml. Aborting update."
+        update_failed=true
+    elif command -v python3 >/dev/null 2>&1 && python3 "$SCRIPT_DIR/docker_engine.py" services --project-dir "$PROJECT_DIR" >/dev/null 2>&1; then
+        # Parallel pulls, restart only changed images in dependency order, gated on health
+        print_step "Pulling images and rolling out updates: ${enabled_services[*]}"
+        if python3 "$SCRIPT_DIR/update_executor.py" --project-dir "$PROJECT_DIR" "${enabled_services[@]}"; then
+            print_success "Successfully updated enabled containers"
+            health_checked=true
+        else
+            print_error "Failed to update enabled containers"
             update_failed=true
+        fi
+    else
+        # Pull latest images
+        print_step "Pulling latest container images..."
+        if docker compose pull; then
+            print_success "Successfully pulled latest images"
         else
+            print_error "Failed to pull some images"
+            update_failed=true
+        fi
+        
+        # Recreate containers with new images (only if pull succeeded)
+        if [ "$update_failed" = false ]; then
             print_step "Recreating enabled containers: ${enabled_services[*]}"
             if docker compose up -d "${enabled_services[@]}"; then
                 print_success "Successfully recreated enabled containers"
@@ -219,12 +234,16 @@ update_surge() {
     
     # Wait for containers to be healthy
     if [ "$update_failed" = false ]; then
-        print_step "Waiting for containers to be healthy..."
-        sleep 10
+        if [ "$health_checked" = false ]; then
+            print_step "Waiting for containers to be healthy..."
+            sleep 10
+        fi
         
         # Check container health
         local unhealthy_containers
-        unhealthy_containers=$(docker compose ps --format json | jq -r 'select(.Health == "unhealthy" or .State == "exited") | .Service' 2>/dev/null || echo "")
+        if ! unhealthy_containers=$(python3 "$SCRIPT_DIR/docker_engine.py" unhealthy --project-dir "$PROJECT_DIR" 2>/dev/null); then
+            unhealthy_containers=$(docker compose ps --format json | jq -r 'select(.Health == "unhealthy" or .State == "exited") | .Service' 2>/dev/null || echo "")
+        fi
         
         if [ -n "$unhealthy_containers" ]; then
             print_warning "Some containers may not be healthy:"
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Surge Update Executor
+
+Applies image updates for a set of compose services with as little
+downtime as possible:
+1. pulls images in parallel (bounded concurrency; new pulls can be held
+   back while the link is busy, running pulls are never throttled)
+2. skips services whose pulled image is the one already running
+3. recreates changed services in dependency order, one depends_on level at
+   a time, waiting for each level to be healthy before starting the next
+
+Usage:
+    python3 update_executor.py [--project-dir DIR] SERVICE [SERVICE ...]
+"""
+
+import os
+import sys
+import time
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from docker_engine import (DockerEngine, DockerEngineError, compose_command, compose_dependencies,
+                           default_project_name, dependency_levels)
+
+PULL_CONCURRENCY = int(os.environ.get('SURGE_PULL_CONCURRENCY', '3'))
+# New pulls wait while the host receives faster than this; 0 = start immediately
+PULL_START_BELOW_MBPS = float(os.environ.get('SURGE_PULL_START_BELOW_MBPS', '0'))
+HEALTH_TIMEOUT = int(os.environ.get('SURGE_HEALTH_TIMEOUT', '180'))
+PULL_TIMEOUT = 1800
+
+class PullAdmission:
+    """
+    Decides when a pull may start: only while the host's receive rate (from
+    /proc/net/dev) is under a threshold. This is not a bandwidth cap: docker
+    has no per-pull rate limit, so a pull that has started (even one large
+    image) runs at full speed and can still saturate the link.
+    """
+
+    def __init__(self, threshold_mbps):
+        self.threshold_bytes = threshold_mbps * 1_000_000 / 8
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def received_bytes():
+        total = 0
+        with open('/proc/net/dev', 'r') as f:
+            for line in f.readlines()[2:]:
+                interface, _, counters = line.partition(':')
+                if interface.strip() != 'lo':
+                    total += int(counters.split()[0])
+        return total
+
+    def wait_for_headroom(self, sample=1.0, max_wait=300):
+        """Block until the measured receive rate drops below the threshold (at most max_wait seconds)."""
+        if self.threshold_bytes <= 0:
+            return
+        deadline = time.monotonic() + max_wait
+        with self.lock:
+            while time.monotonic() < deadline:
+                try:
+                    before = self.received_bytes()
+                    time.sleep(sample)
+                    rate = (self.received_bytes() - before) / sample
+                except (OSError, ValueError):
+                    return  # no /proc/net/dev: don't block updates
+                if rate < self.threshold_bytes:
+                    return
+
+class UpdateExecutor:
+    def __init__(self, project_dir, services, concurrency=PULL_CONCURRENCY,
+                 start_below_mbps=PULL_START_BELOW_MBPS, health_timeout=HEALTH_TIMEOUT):
+        self.project_dir = Path(project_dir)
+        self.services = list(dict.fromkeys(services))
+        self.concurrency = max(concurrency, 1)
+        self.admission = PullAdmission(start_below_mbps)
+        self.health_timeout = health_timeout
+        self.docker = DockerEngine()
+        self.project_name = default_project_name(self.project_dir)
+        self.compose_args = compose_command(self.project_dir)
+
+    def log(self, message):
+        print(message, flush=True)
+
+    def compose(self, *args, timeout=None):
+        return subprocess.run(self.compose_args + list(args), capture_output=True, text=True,
+                              cwd=self.project_dir, timeout=timeout)
+
+    def pull(self, service):
+        """Pull one service's image. Returns (service, ok, error message)."""
+        self.admission.wait_for_headroom()
+        started = time.monotonic()
+        try:
+            result = self.compose('pull', '--quiet', service, timeout=PULL_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return service, False, f"timed out after {PULL_TIMEOUT}s"
+        if result.returncode != 0:
+            return service, False, (result.stderr.strip().splitlines() or ['pull failed'])[-1]
+        self.log(f"  📥 Pulled {service} ({time.monotonic() - started:.0f}s)")
+        return service, True, None
+
+    def pull_all(self):
+        """Pull every service's image in parallel. Returns the services that failed."""
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self.pull, service) for service in self.services]
+            for future in as_completed(futures):
+                service, ok, error = future.result()
+                if not ok:
+                    self.log(f"  ❌ Failed to pull {service}: {error}")
+                    failed.append(service)
+        return failed
+
+    def changed_services(self, running):
+        """Services whose configured image now resolves to a different image than the running container."""
+        changed = []
+        for service in self.services:
+            info = running.get(service)
+            if not info or info['state'] != 'running':
+                changed.append(service)  # not running: bring it up
+                continue
+            if info['image'].startswith('sha256:'):
+                changed.append(service)  # configured reference unknown: recreate to be safe
+                continue
+            try:
+                # Resolve the configured tag (Config.Image) to the image it points at now
+                pulled_id = self.docker.inspect_image(info['image'])['Id']
+            except DockerEngineError:
+                changed.append(service)
+                continue
+            if pulled_id != info['image_id']:
+                changed.append(service)
+        return changed
+
+    def run(self):
+        """Pull, then roll out changed services level by level. Returns 0 on success."""
+        try:
+            running = self.docker.compose_services(self.project_name)
+        except DockerEngineError as e:
+            self.log(f"❌ Docker API unavailable: {e}")
+            return 2
+
+        self.log(f"📥 Pulling {len(self.services)} images ({self.concurrency} at a time)...")
+        failed = self.pull_all()
+        if failed:
+            self.log(f"❌ Failed to pull: {', '.join(sorted(failed))}")
+            return 1
+
+        changed = self.changed_services(running)
+        unchanged = [service for service in self.services if service not in changed]
+        if unchanged:
+            self.log(f"⏭️  Unchanged, not restarting: {', '.join(unchanged)}")
+        if not changed:
+            self.log("✅ All services already run the latest images")
+            return 0
+
+        for level in dependency_levels(changed, compose_dependencies(self.project_dir)):
+            self.log(f"🔄 Recreating {', '.join(level)}...")
+            result = self.compose('up', '-d', '--no-deps', *level)
+            if result.returncode != 0:
+                self.log(f"❌ Failed to recreate {', '.join(level)}: {result.stderr.strip()}")
+                return 1
+            unhealthy = self.docker.wait_healthy(self.project_name, level, self.health_timeout, self.log)
+            if unhealthy:
+                self.log(f"❌ Not healthy after update: {', '.join(unhealthy)}; stopping rollout")
+                return 1
+            self.log(f"  ✅ {', '.join(level)} healthy")
+
+        self.log(f"✅ Updated {len(changed)} services")
+        return 0
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pull and roll out Surge image updates')
+    parser.add_argument('services', nargs='+', help='Compose services to update')
+    parser.add_argument('--project-dir', default=str(Path(__file__).resolve().parent.parent))
+    parser.add_argument('--concurrency', type=int, default=PULL_CONCURRENCY,
+                        help='Parallel image pulls (default: $SURGE_PULL_CONCURRENCY or 3)')
+    parser.add_argument('--start-below-mbps', type=float, default=PULL_START_BELOW_MBPS,
+                        help='Only start new pulls while the download rate is below this; running pulls are '
+                             'not throttled (default: $SURGE_PULL_START_BELOW_MBPS, 0 = always start)')
+    parser.add_argument('--health-timeout', type=int, default=HEALTH_TIMEOUT,
+                        help='Seconds to wait for each level to become healthy (default: 180)')
+    args = parser.parse_args()
+
+    executor = UpdateExecutor(args.project_dir, args.services, args.concurrency,
+                              args.start_below_mbps, args.health_timeout)
+    return executor.run()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Surge Update Monitor State Store
+
+Small SQLite database that keeps the update monitor's state across
+restarts:
+- images: last known local/remote digest, check time and next scheduled
+  check per service
+- registry_cache: registry ETags so restarts keep getting 304s
+- notifications: which (service, remote digest) pairs were already sent
+- history: when each service's local or remote image changed
+"""
+
+import os
+import logging
+import sqlite3
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    service TEXT PRIMARY KEY,
+    image TEXT NOT NULL,
+    local_digest TEXT,
+    remote_digest TEXT,
+    last_checked TEXT,
+    last_changed TEXT,
+    next_check REAL
+);
+CREATE TABLE IF NOT EXISTS registry_cache (
+    registry TEXT NOT NULL,
+    path TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    etag TEXT,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (registry, path, tag)
+);
+CREATE TABLE IF NOT EXISTS notifications (
+    service TEXT NOT NULL,
+    remote_digest TEXT NOT NULL,
+    notified_at TEXT NOT NULL,
+    PRIMARY KEY (service, remote_digest)
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    service TEXT NOT NULL,
+    event TEXT NOT NULL,
+    image TEXT,
+    old_digest TEXT,
+    new_digest TEXT,
+    at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_service ON history (service, at);
+"""
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = [
+    '/var/lib/surge/update-monitor.db',
+    os.path.expanduser('~/.cache/surge/update-monitor.db'),
+]
+
+def default_db_path():
+    """Return $SURGE_UPDATE_DB, or the first default location we can write to."""
+    if os.getenv('SURGE_UPDATE_DB'):
+        return os.getenv('SURGE_UPDATE_DB')
+    for path in DEFAULT_PATHS:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.access(os.path.dirname(path), os.W_OK):
+                return path
+        except OSError:
+            continue
+    logger.warning("⚠️ No writable location for the update database (tried %s); "
+                   "state is kept in memory and lost on restart. Set SURGE_UPDATE_DB to a writable path.",
+                   ', '.join(DEFAULT_PATHS))
+    return ':memory:'
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+class UpdateStore:
+    """Persistent digests, registry ETags, notification state and change history."""
+
+    def __init__(self, path=None):
+        self.path = path or default_db_path()
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def get_image(self, service):
+        """Return the stored row for a service, or None."""
+        return self.conn.execute('SELECT * FROM images WHERE service = ?', (service,)).fetchone()
+
+    def record_check(self, service, image, local_digest, remote_digest):
+        """Store one check result and add history rows for digests that changed."""
+        now = _now()
+        previous = self.get_image(service)
+        changed = previous is None
+        with self.conn:
+            if previous is not None:
+                if local_digest and previous['local_digest'] and local_digest != previous['local_digest']:
+                    self._add_history(service, 'local_changed', image, previous['local_digest'], local_digest, now)
+                    changed = True
+                if remote_digest and previous['remote_digest'] and remote_digest != previous['remote_digest']:
+                    self._add_history(service, 'remote_changed', image, previous['remote_digest'], remote_digest, now)
+                    changed = True
+            self.conn.execute("""
+                INSERT INTO images (service, image, local_digest, remote_digest, last_checked, last_changed)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (service) DO UPDATE SET
+                    image = excluded.image,
+                    local_digest = COALESCE(excluded.local_digest, images.local_digest),
+                    remote_digest = COALESCE(excluded.remote_digest, images.remote_digest),
+                    last_checked = excluded.last_checked,
+                    last_changed = CASE WHEN ? THEN excluded.last_checked ELSE images.last_changed END
+            """, (service, image, local_digest or None, remote_digest or None, now, now, changed))
+
+    def _add_history(self, service, event, image, old_digest, new_digest, at):
+        self.conn.execute(
+            'INSERT INTO history (service, event, image, old_digest, new_digest, at) VALUES (?, ?, ?, ?, ?, ?)',
+            (service, event, image, old_digest, new_digest, at)
+        )
+
+    def load_schedule(self):
+        """Return {service: next_check epoch seconds} for scheduled services."""
+        rows = self.conn.execute('SELECT service, next_check FROM images WHERE next_check IS NOT NULL')
+        return {row['service']: row['next_check'] for row in rows}
+
+    def set_next_check(self, service, next_check):
+        """Persist when a service should be checked next (only for services checked before)."""
+        with self.conn:
+            self.conn.execute('UPDATE images SET next_check = ? WHERE service = ?', (next_check, service))
+
+    def remote_change_times(self, service, limit=20):
+        """Return the times (oldest first) at which a service's remote digest was seen changing."""
+        rows = self.conn.execute(
+            "SELECT at FROM history WHERE service = ? AND event = 'remote_changed' ORDER BY id DESC LIMIT ?",
+            (service, limit)
+        )
+        return sorted(datetime.fromisoformat(row['at']) for row in rows)
+
+    def was_notified(self, service, remote_digest):
+        """Return True if an alert for this service's remote digest was already sent."""
+        row = self.conn.execute(
+            'SELECT 1 FROM notifications WHERE service = ? AND remote_digest = ?', (service, remote_digest)
+        ).fetchone()
+        return row is not None
+
+    def mark_notified(self, updates):
+        """Remember that alerts for these updates were sent."""
+        now = _now()
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO notifications (service, remote_digest, notified_at) VALUES (?, ?, ?)',
+                [(update['service'], update['remote_digest'], now) for update in updates]
+            )
+
+    def load_registry_cache(self):
+        """Return the registry ETag cache in RegistryClient's format."""
+        rows = self.conn.execute('SELECT registry, path, tag, etag, digest FROM registry_cache')
+        return {(row['registry'], row['path'], row['tag']): {'etag': row['etag'], 'digest': row['digest']} for row in rows}
+
+    def save_registry_cache(self, cache):
+        """Persist the registry ETag cache."""
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO registry_cache (registry, path, tag, etag, digest) VALUES (?, ?, ?, ?, ?)',
+                [(registry, path, tag, entry.get('etag'), entry['digest']) for (registry, path, tag), entry in list(cache.items())]
+            )
+
+    def history(self, service=None, limit=50):
+        """Return the most recent history rows, optionally for one service."""
+        if service:
+            rows = self.conn.execute(
+                'SELECT * FROM history WHERE service = ? ORDER BY id DESC LIMIT ?', (service, limit)
+            )
+        else:
+            rows = self.conn.execute('SELECT * FROM history ORDER BY id DESC LIMIT ?', (limit,))
+        return [dict(row) for row in rows]
@@ -0,0 +1,153 @@
+"""Tests for scripts/debrid_providers.py against local HTTP stand-ins for each provider API."""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import http_client
+import debrid_providers
+
+VALID_KEY = 'valid-key'
+
+# Account endpoint and successful response body of each provider
+ACCOUNTS = {
+    'realdebrid': ('/user', {'username': 'rd-user', 'type': 'premium', 'expiration': '2030-01-01T00:00:00.000Z'}),
+    'alldebrid': ('/user', {'status': 'success', 'data': {'user': {'username': 'ad-user', 'isPremium': True,
+                                                                  'premiumUntil': 1893456000}}}),
+    'debridlink': ('/account/infos', {'success': True, 'value': {'pseudo': 'dl-user', 'accountType': 1,
+                                                                 'premiumLeft': 86400}}),
+    'torbox': ('/user/me', {'success': True, 'data': {'email': 'tb-user@example.com', 'plan': 2,
+                                                     'premium_expires_at': '2030-01-01T00:00:00Z'}}),
+}
+
+class ProviderStandIn:
+    """Local HTTP server answering one provider's account endpoint."""
+
+    def __init__(self, name):
+        self.path, self.body = ACCOUNTS[name]
+        self.delay = 0
+        self.requests = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests += 1
+                time.sleep(stand_in.delay)
+                if 'apikey=' in self.path:
+                    self.send_error(400, 'API key in query string')
+                    return
+                if self.path.split('?', 1)[0] != stand_in.path:
+                    self.send_error(404)
+                    return
+                if self.headers.get('Authorization') != f'Bearer {VALID_KEY}':
+                    self.send_error(401)
+                    return
+                body = json.dumps(stand_in.body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class ValidateAccountsTest(unittest.TestCase):
+    def setUp(self):
+        self.stand_ins = {name: ProviderStandIn(name) for name in ACCOUNTS}
+        self.environ = dict(os.environ)
+        for name, stand_in in self.stand_ins.items():
+            os.environ[f"SURGE_{name.upper()}_API_URL"] = stand_in.url
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmp_dir, 'debrid-accounts.json')
+        self.retries = http_client.DEFAULT_RETRIES
+        http_client.DEFAULT_RETRIES = 0
+
+    def tearDown(self):
+        http_client.DEFAULT_RETRIES = self.retries
+        os.environ.clear()
+        os.environ.update(self.environ)
+        for stand_in in self.stand_ins.values():
+            stand_in.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def validate(self, keys, **kwargs):
+        return debrid_providers.validate_accounts(keys, cache_path=self.cache_path, **kwargs)
+
+    def test_valid_keys(self):
+        results = self.validate({name: VALID_KEY for name in ACCOUNTS})
+        self.assertEqual(set(results), set(ACCOUNTS))
+        for name, result in results.items():
+            self.assertTrue(result['ok'], f"{name}: {result}")
+            self.assertTrue(result['premium'])
+            self.assertFalse(result['cached'])
+        self.assertEqual(results['realdebrid']['username'], 'rd-user')
+        self.assertEqual(results['alldebrid']['username'], 'ad-user')
+        self.assertEqual(results['debridlink']['username'], 'dl-user')
+        self.assertEqual(results['torbox']['username'], 'tb-user@example.com')
+
+    def test_invalid_keys(self):
+        results = self.validate({name: 'wrong-key' for name in ACCOUNTS})
+        for name, result in results.items():
+            self.assertFalse(result['ok'], name)
+            self.assertIn('authentication failed', result['error'])
+
+    def test_timeout(self):
+        self.stand_ins['torbox'].delay = 2
+        original = debrid_providers.VALIDATION_TIMEOUT
+        debrid_providers.VALIDATION_TIMEOUT = 0.5
+        try:
+            results = self.validate({'torbox': VALID_KEY, 'realdebrid': VALID_KEY})
+        finally:
+            debrid_providers.VALIDATION_TIMEOUT = original
+        self.assertFalse(results['torbox']['ok'])
+        self.assertIn('Timeout', results['torbox']['error'])
+        self.assertTrue(results['realdebrid']['ok'])
+
+    def test_providers_checked_concurrently(self):
+        for stand_in in self.stand_ins.values():
+            stand_in.delay = 0.5
+        started = time.monotonic()
+        results = self.validate({name: VALID_KEY for name in ACCOUNTS})
+        self.assertTrue(all(result['ok'] for result in results.values()))
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_cached_within_ttl(self):
+        self.validate({'realdebrid': VALID_KEY}, ttl=3600)
+        results = self.validate({'realdebrid': VALID_KEY}, ttl=3600)
+        self.assertTrue(results['realdebrid']['ok'])
+        self.assertTrue(results['realdebrid']['cached'])
+        self.assertEqual(self.stand_ins['realdebrid'].requests, 1)
+        with open(self.cache_path, 'r', encoding='utf-8') as f:
+            self.assertNotIn(VALID_KEY, f.read())
+
+    def test_expired_cache_checks_again(self):
+        self.validate({'realdebrid': VALID_KEY}, ttl=0)
+        results = self.validate({'realdebrid': VALID_KEY}, ttl=0)
+        self.assertFalse(results['realdebrid']['cached'])
+        self.assertEqual(self.stand_ins['realdebrid'].requests, 2)
+
+    def test_failures_are_not_cached(self):
+        self.validate({'torbox': 'wrong-key'})
+        self.validate({'torbox': 'wrong-key'})
+        self.assertEqual(self.stand_ins['torbox'].requests, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Tests for the Decypharr metrics check in scripts/interconnection-status.py."""
+
+import os
+import sys
+import threading
+import unittest
+import importlib.util
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'decypharr_metrics.prom')
+sys.path.insert(0, SCRIPTS_DIR)
+
+spec = importlib.util.spec_from_file_location('interconnection_status', os.path.join(SCRIPTS_DIR, 'interconnection-status.py'))
+interconnection_status = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(interconnection_status)
+
+def read_fixture():
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        return f.read()
+
+class MetricsStandIn:
+    """Local HTTP server serving a /metrics body that tests can swap out."""
+
+    def __init__(self, body):
+        self.body = body
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = stand_in.body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/metrics"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class SummarizeTest(unittest.TestCase):
+    def test_fixture_covers_every_expected_series(self):
+        names = {name for name, _labels, _value in interconnection_status.parse_prometheus(read_fixture())}
+        expected = {interconnection_status.DECYPHARR_QUEUE_METRIC}
+        expected |= set(interconnection_status.DECYPHARR_REPAIR_METRICS)
+        expected |= set(interconnection_status.DECYPHARR_DEBRID_METRICS)
+        self.assertEqual(expected - names, set())
+
+    def test_summary_from_fixture(self):
+        summary = interconnection_status.summarize_decypharr_metrics(
+            interconnection_status.parse_prometheus(read_fixture()))
+        self.assertEqual(summary["queue_depth"], 4)
+        self.assertEqual(summary["repair"], {"checked": 120, "queued": 400, "broken": 7, "workers": 2})
+        self.assertEqual(set(summary["debrids"]), {"realdebrid", "alldebrid"})
+        realdebrid = summary["debrids"]["realdebrid"]
+        self.assertEqual(realdebrid["requests"], 150)
+        self.assertEqual(realdebrid["errors"], 3)
+        self.assertAlmostEqual(realdebrid["latency_sum_ms"], 37500)
+        self.assertEqual(realdebrid["latency_count"], 150)
+        self.assertEqual(interconnection_status.repair_progress(summary["repair"]), "120/400 checked, 2 workers")
+
+class CheckDecypharrMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.stand_in = MetricsStandIn(read_fixture())
+        self.url = interconnection_status.DECYPHARR_METRICS_URL
+        interconnection_status.DECYPHARR_METRICS_URL = self.stand_in.url
+        self.checker = interconnection_status.SurgeInterconnectionChecker.__new__(
+            interconnection_status.SurgeInterconnectionChecker)
+        self.checker.debrid_counters = {}
+
+    def tearDown(self):
+        interconnection_status.DECYPHARR_METRICS_URL = self.url
+        self.stand_in.close()
+
+    def test_fixture_passes(self):
+        result = self.checker.check_decypharr_metrics()
+        self.assertTrue(result["configured"], result["reason"])
+        self.assertIn("queue 4", result["reason"])
+        self.assertEqual(result["details"]["debrids"]["realdebrid"]["latency_ms"], 250.0)
+        self.assertEqual(result["details"]["debrids"]["realdebrid"]["error_rate"], 0.02)
+
+    def test_unknown_series_fail(self):
+        # Only runtime metrics: the Decypharr names we read are not exported
+        self.stand_in.body = "\n".join(line for line in read_fixture().splitlines()
+                                       if not line.startswith('decypharr_'))
+        result = self.checker.check_decypharr_metrics()
+        self.assertFalse(result["configured"])
+        self.assertIn("None of the expected Decypharr metrics", result["reason"])
+
+    def test_no_new_requests_is_idle(self):
+        self.checker.check_decypharr_metrics()
+        result = self.checker.check_decypharr_metrics()
+        self.assertTrue(result["configured"])
+        self.assertIsNone(result["details"]["debrids"]["realdebrid"]["error_rate"])
+        self.assertIn("realdebrid idle", result["reason"])
+
+    def test_error_burst_does_not_stick(self):
+        self.stand_in.body = read_fixture().replace(
+            'decypharr_debrid_errors_total{debrid="realdebrid"} 3', 'decypharr_debrid_errors_total{debrid="realdebrid"} 90')
+        self.assertFalse(self.checker.check_decypharr_metrics()["configured"])
+        self.stand_in.body = self.stand_in.body.replace(
+            'decypharr_debrid_requests_total{debrid="realdebrid"} 150', 'decypharr_debrid_requests_total{debrid="realdebrid"} 250')
+        result = self.checker.check_decypharr_metrics()
+        self.assertTrue(result["configured"], result["reason"])
+        self.assertEqual(result["details"]["debrids"]["realdebrid"]["error_rate"], 0.0)
+
+    def test_counter_reset_uses_totals(self):
+        self.checker.check_decypharr_metrics()
+        self.stand_in.body = read_fixture().replace(
+            'decypharr_debrid_requests_total{debrid="realdebrid"} 150', 'decypharr_debrid_requests_total{debrid="realdebrid"} 10')
+        result = self.checker.check_decypharr_metrics()
+        self.assertEqual(result["details"]["debrids"]["realdebrid"]["requests"], 10)
+
+if __name__ == '__main__':
+    unittest.main()
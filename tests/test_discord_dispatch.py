@@ -0,0 +1,156 @@
+"""Tests for scripts/discord_dispatch.py against a local webhook stand-in."""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import discord_dispatch
+
+def update_payload(service, timestamp='2026-01-01T00:00:00'):
+    """A '1 update available' alert as update-monitor builds it."""
+    return {
+        'content': '🚨 **Surge Update Alert** - 1 container updates detected!',
+        'embeds': [{
+            'title': '🔄 Surge Container Updates Available',
+            'description': 'Found updates for 1 container(s)',
+            'timestamp': timestamp,
+            'fields': [{'name': f'📦 {service.title()}', 'value': f'Image: `lscr.io/linuxserver/{service}:latest`'}],
+        }],
+    }
+
+class WebhookStandIn:
+    """Local HTTP server recording webhook posts and answering with a configurable status."""
+
+    def __init__(self):
+        self.posts = []
+        self.status = 204
+        self.headers = {}
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                stand_in.posts.append(json.loads(self.rfile.read(length)))
+                body = json.dumps({'retry_after': 0.5}).encode('utf-8') if stand_in.status == 429 else b''
+                self.send_response(stand_in.status)
+                for name, value in stand_in.headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/webhook"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class DispatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.webhook = WebhookStandIn()
+        self.spool = tempfile.mkdtemp()
+        self.environ = dict(os.environ)
+        os.environ['SURGE_DISCORD_SPOOL'] = self.spool
+        self.dispatcher = discord_dispatch.Dispatcher(self.spool, batch_window=0)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        self.webhook.close()
+        shutil.rmtree(self.spool)
+
+    def enqueue(self, payload):
+        return discord_dispatch.enqueue(payload, self.webhook.url, start_dispatcher=False)
+
+    def dispatch(self):
+        self.dispatcher.dispatch(self.dispatcher.pending())
+
+    def test_alerts_differing_only_in_fields_are_both_sent(self):
+        radarr = self.enqueue(update_payload('radarr'))
+        sonarr = self.enqueue(update_payload('sonarr'))
+        self.assertNotEqual(discord_dispatch.dedupe_key(self.webhook.url, update_payload('radarr')),
+                            discord_dispatch.dedupe_key(self.webhook.url, update_payload('sonarr')))
+        self.dispatch()
+        self.assertEqual(len(self.webhook.posts), 1)
+        fields = [embed['fields'][0]['name'] for embed in self.webhook.posts[0]['embeds']]
+        self.assertEqual(fields, ['📦 Radarr', '📦 Sonarr'])
+        self.assertEqual(discord_dispatch.delivery_status(radarr), 'sent')
+        self.assertEqual(discord_dispatch.delivery_status(sonarr), 'sent')
+
+    def test_identical_alerts_are_sent_once(self):
+        first = self.enqueue(update_payload('radarr', timestamp='2026-01-01T00:00:00'))
+        second = self.enqueue(update_payload('radarr', timestamp='2026-01-01T00:05:00'))
+        self.dispatch()
+        self.assertEqual(len(self.webhook.posts), 1)
+        self.assertEqual(len(self.webhook.posts[0]['embeds']), 1)
+        self.assertEqual(discord_dispatch.delivery_status(first), 'sent')
+        self.assertEqual(discord_dispatch.delivery_status(second), 'sent')
+
+    def test_repeat_within_dedupe_window_is_not_posted_again(self):
+        self.enqueue(update_payload('radarr'))
+        self.dispatch()
+        repeat = self.enqueue(update_payload('radarr'))
+        self.dispatch()
+        self.assertEqual(len(self.webhook.posts), 1)
+        self.assertEqual(discord_dispatch.delivery_status(repeat), 'sent')
+
+    def test_rate_limited_event_stays_spooled(self):
+        self.webhook.status = 429
+        event_id = self.enqueue(update_payload('radarr'))
+        self.dispatch()
+        self.assertEqual(discord_dispatch.delivery_status(event_id), 'pending')
+        self.assertGreater(self.dispatcher.seconds_until_unblocked(), 0)
+        with open(os.path.join(self.spool, f"{event_id}.json")) as f:
+            self.assertEqual(json.load(f)['attempts'], 1)
+
+        # Still blocked: nothing is posted until Retry-After has passed
+        self.webhook.status = 204
+        self.dispatch()
+        self.assertEqual(len(self.webhook.posts), 1)
+        self.dispatcher.blocked_until.clear()
+        self.dispatch()
+        self.assertEqual(len(self.webhook.posts), 2)
+        self.assertEqual(discord_dispatch.delivery_status(event_id), 'sent')
+
+    def test_gives_up_after_max_attempts(self):
+        self.webhook.status = 500
+        event_id = self.enqueue(update_payload('radarr'))
+        for _attempt in range(discord_dispatch.MAX_ATTEMPTS):
+            self.dispatcher.blocked_until.clear()
+            self.dispatch()
+        self.assertEqual(len(self.webhook.posts), discord_dispatch.MAX_ATTEMPTS)
+        self.assertEqual(discord_dispatch.delivery_status(event_id), 'failed')
+
+    def test_rejected_payload_is_reported_failed(self):
+        self.webhook.status = 400
+        event_id = self.enqueue(update_payload('radarr'))
+        self.dispatch()
+        self.assertEqual(self.dispatcher.pending(), [])
+        self.assertEqual(discord_dispatch.delivery_status(event_id), 'failed')
+
+    def test_exhausted_bucket_pauses_webhook(self):
+        self.webhook.headers = {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': '2'}
+        self.enqueue(update_payload('radarr'))
+        self.dispatch()
+        self.assertGreater(self.dispatcher.seconds_until_unblocked(), 1)
+
+    def test_no_webhook_is_not_queued(self):
+        os.environ.pop('DISCORD_WEBHOOK_URL', None)
+        self.assertIsNone(discord_dispatch.enqueue(update_payload('radarr'), start_dispatcher=False))
+        self.assertEqual(self.dispatcher.pending(), [])
+
+if __name__ == '__main__':
+    unittest.main()
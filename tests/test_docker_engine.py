@@ -0,0 +1,199 @@
+"""Tests for scripts/docker_engine.py against a fake Docker daemon on a unix socket."""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import socketserver
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import docker_engine
+from docker_engine import DockerEngine, DockerEngineError
+
+PROJECT = 'surge'
+PREFIX = f'/{docker_engine.API_VERSION}'
+
+def container(service, image, status, state='running', image_id='sha256:aaa', container_id=None):
+    return {
+        'Id': container_id or f'{service}-id',
+        'Names': [f'/surge-{service}'],
+        'Image': image,
+        'ImageID': image_id,
+        'State': state,
+        'Status': status,
+        'Labels': {'com.docker.compose.project': PROJECT, 'com.docker.compose.service': service},
+    }
+
+class FakeDaemon:
+    """Docker Engine API stand-in listening on a unix socket."""
+
+    def __init__(self, socket_path):
+        self.containers = []
+        self.images = [{'Id': 'sha256:aaa', 'RepoDigests': ['lscr.io/linuxserver/radarr@sha256:111']}]
+        self.inspect = {}
+        self.requests = []
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                daemon.requests.append(url.path)
+                path = url.path[len(PREFIX):] if url.path.startswith(PREFIX) else url.path
+                if path == '/_ping':
+                    self.reply(200, b'OK', 'text/plain')
+                elif path == '/containers/json':
+                    filters = json.loads(parse_qs(url.query).get('filters', ['{}'])[0])
+                    wanted = set(filters.get('label', []))
+                    containers = [c for c in daemon.current_containers()
+                                  if wanted <= {f'{key}={value}' for key, value in c['Labels'].items()}]
+                    self.reply(200, json.dumps(containers).encode('utf-8'))
+                elif path == '/images/json':
+                    self.reply(200, json.dumps(daemon.images).encode('utf-8'))
+                elif path.startswith('/containers/') and path.endswith('/json'):
+                    document = daemon.inspect.get(path.split('/')[2])
+                    if document is None:
+                        self.reply(404, json.dumps({'message': 'No such container'}).encode('utf-8'))
+                    else:
+                        self.reply(200, json.dumps(document).encode('utf-8'))
+                elif path == '/broken':
+                    self.reply(500, b'not json', 'text/plain')
+                else:
+                    self.reply(404, json.dumps({'message': f'page not found: {path}'}).encode('utf-8'))
+
+            def reply(self, status, body, content_type='application/json'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def address_string(self):
+                return 'unix'
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def current_containers(self):
+        """Containers as listed now; a callable lets tests change them between polls."""
+        return self.containers() if callable(self.containers) else self.containers
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class DockerEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, 'docker.sock')
+        self.daemon = FakeDaemon(self.socket_path)
+        self.engine = DockerEngine(self.socket_path, timeout=2)
+
+    def tearDown(self):
+        self.daemon.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_ping(self):
+        self.assertTrue(self.engine.available())
+        self.assertFalse(DockerEngine(os.path.join(self.tmp_dir, 'missing.sock')).available())
+
+    def test_compose_services(self):
+        self.daemon.containers = [
+            container('radarr', 'lscr.io/linuxserver/radarr:latest', 'Up 2 hours (healthy)'),
+            container('gaps', 'housewrecker/gaps:latest', 'Up 5 minutes', image_id='sha256:bbb'),
+            container('setup', 'alpine:3.20', 'Exited (0) 1 minute ago', state='exited'),
+            dict(container('stray', 'alpine', 'Up'), Labels={'com.docker.compose.project': PROJECT}),
+            dict(container('other', 'alpine', 'Up'), Labels={'com.docker.compose.project': 'other',
+                                                              'com.docker.compose.service': 'other'}),
+        ]
+        services = self.engine.compose_services(PROJECT)
+        self.assertEqual(set(services), {'radarr', 'gaps', 'setup'})
+        radarr = services['radarr']
+        self.assertEqual(radarr['container'], 'surge-radarr')
+        self.assertEqual((radarr['repository'], radarr['tag']), ('lscr.io/linuxserver/radarr', 'latest'))
+        self.assertEqual(radarr['repo_digests'], ['lscr.io/linuxserver/radarr@sha256:111'])
+        self.assertEqual(radarr['health'], 'healthy')
+        self.assertIsNone(services['gaps']['health'])
+        self.assertEqual(services['gaps']['repo_digests'], [])
+        self.assertEqual(services['setup']['exit_code'], 0)
+        self.assertIsNone(radarr['exit_code'])
+
+    def test_compose_services_resolves_moved_tag(self):
+        # After a pull moved the tag, /containers/json reports the old image ID as Image
+        self.daemon.containers = [container('radarr', 'sha256:aaa', 'Up 2 hours')]
+        self.daemon.inspect['radarr-id'] = {'Config': {'Image': 'lscr.io/linuxserver/radarr:develop'}}
+        radarr = self.engine.compose_services(PROJECT)['radarr']
+        self.assertEqual(radarr['image'], 'lscr.io/linuxserver/radarr:develop')
+        self.assertEqual(radarr['tag'], 'develop')
+        self.assertIn(f'{PREFIX}/containers/radarr-id/json', self.daemon.requests)
+
+    def test_moved_tag_keeps_image_id_if_inspect_fails(self):
+        self.daemon.containers = [container('radarr', 'sha256:aaa', 'Up 2 hours')]
+        self.assertEqual(self.engine.compose_services(PROJECT)['radarr']['image'], 'sha256:aaa')
+
+    def test_request_error_mapping(self):
+        with self.assertRaisesRegex(DockerEngineError, r'returned 404: No such container'):
+            self.engine.inspect_container('missing')
+        with self.assertRaisesRegex(DockerEngineError, r'returned 500: not json'):
+            self.engine.request('GET', '/broken')
+        with self.assertRaisesRegex(DockerEngineError, r'failed'):
+            DockerEngine(os.path.join(self.tmp_dir, 'missing.sock')).list_images()
+
+    def test_request_quotes_path_segments(self):
+        self.daemon.inspect['a/b'] = {}
+        with self.assertRaises(DockerEngineError):
+            self.engine.inspect_container('a/b')
+        self.assertIn(f'{PREFIX}/containers/a%2Fb/json', self.daemon.requests)
+
+    @mock.patch.object(docker_engine.time, 'sleep', lambda seconds: None)
+    def test_wait_healthy(self):
+        polls = []
+
+        def containers():
+            polls.append(1)
+            health = 'health: starting' if len(polls) < 3 else 'healthy'
+            return [
+                container('radarr', 'lscr.io/linuxserver/radarr:latest', f'Up 10 seconds ({health})'),
+                container('setup', 'alpine:3.20', 'Exited (0) 1 second ago', state='exited'),
+            ]
+
+        self.daemon.containers = containers
+        self.assertEqual(self.engine.wait_healthy(PROJECT, ['radarr', 'setup'], timeout=30, log=lambda message: None), [])
+        self.assertEqual(len(polls), 3)
+
+    @mock.patch.object(docker_engine.time, 'sleep', lambda seconds: None)
+    def test_wait_healthy_reports_failures(self):
+        self.daemon.containers = [
+            container('job', 'alpine:3.20', 'Exited (1) 1 second ago', state='exited'),
+            container('radarr', 'lscr.io/linuxserver/radarr:latest', 'Up 10 seconds (health: starting)'),
+        ]
+        logged = []
+        self.assertEqual(self.engine.wait_healthy(PROJECT, ['job', 'radarr'], timeout=30, log=logged.append),
+                         ['job', 'radarr'])
+        self.assertTrue(any('job' in message for message in logged))
+
+        self.daemon.containers = [container('radarr', 'lscr.io/linuxserver/radarr:latest', 'Up (unhealthy)')]
+        self.assertEqual(self.engine.wait_healthy(PROJECT, ['radarr'], timeout=30, log=lambda message: None), ['radarr'])
+
+    def test_wait_healthy_times_out(self):
+        self.daemon.containers = [container('radarr', 'lscr.io/linuxserver/radarr:latest', 'Up (health: starting)')]
+        self.assertEqual(self.engine.wait_healthy(PROJECT, ['radarr'], timeout=0, log=lambda message: None), ['radarr'])
+
+    def test_split_image_reference(self):
+        split = docker_engine.split_image_reference
+        self.assertEqual(split('lscr.io/linuxserver/radarr:latest'), ('lscr.io/linuxserver/radarr', 'latest'))
+        self.assertEqual(split('localhost:5000/app'), ('localhost:5000/app', 'latest'))
+        self.assertEqual(split('postgres:17-alpine@sha256:abc'), ('postgres', '17-alpine'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""Tests for scripts/registry_client.py against a local registry stand-in."""
+
+import os
+import sys
+import json
+import base64
+import threading
+import unittest
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import http_client
+import registry_client
+from registry_client import RegistryClient, RegistryError
+
+TOKEN = 'stand-in-token'
+INDEX_TYPE = 'application/vnd.oci.image.index.v1+json'
+
+class RegistryStandIn:
+    """Local registry v2 answering manifest HEADs behind a bearer token service."""
+
+    def __init__(self):
+        self.manifests = {('surge/app', 'latest'): 'sha256:' + '1' * 64}
+        self.heads = []
+        self.token_requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                stand_in.heads.append(dict(self.headers))
+                if self.headers.get('Authorization') != f'Bearer {TOKEN}':
+                    self.send_response(401)
+                    self.send_header('WWW-Authenticate', f'Bearer realm="{stand_in.url}/token",service="stand-in",'
+                                                         f'scope="repository:surge/app:pull"')
+                    self.end_headers()
+                    return
+                path = urlparse(self.path).path
+                repository, _, tag = path[len('/v2/'):].rpartition('/manifests/')
+                digest = stand_in.manifests.get((repository, tag))
+                if digest is None or INDEX_TYPE not in self.headers.get('Accept', ''):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                etag = f'"{digest}"'
+                self.send_response(304 if self.headers.get('If-None-Match') == etag else 200)
+                self.send_header('Docker-Content-Digest', digest)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', INDEX_TYPE)
+                self.end_headers()
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != '/token':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                stand_in.token_requests.append((parse_qs(url.query), self.headers.get('Authorization')))
+                body = json.dumps({'token': TOKEN, 'expires_in': 300}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.registry = f"127.0.0.1:{self.server.server_address[1]}"
+        self.url = f"http://{self.registry}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class RegistryClientTest(unittest.TestCase):
+    def setUp(self):
+        self.stand_in = RegistryStandIn()
+        self.repository = f"{self.stand_in.registry}/surge/app"
+        self.client = RegistryClient(credentials={})
+        self.retries = http_client.DEFAULT_RETRIES
+        http_client.DEFAULT_RETRIES = 0
+
+    def tearDown(self):
+        http_client.DEFAULT_RETRIES = self.retries
+        self.stand_in.close()
+
+    def test_head_digest_with_token_handshake(self):
+        digest = self.client.get_digest(self.repository, 'latest')
+        self.assertEqual(digest, self.stand_in.manifests[('surge/app', 'latest')])
+        # Challenged once, then retried with the token
+        self.assertEqual(len(self.stand_in.heads), 2)
+        self.assertEqual(len(self.stand_in.token_requests), 1)
+        query, authorization = self.stand_in.token_requests[0]
+        self.assertEqual(query, {'scope': ['repository:surge/app:pull'], 'service': ['stand-in']})
+        self.assertIsNone(authorization)
+        self.assertIn(INDEX_TYPE, self.stand_in.heads[-1]['Accept'])
+
+    def test_token_is_reused(self):
+        self.client.get_digest(self.repository, 'latest')
+        self.client.get_digest(self.repository, 'latest')
+        self.assertEqual(len(self.stand_in.token_requests), 1)
+        self.assertEqual(len(self.stand_in.heads), 3)
+
+    def test_etag_304_uses_cached_digest(self):
+        cache = {}
+        client = RegistryClient(etag_cache=cache, credentials={})
+        first = client.get_digest(self.repository, 'latest')
+        self.assertEqual(cache[(self.stand_in.registry, 'surge/app', 'latest')], {'etag': f'"{first}"', 'digest': first})
+        self.assertEqual(client.get_digest(self.repository, 'latest'), first)
+        self.assertEqual(self.stand_in.heads[-1]['If-None-Match'], f'"{first}"')
+
+        # A persisted cache is honoured by a fresh client
+        fresh = RegistryClient(etag_cache=dict(cache), credentials={})
+        self.assertEqual(fresh.get_digest(self.repository, 'latest'), first)
+        self.assertEqual(self.stand_in.heads[-1]['If-None-Match'], f'"{first}"')
+
+    def test_changed_digest_replaces_cache(self):
+        cache = {}
+        client = RegistryClient(etag_cache=cache, credentials={})
+        client.get_digest(self.repository, 'latest')
+        new_digest = 'sha256:' + '2' * 64
+        self.stand_in.manifests[('surge/app', 'latest')] = new_digest
+        self.assertEqual(client.get_digest(self.repository, 'latest'), new_digest)
+        self.assertEqual(cache[(self.stand_in.registry, 'surge/app', 'latest')]['digest'], new_digest)
+
+    def test_credentials_sent_to_token_service(self):
+        client = RegistryClient(credentials={self.stand_in.registry: ('user', 'secret')})
+        client.get_digest(self.repository, 'latest')
+        _query, authorization = self.stand_in.token_requests[0]
+        self.assertEqual(authorization, 'Basic ' + base64.b64encode(b'user:secret').decode())
+
+    def test_unknown_tag(self):
+        with self.assertRaisesRegex(RegistryError, '404'):
+            self.client.get_digest(self.repository, 'missing')
+
+    def test_unreachable_registry(self):
+        self.stand_in.close()
+        with self.assertRaises(RegistryError):
+            self.client.get_digest(self.repository, 'latest')
+
+class HelpersTest(unittest.TestCase):
+    def test_split_repository(self):
+        self.assertEqual(registry_client.split_repository('postgres'), ('docker.io', 'library/postgres'))
+        self.assertEqual(registry_client.split_repository('sctx/overseerr'), ('docker.io', 'sctx/overseerr'))
+        self.assertEqual(registry_client.split_repository('lscr.io/linuxserver/radarr'),
+                         ('lscr.io', 'linuxserver/radarr'))
+        self.assertEqual(registry_client.registry_base_url('localhost:5000'), 'http://localhost:5000')
+        self.assertEqual(registry_client.registry_base_url('ghcr.io'), 'https://ghcr.io')
+
+    def test_local_digest_for(self):
+        digests = ['ghcr.io/other/app@sha256:aaa', 'docker.io/library/postgres@sha256:bbb']
+        self.assertEqual(registry_client.local_digest_for('postgres', digests), 'sha256:bbb')
+
+if __name__ == '__main__':
+    unittest.main()